@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 
 from argparse import ArgumentParser, FileType
+from collections import defaultdict
 import itertools as it
 import os
+import re
 
 import mpi4py.rc
 mpi4py.rc.initialize = False
@@ -11,16 +13,18 @@ mpi4py.rc.initialize = False
 from pyfr._version import __version__
 from pyfr.backends import BaseBackend, get_backend
 from pyfr.inifile import Inifile
-from pyfr.mpiutil import register_finalize_handler
-from pyfr.partitioners import BasePartitioner, get_partitioner
+from pyfr.mpiutil import get_comm_rank_root, register_finalize_handler
+from pyfr.partitioners import (BaseParallelPartitioner, BasePartitioner,
+                               get_parallel_partitioner, get_partitioner)
+from pyfr.partitioners.calibrate import calibrate_elewts
 from pyfr.progress_bar import ProgressBar
 from pyfr.rank_allocator import get_rank_allocation
 from pyfr.readers import BaseReader, get_reader_by_name, get_reader_by_extn
-from pyfr.readers.native import NativeReader
+from pyfr.readers.native import MemoryReader, NativeReader, NodeLocalReader
 from pyfr.solvers import get_solver
 from pyfr.util import subclasses
 from pyfr.writers import (BaseWriter, get_writer_by_name, get_writer_by_extn,
-                          write_pyfrms)
+                          write_pyfrms, write_pyfrms_mpi)
 
 
 def main():
@@ -34,7 +38,7 @@ def main():
 
     # Import command
     ap_import = sp.add_parser('import', help='import --help')
-    ap_import.add_argument('inmesh', type=FileType('r'),
+    ap_import.add_argument('inmesh', type=FileType('rb'),
                            help='input mesh file')
     ap_import.add_argument('outmesh', help='output PyFR mesh file')
     types = sorted(cls.name for cls in subclasses(BaseReader))
@@ -45,6 +49,9 @@ def main():
                            help='linearisation tolerance')
     ap_import.set_defaults(process=process_import)
 
+    # Backends
+    backends = sorted(cls.name for cls in subclasses(BaseBackend))
+
     # Partition command
     ap_partition = sp.add_parser('partition', help='partition --help')
     ap_partition.add_argument('np', help='number of partitions or a colon '
@@ -54,18 +61,38 @@ def main():
                               help='input solution files')
     ap_partition.add_argument('outd', help='output directory')
     partitioners = sorted(cls.name for cls in subclasses(BasePartitioner))
-    ap_partition.add_argument('-p', dest='partitioner', choices=partitioners,
-                              help='partitioner to use')
+    ppartitioners = sorted(cls.name
+                           for cls in subclasses(BaseParallelPartitioner))
+    ap_partition.add_argument('-p', dest='partitioner',
+                              choices=sorted(partitioners + ppartitioners),
+                              help='partitioner to use; when run under MPI '
+                              'this must be one of the parallel partitioners '
+                              f'({", ".join(ppartitioners)}), which may also '
+                              'be used on a single rank')
     ap_partition.add_argument('-r', dest='rnumf', type=FileType('w'),
                               help='output renumbering file')
     ap_partition.add_argument('-e', dest='elewts', action='append',
                               default=[], metavar='shape:weight',
-                              help='element weighting factor')
+                              help='element weighting factor, or a file of '
+                              'such factors')
+    ap_partition.add_argument('--calibrate', type=FileType('r'),
+                              metavar='cfg', help='derive element weights '
+                              'by timing the kernels for the configuration '
+                              'on a backend')
     ap_partition.add_argument('--popt', dest='popts', action='append',
                               default=[], metavar='key:value',
                               help='partitioner-specific option')
+    ap_partition.add_argument('--backend', '-b', choices=backends,
+                              help='backend to calibrate with')
     ap_partition.set_defaults(process=process_partition)
 
+    # Options common to import and partition
+    for p in [ap_import, ap_partition]:
+        p.add_argument('--compression', choices=['gzip', 'lzf'],
+                       help='compression filter to apply to output datasets')
+        p.add_argument('--chunk-size', type=int, metavar='neles',
+                       help='number of elements per output dataset chunk')
+
     # Export command
     ap_export = sp.add_parser('export', help='export --help')
     ap_export.add_argument('meshf', help='PyFR mesh file to be converted')
@@ -100,10 +127,16 @@ def main():
     ap_restart.add_argument('soln', help='solution file')
     ap_restart.add_argument('cfg', nargs='?', type=FileType('r'),
                             help='new config file')
+    ap_restart.add_argument('--repartition', metavar='newmesh',
+                            help='if the mesh is partitioned for a different '
+                            'number of ranks then repartition it and the '
+                            'solution on the fly, writing the new mesh to '
+                            'newmesh')
+    ap_restart.add_argument('--partitioner', choices=partitioners,
+                            help='partitioner to use when repartitioning')
     ap_restart.set_defaults(process=process_restart)
 
     # Options common to run and restart
-    backends = sorted(cls.name for cls in subclasses(BaseBackend))
     for p in [ap_run, ap_restart]:
         p.add_argument('--backend', '-b', choices=backends, required=True,
                        help='backend to use')
@@ -120,6 +153,16 @@ def main():
         ap.print_help()
 
 
+def _get_dsopts(args):
+    dsopts = {'chunksz': args.chunk_size}
+
+    if args.compression:
+        dsopts['compression'] = args.compression
+        dsopts['shuffle'] = True
+
+    return dsopts
+
+
 def process_import(args):
     # Get a suitable mesh reader instance
     if args.type:
@@ -132,10 +175,107 @@ def process_import(args):
     mesh = reader.to_pyfrm(args.lintol)
 
     # Save to disk
-    write_pyfrms(args.outmesh, mesh)
+    write_pyfrms(args.outmesh, mesh, **_get_dsopts(args))
+
+
+_dflt_elewts = {'quad': 6, 'tri': 3, 'tet': 3, 'hex': 18, 'pri': 10, 'pyr': 6}
+
+
+def _get_partitioner(name, pwts, ewts, opts=None):
+    if name:
+        return get_partitioner(name, pwts, ewts, opts=opts or {})
+    else:
+        for name in sorted(cls.name for cls in subclasses(BasePartitioner)):
+            try:
+                return get_partitioner(name, pwts, ewts)
+            except OSError:
+                pass
+        else:
+            raise RuntimeError('No partitioners available')
+
+
+def _get_parallel_partitioner(name, pwts, ewts, opts=None):
+    if name:
+        return get_parallel_partitioner(name, pwts, ewts, opts=opts)
+    else:
+        for name in ['parmetis', 'ptscotch', 'geometric']:
+            try:
+                return get_parallel_partitioner(name, pwts, ewts)
+            except OSError:
+                pass
+        else:
+            raise RuntimeError('No parallel partitioners available')
+
+
+def _parse_elewts(elewts):
+    ewts = {}
+
+    for ew in elewts:
+        # Weights can either be given directly or read from a file
+        if ':' in ew:
+            ews = [ew]
+        else:
+            with open(ew) as f:
+                ews = f.read().split()
+
+        ewts |= {e: int(w) for e, w in (s.split(':') for s in ews)}
+
+    return ewts
+
+
+def _calibrate_elewts(args, mesh):
+    comm, rank, root = get_comm_rank_root()
+
+    if not args.backend:
+        raise ValueError('Calibration requires a backend')
+
+    # Have the root rank time the kernels for each type of element
+    if rank == root:
+        cfg = Inifile.load(args.calibrate)
+        backend = get_backend(args.backend, cfg)
+        etypes = sorted(mesh.partition_info('spt'))
+
+        ewts = calibrate_elewts(backend, cfg, etypes)
+
+        # Save the weights so that they can be reused with -e
+        with open(os.path.join(args.outd, 'elewts.txt'), 'w') as f:
+            for k, v in ewts.items():
+                print(f'{k}:{v}', file=f)
+    else:
+        ewts = None
+
+    return comm.bcast(ewts, root=root)
+
+
+def _init_mpi(threads=False):
+    # Prefork to allow us to exec processes after MPI is initialised
+    if hasattr(os, 'fork'):
+        from pytools.prefork import enable_prefork
+
+        enable_prefork()
+
+    # Work around issues with UCX-derived MPI libraries
+    os.environ['UCX_MEMTYPE_CACHE'] = 'n'
+
+    # Import but do not initialise MPI
+    from mpi4py import MPI
+
+    # Manually initialise MPI, with full thread support if requested
+    if threads:
+        MPI.Init_thread(MPI.THREAD_MULTIPLE)
+    else:
+        MPI.Init()
+
+    # Ensure MPI is suitably cleaned up
+    register_finalize_handler()
 
 
 def process_partition(args):
+    # Initialise MPI so that we may partition in parallel
+    _init_mpi()
+
+    comm, rank, root = get_comm_rank_root()
+
     # Ensure outd is a directory
     if not os.path.isdir(args.outd):
         raise ValueError('Invalid output directory')
@@ -146,30 +286,38 @@ def process_partition(args):
     else:
         pwts = [1]*int(args.np)
 
-    # Element weights
-    if args.elewts:
-        ewts = {e: int(w) for e, w in (ew.split(':') for ew in args.elewts)}
+    # Mesh
+    mesh = NativeReader(args.mesh)
+
+    # Element weights; either calibrated or from the table of defaults
+    if args.calibrate:
+        ewts = _calibrate_elewts(args, mesh)
+    elif args.elewts:
+        ewts = {}
     else:
-        ewts = {'quad': 6, 'tri': 3, 'tet': 3, 'hex': 18, 'pri': 10, 'pyr': 6}
+        ewts = _dflt_elewts
+
+    # Combined with any which have been explicitly specified
+    ewts = ewts | _parse_elewts(args.elewts)
 
     # Partitioner-specific options
     opts = dict(s.split(':', 1) for s in args.popts)
 
-    # Create the partitioner
-    if args.partitioner:
-        part = get_partitioner(args.partitioner, pwts, ewts, opts=opts)
+    # Names of the parallel partitioners
+    ppartitioners = {cls.name for cls in subclasses(BaseParallelPartitioner)}
+
+    # Create the partitioner; if running under MPI, or if a parallel
+    # partitioner has been requested, then use the ranks to partition in
+    # parallel and have them collectively write the output
+    if comm.size > 1 or args.partitioner in ppartitioners:
+        part = _get_parallel_partitioner(args.partitioner, pwts, ewts, opts)
+        write = write_pyfrms_mpi
     else:
-        for name in sorted(cls.name for cls in subclasses(BasePartitioner)):
-            try:
-                part = get_partitioner(name, pwts, ewts)
-                break
-            except OSError:
-                pass
-        else:
-            raise RuntimeError('No partitioners available')
+        part = _get_partitioner(args.partitioner, pwts, ewts, opts)
+        write = write_pyfrms
 
     # Partition the mesh
-    mesh, rnum, part_soln_fn = part.partition(NativeReader(args.mesh))
+    mesh, rnum, part_soln_fn = part.partition(mesh)
 
     # Prepare the solutions
     solnit = (part_soln_fn(NativeReader(s)) for s in args.solns)
@@ -184,10 +332,21 @@ def process_partition(args):
         path = os.path.join(args.outd, os.path.basename(path.rstrip('/')))
 
         # Save to disk
-        write_pyfrms(path, data)
+        write(path, data, **_get_dsopts(args))
+
+    # Gather the renumbering table from the ranks
+    if args.rnumf and comm.size > 1:
+        grnum = comm.gather(rnum, root=root)
+
+        if rank == root:
+            rnum = defaultdict(dict)
+
+            for r in grnum:
+                for etype, emap in r.items():
+                    rnum[etype] |= emap
 
     # Write out the renumbering table
-    if args.rnumf:
+    if args.rnumf and rank == root:
         print('etype,pold,iold,pnew,inew', file=args.rnumf)
 
         for etype, emap in sorted(rnum.items()):
@@ -208,29 +367,45 @@ def process_export(args):
 
 
 def _process_common(args, mesh, soln, cfg):
-    # Prefork to allow us to exec processes after MPI is initialised
-    if hasattr(os, 'fork'):
-        from pytools.prefork import enable_prefork
-
-        enable_prefork()
-
-    # Work around issues with UCX-derived MPI libraries
-    os.environ['UCX_MEMTYPE_CACHE'] = 'n'
-
-    # Import but do not initialise MPI
+    # Import and then initialise MPI
     from mpi4py import MPI
 
-    # Manually initialise MPI
-    MPI.Init()
+    # Non-blocking writes are performed from a background thread
+    threads = any(cfg.get(s, 'write-mode', 'blocking') == 'non-blocking'
+                  for s in cfg.sections() if s.startswith('soln-plugin-'))
 
-    # Ensure MPI is suitably cleaned up
-    register_finalize_handler()
+    _init_mpi(threads)
 
     # Create a backend
     backend = get_backend(args.backend, cfg)
 
-    # Get the mapping from physical ranks to MPI ranks
-    rallocs = get_rank_allocation(mesh, cfg)
+    # If requested, see if the mesh needs to be repartitioned
+    if getattr(args, 'repartition', None):
+        comm, rank, root = get_comm_rank_root()
+
+        # Have the root rank determine the number of partitions
+        if rank == root:
+            nparts = len(next(iter(mesh.partition_info('spt').values())))
+        else:
+            nparts = None
+
+        repart = comm.bcast(nparts, root=root) != comm.size
+    else:
+        repart = False
+
+    # If necessary, repartition the mesh and solution on the fly
+    if repart:
+        mesh, soln, rallocs = _repartition(args, mesh, soln, cfg)
+    else:
+        # Get the mapping from physical ranks to MPI ranks
+        rallocs = get_rank_allocation(mesh, cfg)
+
+        # If requested, have one rank per node read the mesh for the node
+        mload = cfg.get('backend', 'mesh-loading', 'rank')
+        if mload == 'node-leader':
+            mesh = NodeLocalReader(mesh, rallocs)
+        elif mload != 'rank':
+            raise ValueError('Invalid mesh loading mode')
 
     # Construct the solver
     solver = get_solver(backend, rallocs, mesh, soln, cfg)
@@ -246,6 +421,64 @@ def _process_common(args, mesh, soln, cfg):
     # Execute!
     solver.run()
 
+    # Release any shared memory holding the mesh
+    if isinstance(mesh, NodeLocalReader):
+        mesh.close()
+
+
+def _repartition(args, mesh, soln, cfg):
+    comm, rank, root = get_comm_rank_root()
+
+    # Have the root rank partition the mesh and solution
+    if rank == root:
+        part = _get_partitioner(args.partitioner, [1]*comm.size, _dflt_elewts)
+        pmesh, rnum, part_soln_fn = part.partition(mesh)
+        psoln = part_soln_fn(soln) if soln is not None else None
+
+        # Save the new mesh so that any new solutions can be used with it
+        write_pyfrms(args.repartition, pmesh)
+
+        mesh = MemoryReader(pmesh, args.repartition)
+    else:
+        mesh = None
+
+    # Allocate the new partitions to ranks
+    rallocs = get_rank_allocation(mesh, cfg)
+
+    # Split the partitioned data up by the rank on which it is needed
+    def split(data):
+        rdata = [{} for i in range(comm.size)]
+
+        for k, v in data.items():
+            p = k[0] if isinstance(k, tuple) else k
+
+            # Partition-specific data goes to a single rank
+            if (m := re.search(r'_p(\d+)(?:p\d+)?$', p)):
+                rdata[rallocs.pmrankmap[int(m[1])]][k] = v
+            # Whereas everything else is needed by all ranks
+            else:
+                for rd in rdata:
+                    rd[k] = v
+
+        return rdata
+
+    # Distribute the mesh and solution to the ranks
+    if rank == root:
+        mdata, sdata = split(pmesh), split(psoln) if psoln else None
+
+        for i in range(comm.size):
+            if i != root:
+                comm.send((mdata[i], sdata and sdata[i]), i)
+
+        mdata, sdata = mdata[root], sdata and sdata[root]
+    else:
+        mdata, sdata = comm.recv(source=root)
+
+    mesh = MemoryReader(mdata, args.repartition)
+    soln = MemoryReader(sdata, args.soln) if sdata else None
+
+    return mesh, soln, rallocs
+
 
 def process_run(args):
     _process_common(
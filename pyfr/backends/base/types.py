@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from collections import deque
+import math
 import time
 
 import numpy as np
@@ -76,18 +77,29 @@ class MatrixBase:
         else:
             backend.malloc(self, extent)
 
-    def get(self):
+    def get(self, out=None):
+        # Validate any output array
+        if out is not None and (out.shape != self.ioshape or
+                                not out.flags.c_contiguous):
+            raise ValueError('Invalid output array')
+
         # If we are yet to be allocated use our initial value
         if hasattr(self, '_initval'):
             if self._initval is not None:
-                return self._initval
+                ary = self._initval
+            else:
+                ary = np.zeros(self.ioshape, dtype=self.dtype)
+
+            if out is not None:
+                out[...] = ary
+                return out
             else:
-                return np.zeros(self.ioshape, dtype=self.dtype)
+                return ary
         # Otherwise defer to the backend
         else:
-            return self._get()
+            return self._get(out)
 
-    def _get(self):
+    def _get(self, out=None):
         pass
 
     def _pack(self, ary):
@@ -104,17 +116,36 @@ class MatrixBase:
 
         return np.ascontiguousarray(ary, dtype=self.dtype)
 
-    def _unpack(self, ary):
+    def _unpack(self, ary, out=None):
         # Unpack from blocked AoSoA to blocked SoA
         ary = ary.reshape(self.datashape).swapaxes(-2, -3)
 
         if len(self.ioshape) > 2:
             ary = np.moveaxis(ary, 0, -3)
 
-        ary = ary.reshape(self.ioshape[:-1] + (-1,))
-        ary = ary[..., :self.ioshape[-1]]
+        if out is None:
+            ary = ary.reshape(self.ioshape[:-1] + (-1,))
+            return ary[..., :self.ioshape[-1]]
+
+        # Otherwise copy directly into the output array a trailing block
+        # at a time to avoid an intermediate copy
+        nlead, oary = len(self.ioshape) - 1, out
+        ix = (np.s_[:],)*nlead
+
+        while True:
+            lead, tail = ary.shape[:nlead], ary.shape[nlead:]
+            n, m = oary.shape[-1], math.prod(tail[1:])
+
+            np.copyto(oary[..., :n - n % m].reshape(*lead, n // m, *tail[1:]),
+                      ary[ix + (np.s_[:n // m],)])
+
+            # Descend into any partially filled block
+            if n % m:
+                ary, oary = ary[ix + (n // m,)], oary[..., n - n % m:]
+            else:
+                break
 
-        return ary
+        return out
 
     def slice(self, ra=None, rb=None, ca=None, cb=None):
         ra, rb = ra or 0, rb or self.nrow
@@ -299,20 +330,31 @@ class Graph:
         # MPI wrappers
         self._startall = mpi.Prequest.Startall
 
+        # Cumulative MPI wait time
+        self.wait_time = 0.0
+
+        # Optional history of individual MPI wait times
         if backend.cfg.getbool('backend', 'collect-wait-times', False):
             n = backend.cfg.getint('backend', 'collect-wait-times-len', 10000)
-            self._wait_times = wait_times = deque(maxlen=n)
+            wait_times = deque(maxlen=n)
+        else:
+            wait_times = None
 
-            # Wrap the wait all function with a timing variant
-            def waitall(reqs):
-                if reqs:
-                    t = time.perf_counter_ns()
-                    mpi.Prequest.Waitall(reqs)
-                    wait_times.append((time.perf_counter_ns() - t) / 1e9)
+        self._wait_times = wait_times
 
-            self._waitall = waitall
-        else:
-            self._waitall = mpi.Prequest.Waitall
+        # Wrap the wait all function with a timing variant
+        def waitall(reqs):
+            if reqs:
+                t = time.perf_counter_ns()
+                mpi.Prequest.Waitall(reqs)
+
+                dt = (time.perf_counter_ns() - t) / 1e9
+                self.wait_time += dt
+
+                if wait_times is not None:
+                    wait_times.append(dt)
+
+        self._waitall = waitall
 
         # MPI requests along with their associated dependencies
         self.mpi_reqs = []
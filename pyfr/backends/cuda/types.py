@@ -26,7 +26,7 @@ class CUDAMatrixBase(_CUDAMatrixCommon, base.MatrixBase):
         # Remove
         del self._initval
 
-    def _get(self):
+    def _get(self, out=None):
         # Allocate an empty buffer
         buf = np.empty((self.nrow, self.leaddim), dtype=self.dtype)
 
@@ -34,7 +34,7 @@ class CUDAMatrixBase(_CUDAMatrixCommon, base.MatrixBase):
         self.backend.cuda.memcpy(buf, self.data, self.nbytes)
 
         # Unpack
-        return self._unpack(buf[None, :, :])
+        return self._unpack(buf[None, :, :], out)
 
     def _set(self, ary):
         buf = self._pack(ary)
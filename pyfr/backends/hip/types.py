@@ -27,7 +27,7 @@ class HIPMatrixBase(_HIPMatrixCommon, base.MatrixBase):
         # Remove
         del self._initval
 
-    def _get(self):
+    def _get(self, out=None):
         # Allocate an empty buffer
         buf = np.empty((self.nrow, self.leaddim), dtype=self.dtype)
 
@@ -35,7 +35,7 @@ class HIPMatrixBase(_HIPMatrixCommon, base.MatrixBase):
         self.backend.hip.memcpy(buf, self.data, self.nbytes)
 
         # Unpack
-        return self._unpack(buf[None, :, :])
+        return self._unpack(buf[None, :, :], out)
 
     def _set(self, ary):
         buf = self._pack(ary)
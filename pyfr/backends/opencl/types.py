@@ -31,7 +31,7 @@ class OpenCLMatrixBase(_OpenCLMatrixCommon, base.MatrixBase):
         # Remove
         del self._initval
 
-    def _get(self):
+    def _get(self, out=None):
         # Allocate an empty buffer
         buf = np.empty((self.nrow, self.leaddim), dtype=self.dtype)
 
@@ -41,7 +41,7 @@ class OpenCLMatrixBase(_OpenCLMatrixCommon, base.MatrixBase):
                                blocking=True)
 
         # Unpack
-        return self._unpack(buf[None, :, :])
+        return self._unpack(buf[None, :, :], out)
 
     def _set(self, ary):
         buf = self._pack(ary)
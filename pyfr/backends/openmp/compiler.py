@@ -19,13 +19,16 @@ from pyfr.util import digest, mv, rm
 class OpenMPCompiler:
     _dir_seq = it.count()
 
-    def __init__(self, cfg):
+    def __init__(self, cfg, fastmath=True):
         # Find GCC (or a compatible alternative)
         self.cc = cfg.getpath('backend-openmp', 'cc', 'cc')
 
         # User specified compiler flags
         self.cflags = shlex.split(cfg.get('backend-openmp', 'cflags', ''))
 
+        # If to permit value-unsafe floating point optimisations
+        self.fastmath = fastmath
+
         # Get the processor string
         self.proc = platform.processor()
 
@@ -76,7 +79,10 @@ class OpenMPCompiler:
             self.cc,                # Compiler name
             '-shared',              # Create a shared library
             '-std=c99',             # Enable C99 support
-            '-Ofast',               # Optimise, incl. -ffast-math
+            *(['-Ofast']            # Optimise, incl. -ffast-math
+              if self.fastmath else
+              ['-O3',               # Optimise, excl. -ffast-math
+               '-ffp-contract=off']),
             '-march=native',        # Use CPU-specific instructions
             '-fopenmp',             # Enable OpenMP support
             '-fPIC',                # Generate position-independent code
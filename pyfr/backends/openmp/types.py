@@ -28,8 +28,8 @@ class OpenMPMatrixBase(base.MatrixBase):
         # Remove
         del self._initval
 
-    def _get(self):
-        return self._unpack(self.data)
+    def _get(self, out=None):
+        return self._unpack(self.data, out)
 
     def _set(self, ary):
         self.data[:] = self._pack(ary)
@@ -49,15 +49,20 @@ class BaseIntegrator:
         # Extract the UUID of the mesh (to be saved with solutions)
         self.mesh_uuid = mesh['mesh_uuid']
 
-        # Solution cache
+        # Solution cache and its persistent host buffers
         self._curr_soln = None
+        self._soln_bufs = None
 
-        # Solution gradients cache
+        # Solution gradients cache and its persistent host buffers
         self._curr_grad_soln = None
+        self._grad_soln_bufs = None
 
         # Record the starting wall clock time
         self._wstart = time.time()
 
+        # Wall clock time spent in plugins
+        self.plugin_wtime = 0.0
+
         # Abort computation
         self.abort = False
 
@@ -104,6 +109,15 @@ class BaseIntegrator:
             if not tlist or t - tlist[-1] > self.dtmin:
                 tlist.append(t)
 
+    def _run_plugins(self):
+        wstart = time.perf_counter()
+
+        # Fire off the event handlers
+        for csh in self.completed_step_handlers:
+            csh(self)
+
+        self.plugin_wtime += time.perf_counter() - wstart
+
     def step(self, t, dt):
         pass
 
@@ -114,6 +128,48 @@ class BaseIntegrator:
         for t in self.tlist:
             self.advance_to(t)
 
+        self._finalise_plugins()
+
+    def _finalise_plugins(self):
+        # Allow plugins to complete any outstanding work
+        for csh in self.completed_step_handlers:
+            if (finalise := getattr(csh, 'finalise', None)):
+                finalise(self)
+
+    @property
+    def soln(self):
+        system = self.system
+
+        if not self._curr_soln:
+            # Allocate our host buffers on first use
+            if not self._soln_bufs:
+                self._soln_bufs = [np.empty(eb[0].ioshape, eb[0].dtype)
+                                   for eb in system.ele_banks]
+
+            self._curr_soln = system.ele_scal_upts(self._idxcurr,
+                                                   out=self._soln_bufs)
+
+        return self._curr_soln
+
+    @property
+    def grad_soln(self):
+        system = self.system
+
+        if not self._curr_grad_soln:
+            system.compute_grads(self.tcurr, self._idxcurr)
+
+            # Allocate our host buffers on first use
+            if not self._grad_soln_bufs:
+                self._grad_soln_bufs = [np.empty(e.ioshape, e.dtype)
+                                        for e in system.eles_vect_upts]
+
+            self._curr_grad_soln = [
+                e.get(b)
+                for e, b in zip(system.eles_vect_upts, self._grad_soln_bufs)
+            ]
+
+        return self._curr_grad_soln
+
     @property
     def nsteps(self):
         return self.nacptsteps + self.nrjctsteps
@@ -161,6 +217,9 @@ class BaseIntegrator:
     def _check_abort(self):
         comm, rank, root = get_comm_rank_root()
         if comm.allreduce(self.abort, op=mpi.LOR):
+            # Ensure any pending output is on disk before stopping
+            self._finalise_plugins()
+
             # Ensure that the callbacks registered in atexit
             # are called only once if stopping the computation
             sys.exit(1)
@@ -33,23 +33,8 @@ class BaseDualIntegrator(BaseIntegrator):
         return self.pseudointegrator.pseudostepinfo
 
     @property
-    def soln(self):
-        if not self._curr_soln:
-            self._curr_soln = self.system.ele_scal_upts(
-                self.pseudointegrator._idxcurr
-            )
-
-        return self._curr_soln
-
-    @property
-    def grad_soln(self):
-        system = self.system
-
-        if not self._curr_grad_soln:
-            system.compute_grads(self.tcurr, self.pseudointegrator._idxcurr)
-            self._curr_grad_soln = [e.get() for e in system.eles_vect_upts]
-
-        return self._curr_grad_soln
+    def _idxcurr(self):
+        return self.pseudointegrator._idxcurr
 
     def call_plugin_dt(self, dt):
         rem = math.fmod(dt, self._dt)
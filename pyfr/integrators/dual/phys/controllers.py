@@ -12,8 +12,7 @@ class BaseDualController(BaseDualIntegrator):
 
         # Fire off any event handlers if not restarting
         if not self.isrestart:
-            for csh in self.completed_step_handlers:
-                csh(self)
+            self._run_plugins()
 
     def _accept_step(self, idxcurr):
         self.tcurr += self._dt
@@ -31,8 +30,7 @@ class BaseDualController(BaseDualIntegrator):
         self._curr_grad_soln = None
 
         # Fire off any event handlers
-        for csh in self.completed_step_handlers:
-            csh(self)
+        self._run_plugins()
 
         # Abort if plugins request it
         self._check_abort()
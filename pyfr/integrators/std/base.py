@@ -39,23 +39,6 @@ class BaseStdIntegrator(BaseCommon, BaseIntegrator):
         # Delete the memory-intensive elements map from the system
         del self.system.ele_map
 
-    @property
-    def soln(self):
-        if not self._curr_soln:
-            self._curr_soln = self.system.ele_scal_upts(self._idxcurr)
-
-        return self._curr_soln
-
-    @property
-    def grad_soln(self):
-        system = self.system
-
-        if not self._curr_grad_soln:
-            system.compute_grads(self.tcurr, self._idxcurr)
-            self._curr_grad_soln = [e.get() for e in system.eles_vect_upts]
-
-        return self._curr_grad_soln
-
     @property
     def controller_needs_errest(self):
         pass
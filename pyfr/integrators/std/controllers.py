@@ -20,8 +20,7 @@ class BaseStdController(BaseStdIntegrator):
 
         # Fire off any event handlers if not restarting
         if not self.isrestart:
-            for csh in self.completed_step_handlers:
-                csh(self)
+            self._run_plugins()
 
     def _accept_step(self, dt, idxcurr, err=None):
         self.tcurr += dt
@@ -42,8 +41,7 @@ class BaseStdController(BaseStdIntegrator):
         self._curr_grad_soln = None
 
         # Fire off any event handlers
-        for csh in self.completed_step_handlers:
-            csh(self)
+        self._run_plugins()
 
         # Abort if plugins request it
         self._check_abort()
@@ -1,8 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import ast
 import ctypes as ct
 import functools as ft
-import itertools as it
 import re
 
 import numpy as np
@@ -66,21 +66,179 @@ _npeval_syms = {
 }
 
 
-def npeval(expr, locals):
-    # Disallow direct exponentiation
-    if '^' in expr or '**' in expr:
-        raise ValueError('Direct exponentiation is not supported; use pow')
-
-    # Ensure the expression does not contain invalid characters
-    if not re.match(r'[A-Za-z0-9_ \t\n\r.,+\-*/%()]+$', expr):
-        raise ValueError('Invalid characters in expression')
+_npeval_cfuns = {
+    'exp': 'exp', 'log': 'log',
+    'sin': 'sin', 'asin': 'asin',
+    'cos': 'cos', 'acos': 'acos',
+    'tan': 'tan', 'atan': 'atan', 'atan2': 'atan2',
+    'abs': 'fabs', 'pow': 'pow', 'sqrt': 'sqrt',
+    'tanh': 'tanh',
+    'max': 'fmax', 'min': 'fmin'
+}
 
-    # Disallow access to object attributes
-    objs = '|'.join(it.chain(_npeval_syms, locals))
-    if re.search(rf'({objs}|\))\s*\.', expr):
-        raise ValueError('Invalid expression')
 
-    return eval(expr, _npeval_syms, locals)
+class _NPEvalExpr:
+    _binops = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}
+    _unops = {ast.UAdd: '+', ast.USub: '-'}
+
+    # Shared compilers; set to False should compilation prove unavailable
+    _compilers = {}
+
+    def __init__(self, expr):
+        # Disallow direct exponentiation
+        if '^' in expr or '**' in expr:
+            raise ValueError('Direct exponentiation is not supported; use '
+                             'pow')
+
+        # Ensure the expression does not contain invalid characters
+        if not re.match(r'[A-Za-z0-9_ \t\n\r.,+\-*/%()]+$', expr):
+            raise ValueError('Invalid characters in expression')
+
+        # Parse the expression
+        try:
+            tree = ast.parse(expr.strip(), mode='eval')
+        except SyntaxError:
+            raise ValueError('Invalid expression') from None
+
+        # Validate the syntax tree while translating it into C
+        self.names = set()
+        self.cexpr = self._to_c(tree.body)
+
+        # Compile the expression for evaluation by Python
+        self.code = compile(tree, '<npeval>', 'eval')
+
+        # Compiled C functions, keyed by which arguments are arrays
+        self._cfuns = {}
+
+    def _to_c(self, node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in {int, float}:
+                raise ValueError('Invalid expression')
+
+            return repr(float(node.value))
+        elif isinstance(node, ast.Name):
+            if node.id == 'pi':
+                return repr(np.pi)
+            elif node.id in _npeval_syms:
+                raise ValueError('Invalid expression')
+
+            self.names.add(node.id)
+            return f'v_{node.id}'
+        elif isinstance(node, ast.UnaryOp) and type(node.op) in self._unops:
+            return f'({self._unops[type(node.op)]}{self._to_c(node.operand)})'
+        elif isinstance(node, ast.BinOp) and type(node.op) in self._binops:
+            l, r = self._to_c(node.left), self._to_c(node.right)
+            return f'({l} {self._binops[type(node.op)]} {r})'
+        elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
+            # Python semantics where the result takes the sign of r
+            l, r = self._to_c(node.left), self._to_c(node.right)
+            return f'pymod({l}, {r})'
+        elif (isinstance(node, ast.Call) and not node.keywords and
+              getattr(node.func, 'id', None) in _npeval_cfuns):
+            args = ', '.join(self._to_c(a) for a in node.args)
+            return f'{_npeval_cfuns[node.func.id]}({args})'
+        else:
+            raise ValueError('Invalid expression')
+
+    def _get_compiler(self, cfg):
+        from pyfr.backends.openmp.compiler import OpenMPCompiler
+        from pyfr.inifile import Inifile
+
+        cfg = cfg or Inifile()
+        ckey = (cfg.get('backend-openmp', 'cc', 'cc'),
+                cfg.get('backend-openmp', 'cflags', ''))
+
+        # Construct the compiler; without fast math so as to be consistent
+        # with NumPy
+        if ckey not in self._compilers:
+            try:
+                compiler = OpenMPCompiler(cfg, fastmath=False)
+            except OSError:
+                compiler = False
+
+            self._compilers[ckey] = compiler
+
+        return ckey, self._compilers[ckey]
+
+    def _get_cfun(self, arrnames, scalnames, cfg):
+        ckey, compiler = self._get_compiler(cfg)
+        key = (ckey, arrnames, scalnames)
+
+        if key not in self._cfuns:
+            if not compiler:
+                return
+
+            params = ['long n', 'double *restrict out']
+            params += [f'const double *restrict a_{n}' for n in arrnames]
+            params += [f'double v_{n}' for n in scalnames]
+
+            loads = ''.join(f'const double v_{n} = a_{n}[i]; '
+                            for n in arrnames)
+
+            src = (
+                '#include <math.h>\n'
+                'static inline double pymod(double a, double b)\n'
+                '{\n'
+                '    double m = fmod(a, b);\n'
+                '    return m ? ((m < 0) != (b < 0) ? m + b : m) '
+                ': copysign(0.0, b);\n'
+                '}\n'
+                f'void npeval({", ".join(params)})\n'
+                '{\n'
+                '    #pragma omp parallel for simd\n'
+                '    for (long i = 0; i < n; i++)\n'
+                f'    {{ {loads}out[i] = {self.cexpr}; }}\n'
+                '}\n'
+            )
+
+            argtypes = [ct.c_long, ct.c_void_p]
+            argtypes += [ct.c_void_p]*len(arrnames)
+            argtypes += [ct.c_double]*len(scalnames)
+
+            try:
+                lib = compiler.build(src)
+                fun = lib.function('npeval', None, argtypes)
+            except OSError:
+                fun = None
+
+            self._cfuns[key] = fun
+
+        return self._cfuns[key]
+
+    def __call__(self, locals, cfg=None):
+        # Ensure all of the variables are defined
+        for n in self.names - locals.keys():
+            raise NameError(f"name '{n}' is not defined")
+
+        # Partition the variables into arrays and scalars
+        vals = {n: locals[n] for n in sorted(self.names)}
+        arrnames = tuple(n for n, v in vals.items() if np.ndim(v))
+        scalnames = tuple(n for n, v in vals.items() if not np.ndim(v))
+
+        # Where possible evaluate the expression in a single fused pass
+        if arrnames and (fun := self._get_cfun(arrnames, scalnames, cfg)):
+            shape = np.broadcast_shapes(*(np.shape(vals[n]) for n in arrnames))
+            arrs = [np.ascontiguousarray(np.broadcast_to(vals[n], shape),
+                                         dtype=np.float64)
+                    for n in arrnames]
+            out = np.empty(shape)
+
+            fun(out.size, out.ctypes.data, *(a.ctypes.data for a in arrs),
+                *(float(vals[n]) for n in scalnames))
+
+            return out
+        # Otherwise, fall back to NumPy
+        else:
+            return eval(self.code, _npeval_syms, vals)
+
+
+@ft.lru_cache(maxsize=None)
+def _npeval_parse(expr):
+    return _NPEvalExpr(expr)
+
+
+def npeval(expr, locals, cfg=None):
+    return _npeval_parse(expr)(locals, cfg)
 
 
 def fuzzysort(arr, idx, dim=0, tol=1e-6):
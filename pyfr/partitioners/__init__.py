@@ -1,10 +1,18 @@
 # -*- coding: utf-8 -*-
 
 from pyfr.partitioners.base import BasePartitioner
+from pyfr.partitioners.geometric import GeometricPartitioner
 from pyfr.partitioners.metis import METISPartitioner
+from pyfr.partitioners.parallel import BaseParallelPartitioner
+from pyfr.partitioners.parmetis import ParMETISPartitioner
+from pyfr.partitioners.ptscotch import PTSCOTCHPartitioner
 from pyfr.partitioners.scotch import SCOTCHPartitioner
 from pyfr.util import subclass_where
 
 
 def get_partitioner(name, *args, **kwargs):
     return subclass_where(BasePartitioner, name=name)(*args, **kwargs)
+
+
+def get_parallel_partitioner(name, *args, **kwargs):
+    return subclass_where(BaseParallelPartitioner, name=name)(*args, **kwargs)
@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 
-from collections import Counter, defaultdict, namedtuple
+from collections import defaultdict, namedtuple
 import itertools as it
 import re
 import uuid
@@ -13,6 +13,55 @@ from pyfr.inifile import Inifile
 Graph = namedtuple('Graph', ['vtab', 'etab', 'vwts', 'ewts'])
 
 
+def encode_con(con, eoffs):
+    codes = con['f1'].astype(np.int64)
+
+    for etype, off in eoffs.items():
+        codes[con['f0'] == etype] += off
+
+    return codes
+
+
+def group_by(keys, *sortkeys):
+    # Sort by key retaining the existing order within each key
+    idx = np.lexsort((*sortkeys, keys))
+
+    ukeys, start = np.unique(keys[idx], return_index=True)
+
+    return zip(ukeys.tolist(), np.split(idx, start[1:]))
+
+
+def ele_weights(elewts, etype, linf):
+    # Curved elements may be given their own weight
+    cwt = elewts.get(f'{etype}-curved', elewts[etype])
+
+    return np.where(linf, elewts[etype], cwt)
+
+
+def union_find(n, pairs):
+    # Disjoint-set forest over n items
+    parent, size = list(range(n)), [1]*n
+
+    def find(i):
+        # Path halving
+        while parent[i] != i:
+            parent[i] = i = parent[parent[i]]
+
+        return i
+
+    # Union the items in each pair
+    for l, r in pairs.T.tolist():
+        if (l := find(l)) != (r := find(r)):
+            if size[l] > size[r]:
+                l, r = r, l
+
+            parent[l] = r
+            size[r] += size[l]
+
+    # Representative of the set containing each item
+    return np.array([find(i) for i in range(n)], dtype=int)
+
+
 class BasePartitioner:
     def __init__(self, partwts, elewts, nsubeles=64, opts={}):
         self.partwts = partwts
@@ -38,15 +87,18 @@ class BasePartitioner:
         spts = defaultdict(list)
         linf = defaultdict(list)
         offs = defaultdict(dict)
-        rnum = defaultdict(dict)
+        rnum = {}
 
         for en, pn in pinf.items():
             for i, n in enumerate(pn):
                 if n > 0:
-                    offs[en][i] = off = sum(s.shape[1] for s in spts[en])
+                    offs[en][i] = sum(s.shape[1] for s in spts[en])
                     spts[en].append(mesh[f'spt_{en}_p{i}'])
                     linf[en].append(mesh[f'spt_{en}_p{i}', 'linear'])
-                    rnum[en].update(((i, j), (0, off + j)) for j in range(n))
+
+            # Original partition and index of each combined element
+            rnum[en] = (np.repeat(np.arange(len(pn)), pn),
+                        np.concatenate([np.arange(n) for n in pn]))
 
         def offset_con(con, pr):
             con = con.copy().astype('U4,i4,i1,i2')
@@ -77,6 +129,8 @@ class BasePartitioner:
                 if (r, l) in mpicon:
                     rcon = mpicon.pop((r, l))
                     intcon.append(np.vstack([lcon, rcon]))
+
+                    nintcon += intcon[-1].shape[1]
                 else:
                     mpicon[l, r] = lcon
             elif (bc := re.match(r'bcon_(.+?)_p(\d+)$', f)):
@@ -109,241 +163,209 @@ class BasePartitioner:
 
         return {k: np.dstack(v) for k, v in newsoln.items()}
 
-    def _construct_graph(self, con, exwts={}):
+    def _ele_offsets(self, mesh):
+        # Number of elements of each type
+        ecounts = {m[1]: mesh[f].shape[1] for f in mesh
+                   if isinstance(f, str)
+                   and (m := re.match(r'spt_(.+?)_p0$', f))}
+
+        # Number the elements consecutively across all types
+        eoffs = dict(zip(ecounts, it.accumulate(ecounts.values(), initial=0)))
+
+        return ecounts, eoffs
+
+    def _construct_graph(self, con, vwts):
         # Edges of the dual graph
-        con = con[['f0', 'f1']]
-        con = np.hstack([con, con[::-1]])
+        lhs, rhs = np.hstack([con, con[::-1]])
 
-        # Sort by the left hand side
-        idx = np.lexsort([con['f0'][0], con['f1'][0]])
-        con = con[:, idx]
+        # Distinct vertices and their degrees
+        vetimap, lhs, vdeg = np.unique(lhs, return_inverse=True,
+                                       return_counts=True)
 
-        # Left and right hand side element types/indicies
-        lhs, rhs = con
+        # Sort the edges by their left hand side
+        idx = np.argsort(lhs, kind='stable')
 
         # Compute vertex offsets
-        vtab = np.where(lhs[1:] != lhs[:-1])[0]
-        vtab = np.concatenate(([0], vtab + 1, [len(lhs)]))
-
-        # Compute the element type/index to vertex number map
-        vetimap = lhs[vtab[:-1]].tolist()
-        etivmap = {k: v for v, k in enumerate(vetimap)}
+        vtab = np.concatenate(([0], np.cumsum(vdeg)))
 
         # Prepare the edges and their weights
-        etab = np.array([etivmap[r] for r in rhs.tolist()])
+        etab = np.searchsorted(vetimap, rhs[idx])
         ewts = np.ones_like(etab)
 
-        # Prepare the vertex weights
-        vwts = np.array([exwts.get(ti, self.elewts[ti[0]]) for ti in vetimap])
-
-        return Graph(vtab, etab, vwts, ewts), vetimap
+        return Graph(vtab, etab, vwts[vetimap], ewts), vetimap
 
     def _partition_graph(self, graph, partwts):
         pass
 
-    def _group_periodic_eles(self, mesh):
-        con = mesh['con_p0'][['f0', 'f1']]
-        pmerge, pnames = {}, {}
-
+    def _group_periodic_eles(self, mesh, con, vwts):
         # Extract the periodic connectivity from the mesh
-        for f, v in mesh.items():
-            if f[0] == 'con_p0' and f[1].startswith('periodic'):
-                for i, (l, r) in zip(v, con[:, v].T.tolist()):
-                    pnames[i] = f[1]
-                    if l != r:
-                        if l in pmerge and r in pmerge:
-                            pr = pmerge[r]
-                            for ll, rr in pmerge.items():
-                                if rr == pr:
-                                    pmerge[ll] = pmerge[l]
-                            pmerge[pr] = pmerge[l]
-                        elif l in pmerge:
-                            if r != pmerge[l]:
-                                pmerge[r] = pmerge[l]
-                        elif r in pmerge:
-                            if l != pmerge[r]:
-                                pmerge[l] = pmerge[r]
-                        else:
-                            pmerge[l] = r
-
-        if pmerge:
+        pnames = {f[1]: v for f, v in mesh.items()
+                  if f[0] == 'con_p0' and f[1].startswith('periodic')}
+
+        # Map from each element to the element it has been merged into
+        pmap = np.arange(len(vwts))
+
+        if pnames:
+            pidx = np.concatenate(list(pnames.values()))
+
+            # Compactly number the elements with periodic faces
+            peles, pcon = np.unique(con[:, pidx], return_inverse=True)
+            pcon = pcon.reshape(2, -1)
+
+            # Merge elements which are connected by periodic faces
+            pmap[peles] = peles[union_find(len(peles), pcon)]
+
             # Eliminate periodic connectivity
-            con = np.delete(con, list(pnames), axis=1)
+            con = np.delete(con, pidx, axis=1)
 
             # Merge the associated elements
-            for i, (l, r) in enumerate(con.T.tolist()):
-                if l in pmerge:
-                    con[0, i] = pmerge[l]
-                if r in pmerge:
-                    con[1, i] = pmerge[r]
-
-        # Tally up the weights for the merged elements
-        exwts = {(t, i): self.elewts[t] for t, i in set(pmerge.values())}
-        for (lt, li), r in pmerge.items():
-            exwts[r] += self.elewts[lt]
-
-        return con, exwts, pmerge, pnames
-
-    def _ungroup_periodic_eles(self, pmerge, vetimap, vparts):
-        # Invert the merge dictionary
-        punmerge = defaultdict(list)
-        for l, r in pmerge.items():
-            punmerge[r].append(l)
-
-        # Create new vertices for the unmerged periodic elements
-        vnetimap, vnparts = list(vetimap), list(vparts)
-        for i, j in enumerate(vetimap):
-            if j in punmerge:
-                for k in punmerge[j]:
-                    vnetimap.append(k)
-                    vnparts.append(vparts[i])
-
-        return vnetimap, vnparts
-
-    def _renumber_verts(self, mesh, vetimap, vparts):
-        pscon = [[] for i in range(self.nparts)]
-        vpartmap, bndeti = dict(zip(vetimap, vparts)), set()
-
-        # Construct per-partition connectivity arrays and tag elements
-        # which are on partition boundaries
-        for l, r in zip(*mesh['con_p0'][['f0', 'f1']].tolist()):
-            if vpartmap[l] == vpartmap[r]:
-                pscon[vpartmap[l]].append([l, r])
-            else:
-                pscon[vpartmap[l]].append([l, r])
-                pscon[vpartmap[r]].append([l, r])
-                bndeti |= {l, r}
+            con = pmap[con]
 
-        # Start by assigning the lowest numbers to these boundary elements
-        nvetimap, nvparts = list(bndeti), [vpartmap[eti] for eti in bndeti]
+            # Tally up the weights for the merged elements
+            merged = pmap != np.arange(len(pmap))
+            vwts = vwts.copy()
+            np.add.at(vwts, pmap[merged], vwts[merged])
 
-        # Use sub-partitioning to assign interior element numbers
-        for part, scon in enumerate(pscon):
+        return con, vwts, pmap, pnames
+
+    def _ungroup_periodic_eles(self, pmap, vetimap, vparts):
+        eparts = np.full(len(pmap), -1)
+        eparts[vetimap] = vparts
+
+        # Place unmerged periodic elements alongside their partners
+        return eparts[pmap]
+
+    def _renumber_verts(self, con, eparts, etidx, vwts, linf):
+        lparts, rparts = eparts[con]
+
+        # Tag elements which are on partition boundaries
+        pbnd = lparts != rparts
+        bnd = np.zeros(len(eparts), dtype=bool)
+        bnd[con[:, pbnd]] = True
+
+        # Construct per-partition connectivity arrays; faces on partition
+        # boundaries are present in the arrays of both partitions
+        fparts = np.concatenate([lparts, rparts[pbnd]])
+        fcon = np.hstack([con, con[:, pbnd]])
+
+        # Use sub-partitioning to order the interior elements
+        spart = np.zeros(len(eparts), dtype=int)
+        for part, fidx in group_by(fparts):
             # Construct a graph for this partition
-            scon = np.array(scon, dtype='U4,i4').T
-            sgraph, svetimap = self._construct_graph(scon)
+            sgraph, svetimap = self._construct_graph(fcon[:, fidx], vwts)
 
             # Determine the number of sub-partitions
             nsp = len(svetimap) // self.nsubeles + 1
 
             # Partition the graph
-            if nsp == 1:
-                svparts = [0]*len(svetimap)
-            else:
+            if nsp > 1:
                 svparts = self._partition_graph(sgraph, [1]*nsp)
 
-            # Group elements according to their type (linear vs curved)
-            # and sub-partition number
-            linsvetimap = [[] for i in range(nsp)]
-            cursvetimap = [[] for i in range(nsp)]
-            for (etype, eidx), spart in zip(svetimap, svparts):
-                if (etype, eidx) in bndeti:
-                    continue
-
-                if mesh[f'spt_{etype}_p0', 'linear'][eidx]:
-                    linsvetimap[spart].append((etype, eidx))
-                else:
-                    cursvetimap[spart].append((etype, eidx))
+                pmask = eparts[svetimap] == part
+                spart[svetimap[pmask]] = svparts[pmask]
 
-            # Append to the global list
-            nvetimap.extend(it.chain(*cursvetimap, *linsvetimap))
-            nvparts.extend([part]*sum(map(len, cursvetimap + linsvetimap)))
+        # Order elements by partition; with boundary elements first and
+        # interior elements grouped by type (curved vs linear) and then
+        # sub-partition number
+        ecls = np.where(bnd, 0, np.where(linf, 2, 1))
+        spart[bnd] = 0
+        order = np.lexsort((spart, ecls, eparts))
 
-        return nvetimap, nvparts
+        # From this obtain the index of each element in its partition
+        lidx = np.empty(len(eparts), dtype=int)
+        for k, idx in group_by(etidx[order]*self.nparts + eparts[order]):
+            lidx[order[idx]] = np.arange(len(idx))
 
-    def _partition_spts(self, mesh, vetimap, vparts):
-        spt_px = defaultdict(list)
-        lin_px = defaultdict(list)
+        return lidx
 
-        for (etype, eidxg), part in zip(vetimap, vparts):
-            f = f'spt_{etype}_p0'
+    def _partition_eles(self, arr, eparts, lidx):
+        # Sort the elements by partition and then local index
+        idx = np.lexsort((lidx, eparts))
+        parts, start = np.unique(eparts[idx], return_index=True)
 
-            spt_px[etype, part].append(mesh[f][:, eidxg, :])
-            lin_px[etype, part].append(mesh[f, 'linear'][eidxg])
+        return zip(parts.tolist(), np.split(arr[..., idx], start[1:], axis=-1))
 
+    def _partition_spts(self, mesh, eoffs, eparts, lidx):
         newmesh = {}
-        for etype, pn in spt_px:
-            f = f'spt_{etype}_p{pn}'
-
-            newmesh[f] = np.array(spt_px[etype, pn]).swapaxes(0, 1)
-            newmesh[f, 'linear'] = np.array(lin_px[etype, pn])
 
-        return newmesh
+        for etype, off in eoffs.items():
+            spt = mesh[f'spt_{etype}_p0']
+            lin = mesh[f'spt_{etype}_p0', 'linear']
 
-    def _partition_soln(self, soln, prefix, vetimap, vparts):
-        soln_px = defaultdict(list)
-        for (etype, eidxg), part in zip(vetimap, vparts):
-            f = f'{prefix}_{etype}_p0'
+            # Partition and local index of each element of this type
+            s = slice(off, off + len(lin))
+            ep, el = eparts[s], lidx[s]
 
-            soln_px[etype, part].append(soln[f][..., eidxg])
+            for pn, v in self._partition_eles(spt.swapaxes(1, 2), ep, el):
+                newmesh[f'spt_{etype}_p{pn}'] = v.swapaxes(1, 2)
 
-        return {f'{prefix}_{etype}_p{pn}': np.dstack(v)
-                for (etype, pn), v in soln_px.items()}
+            for pn, v in self._partition_eles(lin, ep, el):
+                newmesh[f'spt_{etype}_p{pn}', 'linear'] = v
 
-    def _partition_con(self, mesh, vetimap, vparts, pnames):
-        con_px = defaultdict(list)
-        con_pxpy = defaultdict(list)
-        con_px_periodic = defaultdict(lambda: defaultdict(list))
-        bcon_px = defaultdict(list)
+        return newmesh
 
-        # Global-to-local element index map
-        eleglmap = {}
-        pcounter = Counter()
+    def _partition_soln(self, soln, prefix, eoffs, eparts, lidx):
+        newsoln = {}
 
-        for (etype, eidxg), part in zip(vetimap, vparts):
-            eleglmap[etype, eidxg] = (part, pcounter[etype, part])
-            pcounter[etype, part] += 1
+        for etype, off in eoffs.items():
+            f = f'{prefix}_{etype}_p0'
+            s = slice(off, off + soln[f].shape[-1])
 
-        # Generate the face connectivity
-        for i, (l, r) in enumerate(mesh['con_p0'].T.tolist()):
-            letype, leidxg, lfidx, lflags = l
-            retype, reidxg, rfidx, rflags = r
+            for pn, v in self._partition_eles(soln[f], eparts[s], lidx[s]):
+                newsoln[f'{prefix}_{etype}_p{pn}'] = v
 
-            lpart, leidxl = eleglmap[letype, leidxg]
-            rpart, reidxl = eleglmap[retype, reidxg]
+        return newsoln
 
-            conl = (letype, leidxl, lfidx, lflags)
-            conr = (retype, reidxl, rfidx, rflags)
+    def _partition_con(self, mesh, eoffs, eparts, lidx, pnames):
+        # Output data type
+        dtype = 'S4,i4,i1,i2'
 
-            if lpart == rpart:
-                # If this face is periodic, then tag it as such
-                if (pname := pnames.get(i, None)):
-                    con_px_periodic[lpart][pname].append(len(con_px[lpart]))
+        # Output
+        con = {}
 
-                con_px[lpart].append([conl, conr])
-            else:
-                con_pxpy[lpart, rpart].append(conl)
-                con_pxpy[rpart, lpart].append(conr)
+        # Map the face connectivity onto local element indices
+        gcon = encode_con(mesh['con_p0'], eoffs)
+        lcon = mesh['con_p0'].astype(dtype)
+        lcon['f1'] = lidx[gcon]
 
-        # Generate boundary conditions
-        for f in filter(lambda f: isinstance(f, str), mesh):
-            if (m := re.match('bcon_(.+?)_p0$', f)):
-                for lpetype, leidxg, lfidx, lflags in mesh[f].tolist():
-                    lpart, leidxl = eleglmap[lpetype, leidxg]
-                    conl = (lpetype, leidxl, lfidx, lflags)
+        lparts, rparts = eparts[gcon]
 
-                    bcon_px[m[1], lpart].append(conl)
+        # Generate the internal connectivity
+        fidx = np.flatnonzero(lparts == rparts)
+        fpos = np.empty(len(lparts), dtype=int)
 
-        # Output data type
-        dtype = 'S4,i4,i1,i2'
+        for px, idx in group_by(lparts[fidx]):
+            con[f'con_p{px}'] = lcon[:, fidx[idx]]
+            fpos[fidx[idx]] = np.arange(len(idx))
 
-        # Output
-        con = {}
+        # Tag any periodic faces
+        for name, pidx in pnames.items():
+            for px, idx in group_by(lparts[pidx]):
+                con[f'con_p{px}', name] = fpos[pidx[idx]]
 
-        for px, v in con_px.items():
-            con[f'con_p{px}'] = np.array(v, dtype=dtype).T
+        # Generate the MPI connectivity; each face appears once in both of
+        # the associated arrays at the same position
+        fidx = np.flatnonzero(lparts != rparts)
+        fidx2 = np.concatenate([fidx, fidx])
+        pxpy = np.concatenate([lparts[fidx]*self.nparts + rparts[fidx],
+                               rparts[fidx]*self.nparts + lparts[fidx]])
+        conxy = np.concatenate([lcon[0, fidx], lcon[1, fidx]])
 
-        for (px, py), v in con_pxpy.items():
-            con[f'con_p{px}p{py}'] = np.array(v, dtype=dtype)
+        for k, idx in group_by(pxpy, fidx2):
+            px, py = divmod(k, self.nparts)
+            con[f'con_p{px}p{py}'] = conxy[idx]
 
-        for (etype, px), v in bcon_px.items():
-            con[f'bcon_{etype}_p{px}'] = np.array(v, dtype=dtype)
+        # Generate boundary conditions
+        for f in filter(lambda f: isinstance(f, str), mesh):
+            if (m := re.match('bcon_(.+?)_p0$', f)):
+                gbcon = encode_con(mesh[f], eoffs)
+                lbcon = mesh[f].astype(dtype)
+                lbcon['f1'] = lidx[gbcon]
 
-        for px, v in con_px_periodic.items():
-            for name, idxs in v.items():
-                con[f'con_p{px}', name] = np.array(idxs)
+                for px, idx in group_by(eparts[gbcon]):
+                    con[f'bcon_{m[1]}_p{px}'] = lbcon[idx]
 
-        return con, eleglmap
+        return con
 
     def partition(self, mesh):
         # Extract the current UUID from the mesh
@@ -352,38 +374,51 @@ class BasePartitioner:
         # Combine any pre-existing partitions
         mesh, rnum = self._combine_mesh_parts(mesh)
 
+        # Number the elements and encode the connectivity in terms of this
+        ecounts, eoffs = self._ele_offsets(mesh)
+        con = encode_con(mesh['con_p0'], eoffs)
+
+        # Type, linearity, and weight of each element
+        etidx = np.repeat(np.arange(len(ecounts)), list(ecounts.values()))
+        linfs = {et: mesh[f'spt_{et}_p0', 'linear'] for et in ecounts}
+        linf = np.concatenate(list(linfs.values()))
+        vwts = np.concatenate([ele_weights(self.elewts, et, l)
+                               for et, l in linfs.items()])
+
         # Merge periodic elements
-        con, exwts, pmerge, pnames = self._group_periodic_eles(mesh)
+        pcon, pwts, pmap, pnames = self._group_periodic_eles(mesh, con, vwts)
 
         # Obtain the dual graph for this mesh
-        graph, vetimap = self._construct_graph(con, exwts=exwts)
+        graph, vetimap = self._construct_graph(pcon, pwts)
 
         # Partition the graph
         if self.nparts > 1:
-            vparts = self._partition_graph(graph, self.partwts).tolist()
+            vparts = np.asarray(self._partition_graph(graph, self.partwts))
 
-            if (n := len(set(vparts))) != self.nparts:
+            if (n := len(np.unique(vparts))) != self.nparts:
                 raise RuntimeError(f'Partitioner error: mesh has {n} parts '
                                    f'versus goal of {self.nparts}')
         else:
-            vparts = [0]*len(vetimap)
+            vparts = np.zeros(len(vetimap), dtype=int)
 
         # Unmerge periodic elements
-        vetimap, vparts = self._ungroup_periodic_eles(pmerge, vetimap, vparts)
+        eparts = self._ungroup_periodic_eles(pmap, vetimap, vparts)
 
         # Renumber vertices
-        vetimap, vparts = self._renumber_verts(mesh, vetimap, vparts)
+        lidx = self._renumber_verts(con, eparts, etidx, vwts, linf)
 
         # Partition the connectivity portion of the mesh
-        newmesh, eleglmap = self._partition_con(mesh, vetimap, vparts, pnames)
+        newmesh = self._partition_con(mesh, eoffs, eparts, lidx, pnames)
 
         # Handle the shape points
-        newmesh |= self._partition_spts(mesh, vetimap, vparts)
+        newmesh |= self._partition_spts(mesh, eoffs, eparts, lidx)
+
+        # Generate the renumbering table
+        for etype, (pold, iold) in rnum.items():
+            s = slice(eoffs[etype], eoffs[etype] + len(pold))
 
-        # Update the renumbering table
-        for etype, emap in rnum.items():
-            for k, (pidx, eidx) in emap.items():
-                emap[k] = eleglmap[etype, eidx]
+            rnum[etype] = dict(zip(zip(pold.tolist(), iold.tolist()),
+                                   zip(eparts[s].tolist(), lidx[s].tolist())))
 
         # Generate a new UUID for the mesh
         newmesh['mesh_uuid'] = newuuid = str(uuid.uuid4())
@@ -399,7 +434,8 @@ class BasePartitioner:
 
             # Combine and repartition the solution
             newsoln = self._combine_soln_parts(soln, prefix)
-            newsoln = self._partition_soln(newsoln, prefix, vetimap, vparts)
+            newsoln = self._partition_soln(newsoln, prefix, eoffs, eparts,
+                                           lidx)
 
             # Copy over the metadata
             for f in soln:
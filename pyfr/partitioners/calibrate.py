@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import inspect
+import time
+
+import numpy as np
+
+from pyfr.backends.base import NullKernel
+from pyfr.shapes import BaseShape
+from pyfr.solvers.base import BaseSystem
+from pyfr.util import subclass_where, subclasses
+
+
+def _ele_kernels(eles):
+    kerns = []
+
+    for kn, kgetter in eles.kernels.items():
+        # Skip private kernels
+        if kn.startswith('_'):
+            continue
+
+        # Have any uin and fout arguments refer to distinct banks
+        params = inspect.signature(kgetter).parameters
+        kern = kgetter(**{p: int(p == 'fout') for p in params})
+
+        if isinstance(kern, NullKernel):
+            continue
+
+        # Bind any runtime arguments
+        if hasattr(kern, 'bind'):
+            kern.bind(t=0.0)
+
+        kerns.append(kern)
+
+    return kerns
+
+
+def _time_kernels(backend, kerns, tmin, ntrials=5):
+    def trial(nrep):
+        tstart = time.perf_counter()
+
+        for i in range(nrep):
+            backend.run_kernels(kerns)
+
+        backend.run_kernels([], wait=True)
+
+        return time.perf_counter() - tstart
+
+    # Run the kernels once to trigger any lazy initialisation
+    backend.run_kernels(kerns, wait=True)
+
+    # Double the number of repetitions until the timing is reliable
+    nrep = 1
+    while trial(nrep) < tmin:
+        nrep *= 2
+
+    # Take the fastest of several trials to reject any interference
+    return min(trial(nrep) for i in range(ntrials)) / nrep
+
+
+def calibrate_elewts(backend, cfg, etypes, neles=4096, tmin=0.25):
+    systemcls = subclass_where(BaseSystem, name=cfg.get('solver', 'system'))
+    basismap = {b.name: b for b in subclasses(BaseShape, just_leaf=True)}
+
+    times = {}
+    for etype in etypes:
+        basiscls = basismap[etype]
+
+        # Synthetic mesh of non-overlapping copies of the reference element
+        offs = np.zeros((neles, basiscls.ndims))
+        offs[:, 0] = 3*np.arange(neles)
+        spts = np.array(basiscls.std_ele(1))[:, None] + offs
+
+        # Time the element kernels with all elements curved or all linear
+        rtimes = {}
+        for curved in [False, True]:
+            eles = systemcls.elementscls(basiscls, spts, cfg)
+            eles.set_ics_from_cfg()
+            eles.set_backend(backend, 2, f'calibrate-{etype}-{curved}-',
+                             neles if curved else 0)
+            backend.commit()
+
+            # Low order elements always take the curved code path
+            region, = eles._mesh_regions
+            if curved and region != 'curved':
+                raise RuntimeError('Curved element kernels not selected')
+
+            if region not in rtimes:
+                kerns = _ele_kernels(eles)
+                backend.commit()
+
+                rtimes[region] = _time_kernels(backend, kerns, tmin) / neles
+
+            key = f'{etype}-curved' if curved else etype
+            times[key] = rtimes[region]
+
+    # Express the costs as integer weights relative to the most expensive
+    tmax = max(times.values())
+
+    return {k: max(1, round(100*t / tmax)) for k, t in times.items()}
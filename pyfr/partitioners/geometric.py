@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from pyfr.mpiutil import get_comm_rank_root, mpi
+from pyfr.partitioners.parallel import BaseParallelPartitioner
+
+
+class GeometricPartitioner(BaseParallelPartitioner):
+    name = 'geometric'
+
+    # Options
+    int_opts = set()
+    enum_opts = {}
+    dflt_opts = {}
+
+    def _partition_graph(self, graph, partwts):
+        comm, rank, root = get_comm_rank_root()
+
+        # Sort our vertices along the space filling curve
+        idx = np.argsort(graph.vkeys)
+        keys = graph.vkeys[idx]
+        cwts = np.concatenate(([0], np.cumsum(graph.vwts[idx])))
+
+        # Cumulative weight at which each partition should end
+        twt = comm.allreduce(int(cwts[-1]))
+        targets = twt*np.cumsum(partwts[:-1]) / sum(partwts)
+
+        # Bisect for the smallest keys at which these weights are reached
+        lo = np.zeros(len(targets), dtype=np.uint64)
+        hi = np.full(len(targets), 2**63, dtype=np.uint64)
+
+        while np.any(lo < hi):
+            mid = lo + (hi - lo) // np.uint64(2)
+
+            # Total weight of the vertices which precede each midpoint
+            wts = cwts[np.searchsorted(keys, mid)]
+            comm.Allreduce(mpi.IN_PLACE, wts, op=mpi.SUM)
+
+            reached = wts >= targets
+            lo = np.where(reached, lo, mid + np.uint64(1))
+            hi = np.where(reached, mid, hi)
+
+        # Cut the curve at these keys
+        return np.searchsorted(lo, graph.vkeys, side='right')
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+import itertools as it
+import re
+import uuid
+
+import numpy as np
+
+from pyfr.inifile import Inifile
+from pyfr.mpiutil import get_comm_rank_root, mpi
+from pyfr.partitioners.base import (ele_weights, encode_con, group_by,
+                                    union_find)
+
+
+DistGraph = namedtuple('DistGraph', ['vtxdist', 'vtab', 'etab', 'vwts',
+                                     'ewts', 'vkeys'])
+
+
+def _alltoallv(comm, sbuf, scounts, rcounts):
+    sbuf = np.ascontiguousarray(sbuf)
+    rbuf = np.empty((sum(rcounts), *sbuf.shape[1:]), dtype=sbuf.dtype)
+
+    # Exchange the rows as raw bytes
+    rowsz = sbuf.dtype.itemsize*int(np.prod(sbuf.shape[1:]))
+    sc, rc = rowsz*np.array(scounts), rowsz*np.array(rcounts)
+    sd, rd = np.cumsum(sc) - sc, np.cumsum(rc) - rc
+
+    comm.Alltoallv([sbuf, (sc.tolist(), sd.tolist()), mpi.BYTE],
+                   [rbuf, (rc.tolist(), rd.tolist()), mpi.BYTE])
+
+    return rbuf
+
+
+def _owner(vtxdist, codes):
+    return np.searchsorted(vtxdist, codes, side='right') - 1
+
+
+def _fetch(comm, vtxdist, vals, codes):
+    router = _Router(comm, _owner(vtxdist, codes))
+
+    # Ask the owners of the elements for their values
+    req = router.forward(codes) - vtxdist[comm.rank]
+
+    return router.reverse(vals[req])
+
+
+def _morton_keys(pts, lo, hi):
+    ndims = pts.shape[1]
+    nbits = 63 // ndims
+
+    # Quantise the points onto a uniform grid, collapsing flat directions
+    ext = hi - lo
+    scale = np.divide(2**nbits - 1, ext, out=np.zeros_like(ext, dtype=float),
+                      where=ext > 0)
+    q = np.clip((pts - lo)*scale, 0, 2**nbits - 1).astype(np.uint64)
+
+    # Interleave the bits of the grid coordinates
+    keys = np.zeros(len(pts), dtype=np.uint64)
+    for b, d in it.product(range(nbits), range(ndims)):
+        bit = (q[:, d] >> np.uint64(b)) & np.uint64(1)
+        keys |= bit << np.uint64(b*ndims + d)
+
+    return keys
+
+
+class _Router:
+    def __init__(self, comm, dest):
+        dest = np.asarray(dest, dtype=int)
+
+        self.comm = comm
+
+        # Order our rows by destination rank
+        self.sidx = np.argsort(dest, kind='stable')
+        self.scounts = np.bincount(dest, minlength=comm.size).tolist()
+        self.rcounts = comm.alltoall(self.scounts)
+
+    def forward(self, arr):
+        return _alltoallv(self.comm, arr[self.sidx], self.scounts,
+                          self.rcounts)
+
+    def reverse(self, arr):
+        rarr = _alltoallv(self.comm, arr, self.rcounts, self.scounts)
+
+        ret = np.empty_like(rarr)
+        ret[self.sidx] = rarr
+
+        return ret
+
+
+class BaseParallelPartitioner:
+    def __init__(self, partwts, elewts, opts=None):
+        self.partwts = partwts
+        self.elewts = elewts
+        self.nparts = len(partwts)
+
+        # Parse the options list
+        self.opts = {}
+        for k, v in dict(self.dflt_opts, **(opts or {})).items():
+            if k in self.int_opts:
+                self.opts[k] = int(v)
+            elif k in self.enum_opts:
+                self.opts[k] = self.enum_opts[k][v]
+            else:
+                raise ValueError('Invalid partitioner option')
+
+    def _partition_graph(self, graph, partwts):
+        pass
+
+    def _scatter(self, plan, arr):
+        router, rparts, rlidx = plan
+
+        # Send each element to the rank which owns its new partition
+        rarr = router.forward(arr)
+
+        # Where the elements are placed in their local order
+        for pn, idx in group_by(rparts):
+            parr = np.empty((len(idx), *rarr.shape[1:]), dtype=rarr.dtype)
+            parr[rlidx[idx]] = rarr[idx]
+
+            yield pn, parr
+
+    def partition(self, mesh):
+        comm, rank, root = get_comm_rank_root()
+        nparts = self.nparts
+
+        # Extract the current UUID from the mesh
+        curruuid = mesh['mesh_uuid']
+
+        # Number of elements of each type
+        pinf = mesh.partition_info('spt')
+        if any(len(pn) > 1 for pn in pinf.values()):
+            raise ValueError('Parallel partitioning requires an '
+                             'unpartitioned mesh')
+
+        # Number the elements consecutively; ordering types by name ensures
+        # that all ranks arrive at the same numbering
+        ecounts = {et: pinf[et][0] for et in sorted(pinf)}
+        ebnds = list(it.accumulate(ecounts.values(), initial=0))
+        eoffs = dict(zip(ecounts, ebnds))
+
+        # Ensure there are enough elements to go around
+        if ebnds[-1] < nparts:
+            raise ValueError('Mesh has fewer elements than partitions')
+
+        # Divide the elements evenly between the ranks
+        vtxdist = np.array([ebnds[-1]*i // comm.size
+                            for i in range(comm.size + 1)])
+        vbeg, vend = vtxdist[rank], vtxdist[rank + 1]
+        nloc = vend - vbeg
+
+        # Our slice of each element type
+        eslices = {et: (int(np.clip(vbeg - off, 0, ecounts[et])),
+                        int(np.clip(vend - off, 0, ecounts[et])))
+                   for et, off in eoffs.items()}
+
+        # Read in our shape points
+        spts = [mesh.read(f'spt_{et}_p0', np.s_[:, a:b])
+                for et, (a, b) in eslices.items()]
+
+        # Linearity, weight, and centroid of each of our elements
+        linfs = {et: mesh[f'spt_{et}_p0', 'linear'][a:b]
+                 for et, (a, b) in eslices.items()}
+        linf = np.concatenate(list(linfs.values()))
+        vwts = np.concatenate([ele_weights(self.elewts, et, l)
+                               for et, l in linfs.items()])
+        cents = np.vstack([s.mean(axis=0) for s in spts])
+
+        # Position of each element along a space filling curve
+        bbox = np.array([cents.min(axis=0, initial=np.inf),
+                         -cents.max(axis=0, initial=-np.inf)])
+        comm.Allreduce(mpi.IN_PLACE, bbox, op=mpi.MIN)
+        vkeys = _morton_keys(cents, bbox[0], -bbox[1])
+
+        # Read in our slice of the connectivity
+        nfaces = mesh.shape('con_p0')[1]
+        fbeg = nfaces*rank // comm.size
+        fend = nfaces*(rank + 1) // comm.size
+        con = mesh.read('con_p0', np.s_[:, fbeg:fend]).astype('U4,i4,i1,i2')
+        gcon = encode_con(con, eoffs)
+
+        # Periodic faces and the indices of those in our slice
+        pnames = {k: np.asarray(v) for k, v in mesh.attrs('con_p0').items()
+                  if k.startswith('periodic')}
+        pidx = np.concatenate([np.zeros(0, dtype=int), *pnames.values()])
+        pidx = pidx[(pidx >= fbeg) & (pidx < fend)] - fbeg
+
+        # Have every rank merge the elements connected by periodic faces
+        pcon = np.hstack([np.zeros((2, 0), dtype=int),
+                          *comm.allgather(gcon[:, pidx])])
+        peles, pinv = np.unique(pcon, return_inverse=True)
+        proots = peles[union_find(len(peles), pinv.reshape(2, -1))]
+
+        def pmap(codes):
+            codes = codes.copy()
+
+            if len(peles):
+                pos = np.minimum(np.searchsorted(peles, codes), len(peles) - 1)
+                hit = peles[pos] == codes
+                codes[hit] = proots[pos[hit]]
+
+            return codes
+
+        # Weights of these elements
+        pown = (peles >= vbeg) & (peles < vend)
+        pwts = np.zeros(len(peles), dtype=vwts.dtype)
+        pwts[pown] = vwts[peles[pown] - vbeg]
+        comm.Allreduce(mpi.IN_PLACE, pwts, op=mpi.SUM)
+
+        # Transfer the weights of merged elements onto their roots
+        merged = proots != peles
+
+        dwts = np.where(merged, -pwts, 0)
+        np.add.at(dwts, np.searchsorted(peles, proots[merged]), pwts[merged])
+
+        vwts[peles[pown] - vbeg] += dwts[pown]
+
+        # Edges of the dual graph, sans periodic faces and self-loops
+        lhs, rhs = pmap(np.hstack([np.delete(gcon, pidx, axis=1),
+                                   np.delete(gcon[::-1], pidx, axis=1)]))
+        lhs, rhs = lhs[lhs != rhs], rhs[lhs != rhs]
+
+        # Send the edges to the owners of their left hand sides
+        router = _Router(comm, _owner(vtxdist, lhs))
+        lhs, rhs = router.forward(np.column_stack([lhs, rhs])).T
+
+        # Construct our portion of the distributed graph
+        idx = np.argsort(lhs, kind='stable')
+        vdeg = np.bincount(lhs - vbeg, minlength=nloc)
+        vtab = np.concatenate(([0], np.cumsum(vdeg)))
+        etab = rhs[idx]
+
+        graph = DistGraph(vtxdist, vtab, etab, vwts, np.ones_like(etab),
+                          vkeys)
+
+        # Partition the graph
+        if nparts > 1:
+            parts = np.array(self._partition_graph(graph, self.partwts),
+                             dtype=int)
+        else:
+            parts = np.zeros(nloc, dtype=int)
+
+        # Place merged periodic elements alongside their roots
+        rparts = np.full(len(peles), -1)
+        rown = (proots >= vbeg) & (proots < vend)
+        rparts[rown] = parts[proots[rown] - vbeg]
+        comm.Allreduce(mpi.IN_PLACE, rparts, op=mpi.MAX)
+        parts[peles[pown] - vbeg] = rparts[pown]
+
+        # Ensure that every partition has been assigned some elements
+        pcounts = np.bincount(parts, minlength=nparts)
+        comm.Allreduce(mpi.IN_PLACE, pcounts, op=mpi.SUM)
+
+        if (n := np.count_nonzero(pcounts)) != nparts:
+            raise RuntimeError(f'Partitioner error: mesh has {n} parts '
+                               f'versus goal of {nparts}')
+
+        # Tag elements which are on partition boundaries
+        fparts = _fetch(comm, vtxdist, parts, gcon.ravel()).reshape(2, -1)
+        bcodes = gcon[:, fparts[0] != fparts[1]].ravel()
+        bcodes = _Router(comm, _owner(vtxdist, bcodes)).forward(bcodes)
+
+        bnd = np.zeros(nloc, dtype=bool)
+        bnd[bcodes - vbeg] = True
+
+        # Each partition is assembled on a single rank
+        powner = np.arange(nparts)*comm.size // nparts
+
+        # Order elements in each partition with boundary elements first and
+        # interior elements grouped by type (curved vs linear) and then by
+        # their position along the space filling curve
+        ecls = np.where(bnd, 0, np.where(linf, 2, 1))
+        mdtype = [('part', int), ('ecls', int), ('key', np.uint64),
+                  ('eidx', int)]
+
+        plans, lidx = {}, np.empty(nloc, dtype=int)
+        for et, (a, b) in eslices.items():
+            s = slice(eoffs[et] + a - vbeg, eoffs[et] + b - vbeg)
+
+            meta = np.empty(b - a, dtype=mdtype)
+            meta['part'], meta['ecls'] = parts[s], ecls[s]
+            meta['key'], meta['eidx'] = vkeys[s], np.arange(a, b)
+
+            # Send the metadata to the ranks assembling the partitions
+            router = _Router(comm, powner[parts[s]])
+            rmeta = router.forward(meta)
+
+            # Obtain the index of each element in its partition
+            order = np.lexsort((rmeta['eidx'], rmeta['key'], rmeta['ecls'],
+                                rmeta['part']))
+            rlidx = np.empty(len(order), dtype=int)
+            for pn, idx in group_by(rmeta['part'][order]):
+                rlidx[order[idx]] = np.arange(len(idx))
+
+            # Return these indices to the owners of the elements
+            lidx[s] = router.reverse(rlidx)
+
+            plans[et] = (router, rmeta['part'], rlidx)
+
+        # Handle the shape points
+        newmesh = {}
+        for (et, (a, b)), spt in zip(eslices.items(), spts):
+            s = slice(eoffs[et] + a - vbeg, eoffs[et] + b - vbeg)
+
+            for pn, v in self._scatter(plans[et], spt.swapaxes(0, 1)):
+                newmesh[f'spt_{et}_p{pn}'] = v.swapaxes(0, 1)
+
+            for pn, v in self._scatter(plans[et], linf[s]):
+                newmesh[f'spt_{et}_p{pn}', 'linear'] = v
+
+        # Partition and local index of each element
+        einfo = np.empty(nloc, dtype=[('part', int), ('lidx', int)])
+        einfo['part'], einfo['lidx'] = parts, lidx
+
+        # Map our slice of the connectivity onto local element indices
+        finfo = _fetch(comm, vtxdist, einfo, gcon.ravel()).reshape(2, -1)
+        lparts, rparts = finfo['part']
+
+        lcon = con.astype('S4,i4,i1,i2')
+        lcon['f1'] = finfo['lidx']
+
+        # Number the periodic boundaries consistently across ranks
+        pnums = np.full(len(lparts), -1)
+        for i, name in enumerate(sorted(pnames)):
+            fidx = pnames[name]
+            pnums[fidx[(fidx >= fbeg) & (fidx < fend)] - fbeg] = i
+
+        # Internal faces go to their partition; faces on partition boundaries
+        # go to the partitions on either side
+        fdtype = [('p', int), ('q', int), ('fidx', int), ('pnum', int),
+                  ('l', lcon.dtype), ('r', lcon.dtype)]
+
+        def face_rows(p, q, idx, pnum, l, r):
+            rows = np.empty(len(idx), dtype=fdtype)
+            rows['p'], rows['q'], rows['fidx'] = p, q, fbeg + idx
+            rows['pnum'], rows['l'], rows['r'] = pnum, l, r
+
+            return rows
+
+        iidx = np.flatnonzero(lparts == rparts)
+        midx = np.flatnonzero(lparts != rparts)
+
+        faces = np.concatenate([
+            face_rows(lparts[iidx], lparts[iidx], iidx, pnums[iidx],
+                      *lcon[:, iidx]),
+            face_rows(lparts[midx], rparts[midx], midx, -1, *lcon[:, midx]),
+            face_rows(rparts[midx], lparts[midx], midx, -1,
+                      *lcon[::-1, midx])
+        ])
+
+        faces = _Router(comm, powner[faces['p']]).forward(faces)
+        ifaces = faces[faces['p'] == faces['q']]
+        mfaces = faces[faces['p'] != faces['q']]
+
+        # Generate the internal connectivity, ordered as in the input mesh
+        for pn, idx in group_by(ifaces['p'], ifaces['fidx']):
+            pfaces = ifaces[idx]
+            newmesh[f'con_p{pn}'] = np.array([pfaces['l'], pfaces['r']])
+
+            # Tag any periodic faces
+            for i, name in enumerate(sorted(pnames)):
+                if len(pfidx := np.flatnonzero(pfaces['pnum'] == i)):
+                    newmesh[f'con_p{pn}', name] = pfidx
+
+        # Generate the MPI connectivity; sorting by face number ensures each
+        # face is at the same position in the arrays of both partitions
+        for k, idx in group_by(mfaces['p']*nparts + mfaces['q'],
+                               mfaces['fidx']):
+            px, py = divmod(k, nparts)
+            newmesh[f'con_p{px}p{py}'] = mfaces['l'][idx]
+
+        # Generate boundary conditions
+        bnames = sorted(m[1] for f in mesh
+                        if (m := re.match(r'bcon_(.+?)_p0$', f)))
+
+        for name in bnames:
+            nbfaces = mesh.shape(f'bcon_{name}_p0')[0]
+            bbeg = nbfaces*rank // comm.size
+            bend = nbfaces*(rank + 1) // comm.size
+
+            bcon = mesh.read(f'bcon_{name}_p0', np.s_[bbeg:bend])
+            bcon = bcon.astype('U4,i4,i1,i2')
+            binfo = _fetch(comm, vtxdist, einfo, encode_con(bcon, eoffs))
+
+            lbcon = bcon.astype('S4,i4,i1,i2')
+            lbcon['f1'] = binfo['lidx']
+
+            bfaces = np.empty(len(lbcon), dtype=[('p', int), ('fidx', int),
+                                                 ('c', lbcon.dtype)])
+            bfaces['p'], bfaces['c'] = binfo['part'], lbcon
+            bfaces['fidx'] = np.arange(bbeg, bend)
+
+            bfaces = _Router(comm, powner[bfaces['p']]).forward(bfaces)
+            for pn, idx in group_by(bfaces['p'], bfaces['fidx']):
+                newmesh[f'bcon_{name}_p{pn}'] = bfaces['c'][idx]
+
+        # Generate the renumbering table for our elements
+        rnum = {}
+        for et, (a, b) in eslices.items():
+            s = slice(eoffs[et] + a - vbeg, eoffs[et] + b - vbeg)
+            rnum[et] = dict(zip(zip(it.repeat(0), range(a, b)),
+                                zip(parts[s].tolist(), lidx[s].tolist())))
+
+        # Generate a new UUID for the mesh
+        newuuid = comm.bcast(str(uuid.uuid4()) if rank == root else None,
+                             root=root)
+
+        if rank == root:
+            newmesh['mesh_uuid'] = newuuid
+
+        # Build the solution converter
+        def partition_soln(soln):
+            # Check the UUID
+            if curruuid != soln['mesh_uuid']:
+                raise ValueError('Mismatched solution/mesh')
+
+            # Obtain the prefix
+            prefix = Inifile(soln['stats']).get('data', 'prefix')
+
+            # Read in and repartition our slice of the solution
+            newsoln = {}
+            for et, (a, b) in eslices.items():
+                arr = soln.read(f'{prefix}_{et}_p0', np.s_[..., a:b])
+
+                for pn, v in self._scatter(plans[et], np.moveaxis(arr, -1, 0)):
+                    newsoln[f'{prefix}_{et}_p{pn}'] = np.moveaxis(v, 0, -1)
+
+            # Have the root rank copy over the metadata
+            if rank == root:
+                for f in soln:
+                    if re.match('stats|config|plugins', f):
+                        newsoln[f] = soln[f]
+
+                # Apply the new UUID
+                newsoln['mesh_uuid'] = newuuid
+
+            return newsoln
+
+        return newmesh, rnum, partition_soln
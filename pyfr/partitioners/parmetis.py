@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+from ctypes import byref, c_void_p
+
+import numpy as np
+
+from pyfr.ctypesutil import load_library
+from pyfr.mpiutil import get_comm_rank_root, mpi
+from pyfr.partitioners.metis import METISWrappers
+from pyfr.partitioners.parallel import BaseParallelPartitioner
+from pyfr.util import silence
+
+
+# Possible ParMETIS exception types
+class ParMETISError(Exception): pass
+
+
+class ParMETISWrappers:
+    def __init__(self):
+        lib = load_library('parmetis')
+
+        # ParMETIS shares its data types with the METIS it was built against
+        metis = METISWrappers()
+        self.metis_int, self.metis_int_np = metis.metis_int, metis.metis_int_np
+        self.metis_flt_np = metis.metis_flt_np
+
+        # ParMETIS_V3_PartKway
+        self.ParMETIS_V3_PartKway = lib.ParMETIS_V3_PartKway
+        self.ParMETIS_V3_PartKway.argtypes = [c_void_p]*15
+        self.ParMETIS_V3_PartKway.errcheck = self._errcheck
+
+    def _errcheck(self, status, fn, args):
+        if status != 1:
+            raise ParMETISError
+
+
+class ParMETISPartitioner(BaseParallelPartitioner):
+    name = 'parmetis'
+
+    # Integer options
+    int_opts = {'seed', 'ufactor'}
+
+    # Enumeration options
+    enum_opts = {}
+
+    # Default options
+    dflt_opts = {'ufactor': 10}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Load ParMETIS
+        self._wrappers = ParMETISWrappers()
+
+    def _partition_graph(self, graph, partwts):
+        comm, rank, root = get_comm_rank_root()
+        w = self._wrappers
+
+        # Type conversion
+        vtxdist = np.asanyarray(graph.vtxdist, dtype=w.metis_int_np)
+        vtab = np.asanyarray(graph.vtab, dtype=w.metis_int_np)
+        etab = np.asanyarray(graph.etab, dtype=w.metis_int_np)
+        vwts = np.asanyarray(graph.vwts, dtype=w.metis_int_np)
+        ewts = np.asanyarray(graph.ewts, dtype=w.metis_int_np)
+        partwts = np.array(partwts, dtype=w.metis_flt_np)
+
+        # Normalise the weights
+        partwts /= np.sum(partwts)
+
+        # Permitted load imbalance
+        ubvec = np.array([1 + self.opts['ufactor'] / 1000],
+                         dtype=w.metis_flt_np)
+
+        # Options; the first entry indicates if the others are to be used
+        opts = np.zeros(3, dtype=w.metis_int_np)
+        if 'seed' in self.opts:
+            opts[:] = 1, 0, self.opts['seed']
+
+        # Allocate the partition array
+        parts = np.empty(len(vtab) - 1, dtype=w.metis_int_np)
+
+        # ParMETIS requires every rank to have at least one vertex, so
+        # exclude any empty ranks from the partitioning
+        pcomm = comm.Split(0 if len(parts) else mpi.UNDEFINED, rank)
+        if pcomm == mpi.COMM_NULL:
+            return parts
+
+        vtxdist = np.unique(vtxdist)
+
+        # Integer parameters; weights are present for vertices and edges
+        wgtflag, numflag = w.metis_int(3), w.metis_int(0)
+        ncon, npart = w.metis_int(1), w.metis_int(len(partwts))
+        edgecut = w.metis_int()
+
+        # Partition
+        try:
+            with silence():
+                w.ParMETIS_V3_PartKway(
+                    vtxdist.ctypes, vtab.ctypes, etab.ctypes, vwts.ctypes,
+                    ewts.ctypes, byref(wgtflag), byref(numflag), byref(ncon),
+                    byref(npart), partwts.ctypes, ubvec.ctypes, opts.ctypes,
+                    byref(edgecut), parts.ctypes, mpi._addressof(pcomm)
+                )
+        finally:
+            pcomm.Free()
+
+        # Check for invalid partition numbers
+        if len(parts) and np.max(parts) >= len(partwts):
+            raise RuntimeError('Invalid partition number from ParMETIS')
+
+        return parts
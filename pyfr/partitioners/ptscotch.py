@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+from ctypes import (POINTER, c_int, c_int32, c_int64, c_double, c_void_p,
+                    sizeof)
+
+import numpy as np
+
+from pyfr.ctypesutil import LibWrapper
+from pyfr.mpiutil import get_comm_rank_root, mpi
+from pyfr.partitioners.parallel import BaseParallelPartitioner
+
+
+# Possible PT-Scotch exception types
+class PTSCOTCHError(Exception): pass
+
+
+class PTSCOTCHWrappers(LibWrapper):
+    _libname = 'ptscotch'
+
+    # Error codes
+    _statuses = {
+        '*': PTSCOTCHError
+    }
+
+    # Types
+    SCOTCH_Arch = c_double*128
+    SCOTCH_Dgraph = c_double*128
+    SCOTCH_Strat = c_double*128
+
+    # Functions
+    _functions = [
+        (c_int, 'SCOTCH_archInit', POINTER(SCOTCH_Arch)),
+        (c_int, 'SCOTCH_stratInit', POINTER(SCOTCH_Strat)),
+        (c_int, 'SCOTCH_dgraphMap', POINTER(SCOTCH_Dgraph),
+         POINTER(SCOTCH_Arch), POINTER(SCOTCH_Strat), c_void_p),
+        (None, 'SCOTCH_archExit', POINTER(SCOTCH_Arch)),
+        (None, 'SCOTCH_dgraphExit', POINTER(SCOTCH_Dgraph)),
+        (None, 'SCOTCH_stratExit', POINTER(SCOTCH_Strat))
+    ]
+
+    def __init__(self):
+        super().__init__()
+
+        # Ascertain the integer size
+        if self._lib.SCOTCH_numSizeof() == 4:
+            self.scotch_int = scotch_int = c_int32
+            self.scotch_int_np = np.int32
+        else:
+            self.scotch_int = scotch_int = c_int64
+            self.scotch_int_np = np.int64
+
+        # MPI communicators are passed by value as either ints or pointers
+        if mpi._sizeof(mpi.Comm) == sizeof(c_int):
+            self.mpi_comm = c_int
+        else:
+            self.mpi_comm = c_void_p
+
+        # SCOTCH_dgraphInit
+        self.SCOTCH_dgraphInit = self._lib.SCOTCH_dgraphInit
+        self.SCOTCH_dgraphInit.argtypes = [
+            POINTER(self.SCOTCH_Dgraph), self.mpi_comm
+        ]
+        self.SCOTCH_dgraphInit.errcheck = self._errcheck
+
+        # SCOTCH_archCmpltw
+        self.SCOTCH_archCmpltw = self._lib.SCOTCH_archCmpltw
+        self.SCOTCH_archCmpltw.argtypes = [
+            POINTER(self.SCOTCH_Arch), scotch_int, c_void_p
+        ]
+        self.SCOTCH_archCmpltw.errcheck = self._errcheck
+
+        # SCOTCH_dgraphBuild
+        self.SCOTCH_dgraphBuild = self._lib.SCOTCH_dgraphBuild
+        self.SCOTCH_dgraphBuild.argtypes = [
+            POINTER(self.SCOTCH_Dgraph), scotch_int, scotch_int, scotch_int,
+            c_void_p, c_void_p, c_void_p, c_void_p, scotch_int, scotch_int,
+            c_void_p, c_void_p, c_void_p
+        ]
+        self.SCOTCH_dgraphBuild.errcheck = self._errcheck
+
+        # SCOTCH_stratDgraphMapBuild
+        self.SCOTCH_stratDgraphMapBuild = self._lib.SCOTCH_stratDgraphMapBuild
+        self.SCOTCH_stratDgraphMapBuild.argtypes = [
+            POINTER(self.SCOTCH_Strat), scotch_int, scotch_int, scotch_int,
+            c_double
+        ]
+        self.SCOTCH_stratDgraphMapBuild.errcheck = self._errcheck
+
+
+class PTSCOTCHPartitioner(BaseParallelPartitioner):
+    name = 'ptscotch'
+
+    # Integer options
+    int_opts = {'ufactor'}
+
+    # Enumeration options
+    enum_opts = {
+        'strat': {'default': 0, 'quality': 1, 'speed': 2, 'balance': 4}
+    }
+
+    # Default options
+    dflt_opts = {'ufactor': 10, 'strat': 'default'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Load PT-Scotch
+        self._wrappers = PTSCOTCHWrappers()
+
+    def _partition_graph(self, graph, partwts):
+        comm, rank, root = get_comm_rank_root()
+        w = self._wrappers
+
+        # Type conversion; Scotch requires vertex loads to be positive
+        vtab = np.asanyarray(graph.vtab, dtype=w.scotch_int_np)
+        etab = np.asanyarray(graph.etab, dtype=w.scotch_int_np)
+        vwts = np.maximum(graph.vwts, 1).astype(w.scotch_int_np)
+        ewts = np.asanyarray(graph.ewts, dtype=w.scotch_int_np)
+        partwts = np.asanyarray(partwts, dtype=w.scotch_int_np)
+
+        # Output partition array
+        nvert = len(vtab) - 1
+        parts = np.empty(nvert, dtype=w.scotch_int_np)
+
+        # Allocate
+        arch = w.SCOTCH_Arch()
+        dgraph = w.SCOTCH_Dgraph()
+        strat = w.SCOTCH_Strat()
+
+        try:
+            # Initialise
+            w.SCOTCH_archInit(arch)
+            w.SCOTCH_dgraphInit(dgraph, w.mpi_comm(mpi._handleof(comm)))
+            w.SCOTCH_stratInit(strat)
+
+            # Apply the partition weights
+            w.SCOTCH_archCmpltw(arch, len(partwts), partwts.ctypes)
+
+            # Construct our portion of the distributed graph
+            w.SCOTCH_dgraphBuild(
+                dgraph, 0, nvert, nvert, vtab.ctypes, None, vwts.ctypes, None,
+                len(etab), len(etab), etab.ctypes, None, ewts.ctypes
+            )
+
+            # Permitted load imbalance ratio
+            balrat = self.opts['ufactor'] / 1000.0
+
+            # Partitioning stratergy
+            w.SCOTCH_stratDgraphMapBuild(
+                strat, self.opts['strat'], comm.size, len(partwts), balrat
+            )
+
+            # Perform the partitioning
+            w.SCOTCH_dgraphMap(dgraph, arch, strat, parts.ctypes)
+        finally:
+            if any(v != 0.0 for v in arch):
+                w.SCOTCH_archExit(arch)
+
+            if any(v != 0.0 for v in dgraph):
+                w.SCOTCH_dgraphExit(dgraph)
+
+            if any(v != 0.0 for v in strat):
+                w.SCOTCH_stratExit(strat)
+
+        return parts
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from concurrent.futures import ThreadPoolExecutor
 import os
 import re
 import shlex
@@ -9,6 +10,7 @@ from pytools import prefork
 
 from pyfr.mpiutil import get_comm_rank_root
 from pyfr.regions import BoundaryRegion, ConstructiveRegion
+from pyfr.writers.native import NativeWriter
 
 
 def init_csv(cfg, cfgsect, header, *, filekey='file', headerkey='header'):
@@ -30,6 +32,127 @@ def init_csv(cfg, cfgsect, header, *, filekey='file', headerkey='header'):
     return outf
 
 
+class _CExpr:
+    def __init__(self, val, grad=None):
+        self.val = val
+        self.grad = grad
+
+    def _binop(self, other, op, gradop, rev=False):
+        if not isinstance(other, _CExpr):
+            other = _CExpr(repr(float(other)))
+
+        a, b = (other, self) if rev else (self, other)
+        val = f'({a.val} {op} {b.val})'
+
+        # Propagate the gradients, if any, via the chain rule
+        if a.grad is None and b.grad is None:
+            return _CExpr(val)
+        else:
+            zeros = ['0.0']*len(a.grad or b.grad)
+            grad = [gradop(a.val, b.val, da, db)
+                    for da, db in zip(a.grad or zeros, b.grad or zeros)]
+
+            return _CExpr(val, grad)
+
+    def __add__(self, o, rev=False):
+        return self._binop(o, '+', lambda a, b, da, db: f'({da} + {db})', rev)
+
+    def __sub__(self, o, rev=False):
+        return self._binop(o, '-', lambda a, b, da, db: f'({da} - {db})', rev)
+
+    def __mul__(self, o, rev=False):
+        return self._binop(
+            o, '*', lambda a, b, da, db: f'({da}*{b} + {a}*{db})', rev
+        )
+
+    def __truediv__(self, o, rev=False):
+        return self._binop(
+            o, '/', lambda a, b, da, db: f'(({da}*{b} - {a}*{db})/({b}*{b}))',
+            rev
+        )
+
+    def __radd__(self, o):
+        return self.__add__(o, rev=True)
+
+    def __rsub__(self, o):
+        return self.__sub__(o, rev=True)
+
+    def __rmul__(self, o):
+        return self.__mul__(o, rev=True)
+
+    def __rtruediv__(self, o):
+        return self.__truediv__(o, rev=True)
+
+    def __neg__(self):
+        return self.__rsub__(0)
+
+
+def pri_cexprs(elementscls, cfg, ndims, nvars, usym='soln[{v}]',
+               gradusym=None):
+    # Symbolic conservative variables and, optionally, their gradients
+    cons = [_CExpr(usym.format(v=v),
+                   [gradusym.format(d=d, v=v) for d in range(ndims)]
+                   if gradusym else None)
+            for v in range(nvars)]
+
+    # Evaluate the primitive variables as C expressions
+    pnames = elementscls.privarmap[ndims]
+    pris = elementscls.con_to_pri(cons, cfg)
+
+    exprs = {pn: p.val for pn, p in zip(pnames, pris)}
+    if gradusym:
+        for pn, p in zip(pnames, pris):
+            for d, gp in zip('xyz', p.grad):
+                exprs[f'grad_{pn}_{d}'] = gp
+
+    return exprs
+
+
+def init_native_writer(intg, cfgsect, prefix):
+    cfg = intg.cfg
+
+    # Base output directory and file name
+    basedir = cfg.getpath(cfgsect, 'basedir', '.', abs=True)
+    basename = cfg.get(cfgsect, 'basename')
+
+    # Write mode
+    wmode = cfg.get(cfgsect, 'write-mode', 'blocking')
+    if wmode not in {'blocking', 'non-blocking'}:
+        raise ValueError('Invalid write mode')
+
+    # File layout
+    layout = cfg.get(cfgsect, 'layout', 'partitioned')
+
+    # Lossy quantisation
+    lossy = cfg.get(cfgsect, 'lossy-mode', 'none')
+    if lossy in {'absolute', 'relative'}:
+        lossy = (lossy, cfg.getfloat(cfgsect, 'lossy-tol'))
+    elif lossy == 'none':
+        lossy = None
+    else:
+        raise ValueError('Invalid lossy mode')
+
+    # Dataset compression; quantised data is only smaller when compressed
+    dsopts = {}
+    compression = cfg.get(cfgsect, 'compression', 'gzip' if lossy else 'none')
+    if compression == 'gzip':
+        dsopts['complevel'] = cfg.getint(cfgsect, 'compression-level', 4)
+    elif compression not in {'none', 'lzf'}:
+        raise ValueError('Invalid compression filter')
+
+    if compression != 'none':
+        dsopts['compression'] = compression
+        dsopts['shuffle'] = cfg.getbool(cfgsect, 'shuffle', True)
+
+    # Dataset chunking
+    if cfg.hasopt(cfgsect, 'chunk-size'):
+        dsopts['chunksz'] = cfg.getint(cfgsect, 'chunk-size')
+
+    return NativeWriter(intg, basedir, basename, prefix,
+                        isasync=(wmode == 'non-blocking'), layout=layout,
+                        lossy=lossy, **dsopts)
+
+
 class BasePlugin:
     name = None
     systems = None
@@ -63,6 +186,65 @@ class BasePlugin:
     def serialise(self, intg):
         return {}
 
+    def finalise(self, intg):
+        pass
+
+
+class BackgroundMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Write mode
+        wmode = self.cfg.get(self.cfgsect, 'write-mode', 'blocking')
+        if wmode not in {'blocking', 'non-blocking'}:
+            raise ValueError('Invalid write mode')
+
+        # In non-blocking mode output is performed by a background thread
+        if wmode == 'non-blocking':
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self._executor = None
+
+        # Persistent snapshot buffers and the pending task (if any)
+        self._snapbufs = {}
+        self._pending = None
+
+    def _snapshot(self, i, arr):
+        buf = self._snapbufs.get(i)
+
+        # (Re)allocate the buffer if the array has changed shape
+        if buf is None or buf.shape != arr.shape or buf.dtype != arr.dtype:
+            buf = self._snapbufs[i] = np.empty_like(arr)
+
+        buf[...] = arr
+        return buf
+
+    def _submit(self, fn, *args):
+        if self._executor:
+            # Ensure the previous task has completed
+            self._wait()
+
+            # Take a snapshot of any arrays so the caller may reuse them
+            args = [self._snapshot(i, a) if isinstance(a, np.ndarray) else a
+                    for i, a in enumerate(args)]
+
+            # Hand the task off to the background thread
+            self._pending = self._executor.submit(fn, *args)
+        else:
+            fn(*args)
+
+    def _wait(self):
+        if self._pending:
+            fut, self._pending = self._pending, None
+
+            # Wait for the task to finish, propagating any exceptions
+            fut.result()
+
+    def finalise(self, intg):
+        super().finalise(intg)
+
+        self._wait()
+
 
 class PostactionMixin:
     def __init__(self, *args, **kwargs):
@@ -80,6 +262,15 @@ class PostactionMixin:
             if self.postactmode not in {'blocking', 'non-blocking'}:
                 raise ValueError('Invalid post action mode')
 
+    def _postaction_callback(self, intg):
+        tcurr = intg.tcurr
+
+        def callback(fname):
+            self._invoke_postaction(intg=intg, mesh=intg.system.mesh.fname,
+                                    soln=fname, t=tcurr)
+
+        return callback
+
     def __del__(self):
         if getattr(self, 'postactaid', None) is not None:
             prefork.wait(self.postactaid)
@@ -5,10 +5,11 @@ from collections import defaultdict
 import numpy as np
 
 from pyfr.mpiutil import get_comm_rank_root, mpi
-from pyfr.plugins.base import BasePlugin, init_csv
+from pyfr.plugins.base import (BackgroundMixin, BasePlugin, init_csv,
+                               pri_cexprs)
 
 
-class FluidForcePlugin(BasePlugin):
+class FluidForcePlugin(BackgroundMixin, BasePlugin):
     name = 'fluidforce'
     systems = ['ac-euler', 'ac-navier-stokes', 'euler', 'navier-stokes']
     formulations = ['dual', 'std']
@@ -70,45 +71,25 @@ class FluidForcePlugin(BasePlugin):
             # Open
             self.outf = init_csv(self.cfg, cfgsect, ','.join(header))
 
-        # Interpolation matrices and quadrature weights
-        self._m0 = m0 = {}
-        self._qwts = qwts = defaultdict(list)
-
-        if self._viscous:
-            self._m4 = m4 = {}
-            rcpjact = {}
+        # Kernels for each solution bank and per-face force matrices
+        self._kerns = [[] for i in range(len(intg.system.ele_banks[0]))]
+        self._fmmats = []
 
         # If we have the boundary then process the interface
         if bc in mesh:
-            # Element indices, associated face normals and relative flux
-            # points position with respect to the moments origin
+            # Element indices, associated weighted face normals and relative
+            # flux points position with respect to the moments origin
             eidxs = defaultdict(list)
             norms = defaultdict(list)
             rfpts = defaultdict(list)
 
-            for etype, eidx, fidx, flags in mesh[bc].astype('U4,i4,i1,i2'):
+            for etype, eidx, fidx, flags in mesh.con(bc).tolist():
                 eles = elemap[etype]
+                facefpts = eles.basis.facefpts[fidx]
 
-                if (etype, fidx) not in m0:
-                    facefpts = eles.basis.facefpts[fidx]
-
-                    m0[etype, fidx] = eles.basis.m0[facefpts]
-                    qwts[etype, fidx] = eles.basis.fpts_wts[facefpts]
-
-                if self._viscous and etype not in m4:
-                    m4[etype] = eles.basis.m4
-
-                    # Get the smats at the solution points
-                    smat = eles.smat_at_np('upts').transpose(2, 0, 1, 3)
-
-                    # Get |J|^-1 at the solution points
-                    rcpdjac = eles.rcpdjac_at_np('upts')
-
-                    # Product to give J^-T at the solution points
-                    rcpjact[etype] = smat*rcpdjac
-
-                # Phyiscal normals
-                pnorms = eles.get_pnorms(eidx, fidx)
+                # Physical normals scaled by the quadrature weights
+                qwts = eles.basis.fpts_wts[facefpts]
+                pnorms = qwts[:, None]*eles.get_pnorms(eidx, fidx)
 
                 eidxs[etype, fidx].append(eidx)
                 norms[etype, fidx].append(pnorms)
@@ -116,17 +97,101 @@ class FluidForcePlugin(BasePlugin):
                 # Get the flux points position of the given face and element
                 # indices relative to the moment origin
                 if self._mcomp:
-                    fpts_idx = eles.basis.facefpts[fidx]
-                    rfpt = eles.plocfpts[fpts_idx, eidx] - morigin
+                    rfpt = eles.plocfpts[facefpts, eidx] - morigin
                     rfpts[etype, fidx].append(rfpt)
 
-            self._eidxs = {k: np.array(v) for k, v in eidxs.items()}
-            self._norms = {k: np.array(v) for k, v in norms.items()}
-            self._rfpts = {k: np.array(v) for k, v in rfpts.items()}
+            self._prepare_kernels(intg, eidxs, norms, rfpts)
 
+    def _prepare_kernels(self, intg, eidxs, norms, rfpts):
+        backend, elemap = intg.backend, intg.system.ele_map
+        ndims, nvars, mcomp = self.ndims, self.nvars, self._mcomp
+
+        # Register our kernels
+        backend.pointwise.register('pyfr.plugins.kernels.gather')
+        backend.pointwise.register('pyfr.plugins.kernels.fluidforce')
+
+        # Pressure and velocity gradients at a flux point
+        pex = pri_cexprs(self.elementscls, self.cfg, ndims, nvars, 'uf[{v}]',
+                         'duf[{d}][{v}]' if self._viscous else None)
+        gradvel = [[pex.get(f'grad_{v}_{d}') for v in 'uvw'[:ndims]]
+                   for d in 'xyz'[:ndims]]
+
+        tplargs = {
+            'ndims': ndims, 'nvars': nvars, 'mcomp': mcomp,
+            'viscous': self._viscous, 'ac': self._ac,
+            'visc_corr': self._viscorr, 'c': self._constants,
+            'pexpr': pex['p'], 'gradvel': gradvel
+        }
+
+        for (etype, fidx), eidx in eidxs.items():
+            eles = elemap[etype]
+            eidx = np.array(eidx)
+            nfaces, nupts = len(eidx), eles.nupts
+
+            # Interpolation operator to the flux points of the face
+            m0 = eles.basis.m0[eles.basis.facefpts[fidx]]
+            nfpts = len(m0)
+
+            # Compact copy of the solution in the boundary elements
+            usoln = backend.matrix((nupts, nvars, nfaces), tags={'align'})
+
+            # Force and moment contributions from each face
+            fmmat = backend.matrix(((1 + self._viscous)*(ndims + mcomp),
+                                    nfaces), tags={'align'})
+
+            kargs = {
+                'u': usoln, 'm0': backend.const_matrix(m0), 'out': fmmat,
+                'qnorms': backend.const_matrix(
+                    np.array(norms[etype, fidx]).transpose(1, 2, 0)
+                )
+            }
+
+            if mcomp:
+                kargs['rfpts'] = backend.const_matrix(
+                    np.array(rfpts[etype, fidx]).transpose(1, 2, 0)
+                )
+
+            # If necessary, compute the physical gradients at the solution
+            # points of the boundary elements
+            gradkerns = []
             if self._viscous:
-                self._rcpjact = {k: rcpjact[k[0]][..., v]
-                                 for k, v in self._eidxs.items()}
+                gradu = backend.matrix((ndims, nupts, nvars, nfaces),
+                                       tags={'align'})
+                smats = eles.smat_at_np('upts')[..., eidx]
+                rcpdjac = eles.rcpdjac_at_np('upts')[:, eidx]
+
+                gradkerns.append(backend.kernel(
+                    'mul', eles.opmat('M4'), usoln, out=gradu
+                ))
+                gradkerns.append(backend.kernel(
+                    'gradcoru', tplargs={'ndims': ndims, 'nvars': nvars},
+                    dims=[nupts, nfaces], gradu=gradu,
+                    smats=backend.const_matrix(smats),
+                    rcpdjac=backend.const_matrix(rcpdjac)
+                ))
+
+                kargs['gradu'] = gradu
+
+            ffkern = backend.kernel(
+                'fluidforce', tplargs=tplargs | {'nupts': nupts,
+                                                 'nfpts': nfpts},
+                dims=[nfaces], **kargs
+            )
+
+            # Gather the boundary elements from each solution bank
+            for kerns, upts in zip(self._kerns, eles.scal_upts):
+                view = backend.view(
+                    np.full(nfaces, upts.mid), np.zeros_like(eidx), eidx,
+                    np.ones_like(eidx), vshape=(nupts, nvars)
+                )
+
+                kerns.append(backend.kernel(
+                    'gather', tplargs={'nupts': nupts, 'nvars': nvars},
+                    dims=[nfaces], u=view, out=usoln
+                ))
+                kerns.extend([*gradkerns, ffkern])
+
+            self._fmmats.append(fmmat)
 
     def __call__(self, intg):
         # Return if no output is due
@@ -136,83 +201,17 @@ class FluidForcePlugin(BasePlugin):
         # MPI info
         comm, rank, root = get_comm_rank_root()
 
-        # Solution matrices indexed by element type
-        solns = dict(zip(intg.system.ele_types, intg.soln))
-        ndims, nvars, mcomp = self.ndims, self.nvars, self._mcomp
-
-        # Force and moment vectors
-        fm = np.zeros((2 if self._viscous else 1, ndims + mcomp))
-
-        for etype, fidx in self._m0:
-            # Get the interpolation operator
-            m0 = self._m0[etype, fidx]
-            nfpts, nupts = m0.shape
-
-            # Extract the relevant elements from the solution
-            uupts = solns[etype][..., self._eidxs[etype, fidx]]
-
-            # Interpolate to the face
-            ufpts = m0 @ uupts.reshape(nupts, -1)
-            ufpts = ufpts.reshape(nfpts, nvars, -1)
-            ufpts = ufpts.swapaxes(0, 1)
-
-            # Compute the pressure
-            pidx = 0 if self._ac else -1
-            p = self.elementscls.con_to_pri(ufpts, self.cfg)[pidx]
-
-            # Get the quadrature weights and normal vectors
-            qwts = self._qwts[etype, fidx]
-            norms = self._norms[etype, fidx]
-
-            # Do the quadrature
-            fm[0, :ndims] += np.einsum('i...,ij,jik', qwts, p, norms)
-
-            if self._viscous:
-                # Get operator and J^-T matrix
-                m4 = self._m4[etype]
-                rcpjact = self._rcpjact[etype, fidx]
+        ndims, mcomp = self.ndims, self._mcomp
 
-                # Transformed gradient at solution points
-                tduupts = m4 @ uupts.reshape(nupts, -1)
-                tduupts = tduupts.reshape(ndims, nupts, nvars, -1)
+        # Evaluate the forces on each boundary face on the backend
+        intg.backend.run_kernels(self._kerns[intg._idxcurr], wait=True)
 
-                # Physical gradient at solution points
-                duupts = np.einsum('ijkl,jkml->ikml', rcpjact, tduupts)
-                duupts = duupts.reshape(ndims, nupts, -1)
+        # Sum the face contributions to obtain the force and moment vectors
+        fm = np.zeros((2 if self._viscous else 1)*(ndims + mcomp))
+        for m in self._fmmats:
+            fm += np.sum(m.get(), axis=1)
 
-                # Interpolate gradient to flux points
-                dufpts = np.array([m0 @ du for du in duupts])
-                dufpts = dufpts.reshape(ndims, nfpts, nvars, -1)
-                dufpts = dufpts.swapaxes(1, 2)
-
-                # Viscous stress
-                if self._ac:
-                    vis = self.ac_stress_tensor(dufpts)
-                else:
-                    vis = self.stress_tensor(ufpts, dufpts)
-
-                # Do the quadrature
-                fm[1, :ndims] += np.einsum('i...,klij,jil', qwts, vis, norms)
-
-            if self._mcomp:
-                # Get the flux points positions relative to the moment origin
-                rfpts = self._rfpts[etype, fidx]
-
-                # Do the cross product with the normal vectors
-                rcn = np.atleast_3d(np.cross(rfpts, norms))
-
-                # Pressure force moments
-                fm[0, ndims:] += np.einsum('i...,ij,jik->k', qwts, p, rcn)
-
-                if self._viscous:
-                    # Normal viscous force at each flux point
-                    viscf = np.einsum('ijkl,lkj->lki', vis, norms)
-
-                    # Normal viscous force moments at each flux point
-                    rcf = np.atleast_3d(np.cross(rfpts, viscf))
-
-                    # Do the quadrature
-                    fm[1, ndims:] += np.einsum('i,jik->k', qwts, rcf)
+        fm = fm.reshape(-1, ndims + mcomp)
 
         # Reduce and output if we're the root rank
         if rank != root:
@@ -221,38 +220,10 @@ class FluidForcePlugin(BasePlugin):
             comm.Reduce(mpi.IN_PLACE, fm, op=mpi.SUM, root=root)
 
             # Write
-            print(intg.tcurr, *fm.ravel(), sep=',', file=self.outf)
-
-            # Flush to disk
-            self.outf.flush()
-
-    def stress_tensor(self, u, du):
-        c = self._constants
-
-        # Density, energy
-        rho, E = u[0], u[-1]
-
-        # Gradient of density and momentum
-        gradrho, gradrhou = du[:, 0], du[:, 1:-1]
-
-        # Gradient of velocity
-        gradu = (gradrhou - gradrho[:, None]*u[None, 1:-1]/rho) / rho
-
-        # Bulk tensor
-        bulk = np.eye(self.ndims)[:, :, None, None]*np.trace(gradu)
-
-        # Viscosity
-        mu = c['mu']
-
-        if self._viscorr == 'sutherland':
-            cpT = c['gamma']*(E/rho - 0.5*np.sum(u[1:-1]**2, axis=0)/rho**2)
-            Trat = cpT/c['cpTref']
-            mu *= (c['cpTref'] + c['cpTs'])*Trat**1.5 / (cpT + c['cpTs'])
-
-        return -mu*(gradu + gradu.swapaxes(0, 1) - 2/3*bulk)
+            self._submit(self._write, intg.tcurr, fm.ravel())
 
-    def ac_stress_tensor(self, du):
-        # Gradient of velocity and kinematic viscosity
-        gradu, nu = du[:, 1:], self._constants['nu']
+    def _write(self, t, fm):
+        print(t, *fm, sep=',', file=self.outf)
 
-        return -nu*(gradu + gradu.swapaxes(0, 1))
+        # Flush to disk
+        self.outf.flush()
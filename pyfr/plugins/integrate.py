@@ -1,18 +1,20 @@
 # -*- coding: utf-8 -*-
 
+import math
 import re
 
 import numpy as np
 
 from pyfr.inifile import NoOptionError
 from pyfr.mpiutil import get_comm_rank_root, mpi
-from pyfr.nputil import npeval
-from pyfr.plugins.base import BasePlugin, init_csv
+from pyfr.nputil import block_diag
+from pyfr.plugins.base import (BackgroundMixin, BasePlugin, init_csv,
+                               pri_cexprs)
 from pyfr.quadrules import get_quadrule
 from pyfr.regions import ConstructiveRegion
 
 
-class IntegratePlugin(BasePlugin):
+class IntegratePlugin(BackgroundMixin, BasePlugin):
     name = 'integrate'
     systems = ['*']
     formulations = ['dual', 'std']
@@ -30,19 +32,20 @@ class IntegratePlugin(BasePlugin):
 
         # Expressions to integrate
         c = self.cfg.items_as('constants', float)
+        c |= dict(abs='fabs', pi=math.pi)
         self.exprs = [self.cfg.getexpr(cfgsect, k, subs=c)
                       for k in self.cfg.items(cfgsect)
                       if k.startswith('int-')]
 
+        # See if the expressions depend on time
+        self._tdep = any(re.search(r'\bt\b', ex) for ex in self.exprs)
+
         # Integration region pre-processing
         esetmask = self._prepare_esetmask(intg)
 
         # Gradient pre-processing
         self._init_gradients(intg)
 
-        # Save a reference to the physical solution point locations
-        self.plocs = system.ele_ploc_upts
-
         # Integration parameters
         self.nsteps = self.cfg.getint(cfgsect, 'nsteps')
 
@@ -54,9 +57,14 @@ class IntegratePlugin(BasePlugin):
             # Open
             self.outf = init_csv(self.cfg, cfgsect, ','.join(header))
 
-        # Prepare the per element-type info list
-        self.eleinfo = eleinfo = []
-        for ename, eles in system.ele_map.items():
+        # Register our integration kernel
+        backend = intg.backend
+        backend.pointwise.register('pyfr.plugins.kernels.integrate')
+
+        self._kerns = [[] for i in range(len(system.ele_banks[0]))]
+        self._intkerns, self._intmats = [], []
+
+        for i, (ename, eles) in enumerate(system.ele_map.items()):
             # Obtain quadrature info
             rname = self.cfg.get(f'solver-elements-{ename}', 'soln-pts')
 
@@ -80,19 +88,24 @@ class IntegratePlugin(BasePlugin):
                 m0 = None
 
             # Locations of each quadrature point
-            ploc = eles.ploc_at_np(r.pts).swapaxes(0, 1)
+            ploc = eles.ploc_at_np(r.pts)
 
             # Obtain the region mask
-            eset, emask = esetmask(ploc)
+            eset, emask = esetmask(ploc.swapaxes(0, 1))
+
+            # Skip element types which are entirely outside of the region
+            if not len(np.arange(eles.neles)[eset]):
+                continue
 
-            # Use this to subset the quadrature points
-            ploc = ploc[..., eset]
+            # Quadrature weights divided by the Jacobian determinants
+            wts = np.zeros((len(r.pts), eles.neles))
+            ewts = r.wts[:, None] / eles.rcpdjac_at_np(r.pts)[:, eset]
 
-            # Jacobian determinants at each quadrature point
-            rcpdjacs = eles.rcpdjac_at_np(r.pts)[:, eset]
+            # Zero the weights of any points outside of the region
+            ewts[emask] = 0
+            wts[:, eset] = ewts
 
-            # Save
-            eleinfo.append((ploc, r.wts[:, None] / rcpdjacs, m0, eset, emask))
+            self._prepare_kernels(intg, i, eles, ploc, wts, m0)
 
     def _prepare_esetmask(self, intg):
         region = self.cfg.get(self.cfgsect, 'region', '*')
@@ -130,57 +143,89 @@ class IntegratePlugin(BasePlugin):
         self._gradpinfo = [(pname, privarmap.index(pname))
                            for pname in gradpnames]
 
-    def _eval_exprs(self, intg):
-        intvals = np.zeros(len(self.exprs))
-
-        # Get the primitive variable names
-        pnames = self.elementscls.privarmap[self.ndims]
-
-        # Compute the gradients
+    def _prepare_kernels(self, intg, i, eles, ploc, wts, m0):
+        backend, system = intg.backend, intg.system
+        ndims, nvars, neles = self.ndims, self.nvars, eles.neles
+        nqpts = len(wts)
+
+        # Primitive variables and locations at each quadrature point
+        pexprs = []
+        for j in range(nqpts):
+            gradusym = f'gradsoln[{{d}}*{nqpts} + {j}][{{v}}]'
+            pex = pri_cexprs(self.elementscls, self.cfg, ndims, nvars,
+                             f'soln[{j}][{{v}}]',
+                             gradusym if self._gradpinfo else None)
+            pex |= {d: f'ploc[{j}][{k}]' for k, d in enumerate('xyz'[:ndims])}
+
+            # Only retain those required by our expressions
+            pexprs.append({k: v for k, v in pex.items()
+                           if any(re.search(rf'\b{k}\b', ex)
+                                  for ex in self.exprs)})
+
+        tplargs = {
+            'ndims': ndims, 'nvars': nvars, 'nqpts': nqpts,
+            'nexprs': len(self.exprs), 'iexprs': self.exprs, 'pexprs': pexprs
+        }
+
+        # Allocate the per-element integral matrix
+        intmat = backend.matrix((len(self.exprs), neles), tags={'align'})
+
+        kargs = {'wts': backend.const_matrix(wts), 'out': intmat}
+
+        # Quadrature point locations, if required
+        if any(d in pex for pex in pexprs for d in 'xyz'):
+            kargs['ploc'] = backend.const_matrix(ploc)
+
+        # If necessary, interpolate the gradients to the quadrature points
+        gradkerns = []
         if self._gradpinfo:
-            grad_soln = intg.grad_soln
+            vupts = system.eles_vect_upts[i]
 
-        # Iterate over each element type in the simulation
-        for i, (soln, eleinfo) in enumerate(zip(intg.soln, self.eleinfo)):
-            plocs, wts, m0, eset, emask = eleinfo
+            if m0 is not None:
+                m0v = backend.const_matrix(block_diag([m0]*ndims))
+                qgrads = backend.matrix((ndims, nqpts, nvars, neles),
+                                        tags={'align'})
+                gradkerns.append(backend.kernel('mul', m0v, vupts,
+                                                out=qgrads))
+                kargs['gradsoln'] = qgrads
+            else:
+                kargs['gradsoln'] = vupts
 
-            # Subset and transpose the solution
-            soln = soln[..., eset].swapaxes(0, 1)
+        # Create the kernels for each solution bank
+        if m0 is not None:
+            m0 = backend.const_matrix(m0)
+            qsoln = backend.matrix((nqpts, nvars, neles), tags={'align'})
 
-            # Interpolate the solution to the quadrature points
+        for kerns, upts in zip(self._kerns, system.ele_banks[i]):
             if m0 is not None:
-                soln = m0 @ soln
+                kerns.append(backend.kernel('mul', m0, upts, out=qsoln))
+                upts = qsoln
 
-            # Convert from conservative to primitive variables
-            psolns = self.elementscls.con_to_pri(soln, self.cfg)
+            intkern = backend.kernel('integrate', tplargs=tplargs,
+                                     dims=[neles], soln=upts, **kargs)
 
-            # Prepare the substitutions dictionary
-            subs = dict(zip(pnames, psolns), t=intg.tcurr)
-            subs |= dict(zip('xyz', plocs))
+            kerns.extend([*gradkerns, intkern])
+            self._intkerns.append(intkern)
 
-            # Prepare any required gradients
-            if self._gradpinfo:
-                grads = np.rollaxis(grad_soln[i], 2)[..., eset]
+        self._intmats.append(intmat)
 
-                # Interpolate the gradients to the quadrature points
-                if m0 is not None:
-                    grads = m0 @ grads
-
-                # Transform from conservative to primitive gradients
-                pgrads = self.elementscls.grad_con_to_pri(soln, grads,
-                                                          self.cfg)
+    def _eval_exprs(self, intg):
+        # Compute the gradients
+        if self._gradpinfo:
+            intg.system.compute_grads(intg.tcurr, intg._idxcurr)
 
-                # Add them to the substitutions dictionary
-                for pname, idx in self._gradpinfo:
-                    for dim, grad in zip('xyz', pgrads[idx]):
-                        subs[f'grad_{pname}_{dim}'] = grad
+        # Bind the current time
+        if self._tdep:
+            for k in self._intkerns:
+                k.bind(t=intg.tcurr)
 
-            for j, v in enumerate(self.exprs):
-                # Evaluate the expression at each point
-                iex = wts*npeval(v, subs)
+        # Evaluate the integrals for each element on the backend
+        intg.backend.run_kernels(self._kerns[intg._idxcurr], wait=True)
 
-                # Accumulate
-                intvals[j] += np.sum(iex) - np.sum(iex[emask])
+        # Sum the element contributions
+        intvals = np.zeros(len(self.exprs))
+        for m in self._intmats:
+            intvals += np.sum(m.get(), axis=1)
 
         return intvals
 
@@ -199,7 +244,10 @@ class IntegratePlugin(BasePlugin):
                 comm.Reduce(mpi.IN_PLACE, iintex, op=mpi.SUM, root=root)
 
                 # Write
-                print(intg.tcurr, *iintex, sep=',', file=self.outf)
+                self._submit(self._write, intg.tcurr, iintex)
+
+    def _write(self, t, iintex):
+        print(t, *iintex, sep=',', file=self.outf)
 
-                # Flush to disk
-                self.outf.flush()
+        # Flush to disk
+        self.outf.flush()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+<%inherit file='base'/>
+<%namespace module='pyfr.backends.base.makoutil' name='pyfr'/>
+
+<% nfm = ndims + mcomp %>
+<% cross = [(0, 1)] if ndims == 2 else [(1, 2), (2, 0), (0, 1)] %>
+
+<%pyfr:kernel name='fluidforce' ndim='1'
+              u='in fpdtype_t[${str(nupts)}][${str(nvars)}]'
+              gradu='in fpdtype_t[${str(ndims*nupts)}][${str(nvars)}]'
+              m0='in broadcast fpdtype_t[${str(nfpts)}][${str(nupts)}]'
+              qnorms='in fpdtype_t[${str(nfpts)}][${str(ndims)}]'
+              rfpts='in fpdtype_t[${str(nfpts)}][${str(ndims)}]'
+              out='out fpdtype_t[${str((1 + viscous)*nfm)}]'>
+    fpdtype_t acc[] = ${pyfr.array('0', i=(1 + viscous)*nfm)};
+
+    for (int f = 0; f < ${nfpts}; f++)
+    {
+        // Interpolate the solution and any gradients to the flux point
+        fpdtype_t uf[] = ${pyfr.array('0', i=nvars)};
+    % if viscous:
+        fpdtype_t duf[][${nvars}] = ${pyfr.array('0', i=ndims, j=nvars)};
+    % endif
+
+        for (int j = 0; j < ${nupts}; j++)
+        {
+            fpdtype_t w = m0[f][j];
+        % for v in range(nvars):
+            uf[${v}] += w*u[j][${v}];
+        % endfor
+        % for d, v in pyfr.ndrange(ndims if viscous else 0, nvars):
+            duf[${d}][${v}] += w*gradu[${d*nupts} + j][${v}];
+        % endfor
+        }
+
+        // Pressure force and moments
+        fpdtype_t p = ${pexpr};
+        fpdtype_t fp[] = ${pyfr.array('p*qnorms[f][{i}]', i=ndims)};
+
+    % for i in range(ndims):
+        acc[${i}] += fp[${i}];
+    % endfor
+    % for k, (a, b) in enumerate(cross[:mcomp]):
+        acc[${ndims + k}] += rfpts[f][${a}]*fp[${b}] - rfpts[f][${b}]*fp[${a}];
+    % endfor
+    % if viscous:
+
+        // Velocity gradients
+        fpdtype_t gu[${ndims}][${ndims}];
+    % for d, k in pyfr.ndrange(ndims, ndims):
+        gu[${d}][${k}] = ${gradvel[d][k]};
+    % endfor
+
+        // Viscosity
+    % if ac:
+        fpdtype_t mu_c = ${c['nu']};
+    % elif visc_corr == 'sutherland':
+        fpdtype_t rcprho = 1.0/uf[0];
+        fpdtype_t cpT = ${c['gamma']}*(rcprho*uf[${nvars - 1}]
+                      - 0.5*rcprho*rcprho*${pyfr.dot('uf[{i}]', i=(1, ndims + 1))});
+        fpdtype_t Trat = ${1/c['cpTref']}*cpT;
+        fpdtype_t mu_c = ${c['mu']*(c['cpTref'] + c['cpTs'])}*Trat*sqrt(Trat)
+                       / (cpT + ${c['cpTs']});
+    % else:
+        fpdtype_t mu_c = ${c['mu']};
+    % endif
+
+        // Viscous force and moments
+    % if not ac:
+        fpdtype_t trgu = ${' + '.join(f'gu[{i}][{i}]' for i in range(ndims))};
+    % endif
+        fpdtype_t fv[${ndims}];
+    % for i in range(ndims):
+<% sn = ' + '.join(f'(gu[{i}][{l}] + gu[{l}][{i}])*qnorms[f][{l}]'
+                   for l in range(ndims)) %>
+    % if ac:
+        fv[${i}] = -mu_c*(${sn});
+    % else:
+        fv[${i}] = -mu_c*(${sn} - ${2/3}*trgu*qnorms[f][${i}]);
+    % endif
+    % endfor
+
+    % for i in range(ndims):
+        acc[${nfm + i}] += fv[${i}];
+    % endfor
+    % for k, (a, b) in enumerate(cross[:mcomp]):
+        acc[${nfm + ndims + k}] += rfpts[f][${a}]*fv[${b}] - rfpts[f][${b}]*fv[${a}];
+    % endfor
+    % endif
+    }
+
+% for i in range((1 + viscous)*nfm):
+    out[${i}] = acc[${i}];
+% endfor
+</%pyfr:kernel>
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+<%inherit file='base'/>
+<%namespace module='pyfr.backends.base.makoutil' name='pyfr'/>
+
+<%pyfr:kernel name='gather' ndim='1'
+              u='in view fpdtype_t[${str(nupts)}][${str(nvars)}]'
+              out='out fpdtype_t[${str(nupts)}][${str(nvars)}]'>
+    for (int i = 0; i < ${nupts}; i++)
+    {
+    % for j in range(nvars):
+        out[i][${j}] = u[i][${j}];
+    % endfor
+    }
+</%pyfr:kernel>
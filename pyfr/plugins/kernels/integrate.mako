@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+<%inherit file='base'/>
+<%namespace module='pyfr.backends.base.makoutil' name='pyfr'/>
+
+<%pyfr:kernel name='integrate' ndim='1'
+              t='scalar fpdtype_t'
+              soln='in fpdtype_t[${str(nqpts)}][${str(nvars)}]'
+              gradsoln='in fpdtype_t[${str(ndims*nqpts)}][${str(nvars)}]'
+              ploc='in fpdtype_t[${str(nqpts)}][${str(ndims)}]'
+              wts='in fpdtype_t[${str(nqpts)}]'
+              out='out fpdtype_t[${str(nexprs)}]'>
+    fpdtype_t acc[] = ${pyfr.array('0', i=nexprs)};
+
+% for j, pex in enumerate(pexprs):
+    {
+        // Primitive variables and locations at quadrature point ${j}
+    % for pn, ex in pex.items():
+        fpdtype_t ${pn} = ${ex};
+    % endfor
+
+        // Accumulate the weighted integrands
+    % for i, ex in enumerate(iexprs):
+        acc[${i}] += wts[${j}]*${ex};
+    % endfor
+    }
+% endfor
+
+% for i in range(nexprs):
+    out[${i}] = acc[${i}];
+% endfor
+</%pyfr:kernel>
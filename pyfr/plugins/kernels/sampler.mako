@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+<%inherit file='base'/>
+<%namespace module='pyfr.backends.base.makoutil' name='pyfr'/>
+
+<%pyfr:kernel name='sampler' ndim='1'
+              u='in view fpdtype_t[${str(nupts)}][${str(nvars)}]'
+              op='in fpdtype_t[${str(nupts)}]'
+              s='out fpdtype_t[${str(nvars)}]'>
+% for i in range(nvars):
+    s[${i}] = ${pyfr.dot('op[{j}]', f'u[{{j}}][{i}]', j=nupts)};
+% endfor
+</%pyfr:kernel>
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+<%inherit file='base'/>
+<%namespace module='pyfr.backends.base.makoutil' name='pyfr'/>
+
+<%pyfr:kernel name='tavg' ndim='2'
+              dt='scalar fpdtype_t'
+              soln='in fpdtype_t[${str(nvars)}]'
+              gradsoln='in fpdtype_t[${str(ndims)}][${str(nvars)}]'
+              acc='inout fpdtype_t[${str(nexprs)}]'
+              prev='inout fpdtype_t[${str(nexprs)}]'>
+    // Primitive variables and gradients
+% for pn, ex in pexprs.items():
+    fpdtype_t ${pn} = ${ex};
+% endfor
+
+    // Accumulate the expressions using the trapezium rule
+% for i, ex in enumerate(aexprs):
+    fpdtype_t curr${i} = ${ex};
+    acc[${i}] += 0.5*dt*(prev[${i}] + curr${i});
+    prev[${i}] = curr${i};
+% endfor
+</%pyfr:kernel>
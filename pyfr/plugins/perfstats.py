@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+import numpy as np
+
+from pyfr.mpiutil import get_comm_rank_root
+from pyfr.plugins.base import BasePlugin, init_csv
+
+
+class PerfStatsPlugin(BasePlugin):
+    name = 'perfstats'
+    systems = ['*']
+    formulations = ['dual', 'std']
+
+    # Timing categories
+    tnames = ['step', 'compute', 'wait', 'plugin']
+
+    def __init__(self, intg, cfgsect, suffix=None):
+        super().__init__(intg, cfgsect, suffix)
+
+        comm, rank, root = get_comm_rank_root()
+
+        # Output frequency
+        self.nsteps = self.cfg.getint(cfgsect, 'nsteps')
+
+        # Number of slowest ranks to output
+        self.nslowest = self.cfg.getint(cfgsect, 'nslowest', 0)
+        if not 0 <= self.nslowest <= comm.size:
+            raise ValueError('Invalid number of slowest ranks')
+
+        # Initial step counts and timings
+        self._prev = self._sample(intg)
+
+        # The root rank needs to open the output file
+        if rank == root:
+            header = ['n', 't']
+            for k in self.tnames:
+                header += [f'{k}-min', f'{k}-mean', f'{k}-max', f'{k}-imb']
+            header += [f'slowest-{i}' for i in range(self.nslowest)]
+
+            # Open
+            self.outf = init_csv(self.cfg, cfgsect, ','.join(header))
+
+    def _sample(self, intg):
+        return np.array([intg.nsteps, time.perf_counter(),
+                         intg.system.rhs_wait_time(), intg.plugin_wtime])
+
+    def __call__(self, intg):
+        if intg.nacptsteps % self.nsteps:
+            return
+
+        # Determine what has changed since our last output
+        curr = self._sample(intg)
+        dn, wtime, wait, plugin = curr - self._prev
+
+        # Skip if no steps have been taken
+        if not dn:
+            return
+
+        self._prev = curr
+
+        # Average per-step timings on this rank
+        times = np.array([wtime, wtime - wait - plugin, wait, plugin]) / dn
+
+        # MPI info
+        comm, rank, root = get_comm_rank_root()
+
+        # Gather the timings onto the root rank
+        if rank != root:
+            comm.Gather(times, None, root=root)
+        else:
+            rtimes = np.empty((comm.size, len(times)))
+            comm.Gather(times, rtimes, root=root)
+
+            # Compute the statistics and imbalance factors
+            tmin, tmean, tmax = rtimes.min(0), rtimes.mean(0), rtimes.max(0)
+            timb = np.divide(tmax, tmean, out=np.ones_like(tmax),
+                             where=tmean > 0)
+            stats = np.column_stack([tmin, tmean, tmax, timb]).ravel()
+
+            # Ranks which spent the longest computing
+            slowest = np.argsort(-rtimes[:, 1], kind='stable')
+            slowest = slowest[:self.nslowest]
+
+            # Write
+            print(intg.nacptsteps, intg.tcurr, *stats, *slowest, sep=',',
+                  file=self.outf)
+
+            # Flush to disk
+            self.outf.flush()
@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import h5py
 import numpy as np
 
 from pyfr.mpiutil import get_comm_rank_root, mpi
-from pyfr.plugins.base import BasePlugin, init_csv
+from pyfr.plugins.base import BackgroundMixin, BasePlugin, init_csv
 from pyfr.quadrules import get_quadrule
 
 
 def _closest_pts_bf(epts, pts):
+    closest = []
+
     for p in pts:
         # Compute the distances between each point and p
         dists = [np.linalg.norm(e - p, axis=2) for e in epts]
@@ -19,7 +22,10 @@ def _closest_pts_bf(epts, pts):
         dmins = [d[a] for d, a in zip(dists, amins)]
 
         # Find the minimum across all element types
-        yield min(zip(dmins, range(len(epts)), amins))
+        dmin, etype, (uidx, eidx) = min(zip(dmins, range(len(epts)), amins))
+        closest.append((dmin, etype, uidx, eidx))
+
+    return tuple(np.array(c) for c in zip(*closest))
 
 
 def _closest_pts_kd(epts, pts):
@@ -28,28 +34,27 @@ def _closest_pts_kd(epts, pts):
     # Flatten the physical location arrays
     fepts = [e.reshape(-1, e.shape[-1]) for e in epts]
 
-    # For each element type construct a KD-tree of the upt locations
-    trees = [cKDTree(f) for f in fepts]
+    # For each element type query the closest upt to each point
+    dmins, amins = zip(*[cKDTree(f).query(pts) for f in fepts])
 
-    for p in pts:
-        # Query the distance/index of the closest upt to p
-        dmins, amins = zip(*[t.query(p) for t in trees])
+    # Reduce across element types
+    etype = np.argmin(dmins, axis=0)
+    dmin = np.choose(etype, dmins)
+    amin = np.choose(etype, amins)
 
-        # Unravel the indices
-        amins = [np.unravel_index(i, e.shape[:2])
-                 for i, e in zip(amins, epts)]
+    # Unravel the indices
+    neles = np.array([e.shape[1] for e in epts])[etype]
 
-        # Reduce across element types
-        yield min(zip(dmins, range(len(epts)), amins))
+    return dmin, etype, amin // neles, amin % neles
 
 
 def _closest_pts(epts, pts):
     try:
         # Attempt to use a KD-tree based approach
-        yield from _closest_pts_kd(epts, pts)
+        return _closest_pts_kd(epts, pts)
     except ImportError:
         # Otherwise fall back to brute force
-        yield from _closest_pts_bf(epts, pts)
+        return _closest_pts_bf(epts, pts)
 
 
 def _plocs_to_tlocs(sbasis, spts, plocs, tlocs):
@@ -82,11 +87,15 @@ def _plocs_to_tlocs(sbasis, spts, plocs, tlocs):
     return ktlocs, kplocs
 
 
-class SamplerPlugin(BasePlugin):
+class SamplerPlugin(BackgroundMixin, BasePlugin):
     name = 'sampler'
     systems = ['*']
     formulations = ['dual', 'std']
 
+    # Layout of the MPI_DOUBLE_INT type used for MINLOC reductions
+    _dist_rank_dtype = np.dtype([('dist', float), ('rank', np.int32)],
+                                align=True)
+
     def __init__(self, intg, cfgsect, suffix):
         super().__init__(intg, cfgsect, suffix)
 
@@ -100,38 +109,37 @@ class SamplerPlugin(BasePlugin):
         self.pts = self.cfg.getliteral(cfgsect, 'samp-pts')
         self.fmt = self.cfg.get(cfgsect, 'format', 'primitive')
 
+        # Number of samples to buffer before writing and flush frequency
+        self.nbatch = self.cfg.getint(cfgsect, 'nbatch', 1)
+        self.flushsteps = self.cfg.getint(cfgsect, 'flushsteps', 500)
+
         # MPI info
         comm, rank, root = get_comm_rank_root()
 
-        # MPI rank responsible for each sample point
-        if rank == root:
-            ptsrank = []
-
-        # Sample points we're responsible for, grouped by element type
-        elepts = [[] for i in range(len(intg.system.ele_map))]
-
         # Search locations in transformed and physical space
         tlocs, plocs = self._search_pts(intg)
 
         # For each sample point find our nearest search location
-        closest = _closest_pts(plocs, self.pts)
+        dists, etypes, uidx, eidx = _closest_pts(plocs, self.pts)
 
-        # Process these points
-        for i, (dist, etype, (uidx, eidx)) in enumerate(closest):
-            # Reduce over the distance
-            _, mrank = comm.allreduce((dist, rank), op=mpi.MINLOC)
+        # Reduce over the distances to find the rank closest to each point
+        dranks = np.empty(len(self.pts), dtype=self._dist_rank_dtype)
+        dranks['dist'], dranks['rank'] = dists, rank
+        comm.Allreduce(mpi.IN_PLACE, [dranks, mpi.DOUBLE_INT], op=mpi.MINLOC)
 
-            # If we have the closest point then save the relevant info
-            if rank == mrank:
-                elepts[etype].append((i, eidx, tlocs[etype][uidx]))
-
-            # Note what rank is responsible for the point
-            if rank == root:
-                ptsrank.append(mrank)
+        # Sample points we're responsible for, grouped by element type
+        ptsrank = dranks['rank']
+        elepts = []
+        for i, tloc in enumerate(tlocs):
+            idx = np.flatnonzero((ptsrank == rank) & (etypes == i))
+            elepts.append((idx, eidx[idx], tloc[uidx[idx]]))
 
         # Refine
         self._ourpts = ourpts = self._refine_pts(intg, elepts)
 
+        # Prepare the kernels to interpolate the solution to these points
+        self._prepare_kernels(intg)
+
         # Send the refined sample locations to the root rank
         ptsplocs = comm.gather([pl for et, ei, pl, op in ourpts], root=root)
 
@@ -142,27 +150,97 @@ class SamplerPlugin(BasePlugin):
             self._ptsbuf = ptsbuf = np.empty((len(self.pts), self.nvars))
 
             # Tally up how many points each rank is responsible for
-            nptsrank = [len(ploc) for ploc in ptsplocs]
+            nptsrank = np.bincount(ptsrank, minlength=comm.size)
 
             # Compute the counts and displacements, sans nvars
-            ptscounts = np.array(nptsrank, dtype=np.int32)
-            ptsdisps = np.cumsum([0] + nptsrank[:-1], dtype=np.int32)
-
-            # Apply the displacements to each ranks points
-            miters = [enumerate(ploc, start=pdisp)
-                      for ploc, pdisp in zip(ptsplocs, ptsdisps)]
+            ptscounts = nptsrank.astype(np.int32)
+            ptsdisps = (np.cumsum(nptsrank) - nptsrank).astype(np.int32)
+
+            # Points arrive grouped by rank and ordered by index; use this
+            # to determine where in the buffer each point will be found
+            self._ptsoff = np.empty(len(self.pts), dtype=int)
+            self._ptsoff[np.argsort(ptsrank, kind='stable')] = np.arange(
+                len(self.pts)
+            )
 
-            # With this form the final point (offset, location) list
-            self._ptsinfo = [next(miters[pr]) for pr in ptsrank]
+            # Refined physical location of each point
+            ptsplocs = [pl for ploc in ptsplocs for pl in ploc]
+            self._ptsplocs = np.array(ptsplocs)[self._ptsoff]
 
             # Form the MPI Gatherv receive buffer tuple
             self._ptsrecv = (ptsbuf, (nvars*ptscounts, nvars*ptsdisps))
 
+            # Buffers for batching up the samples and times
+            self._sampbuf = np.empty((self.nbatch, len(self.pts), nvars))
+            self._tbuf = np.empty(self.nbatch)
+            self._nbuf = self._lastflush = 0
+
             # Open the output file
-            self.outf = init_csv(self.cfg, cfgsect, self._header)
+            if self.cfg.get(cfgsect, 'file').endswith('.h5'):
+                self._init_h5(cfgsect)
+            else:
+                self._h5 = None
+                self.outf = init_csv(self.cfg, cfgsect, self._header)
         else:
             self._ptsrecv = None
 
+    def _init_h5(self, cfgsect):
+        npts, nvars = len(self.pts), self.nvars
+        names = self._header.split(',')[self.ndims + 1:]
+
+        self.outf = h5py.File(self.cfg.get(cfgsect, 'file'), 'a')
+        path = self.cfg.get(cfgsect, 'file-dataset', 'sampler')
+
+        # Append to an existing group after checking it is compatible
+        if path in self.outf:
+            grp = self.outf[path]
+
+            if (grp['samps'].shape[1:] != (npts, nvars) or
+                list(grp.attrs['names']) != names or
+                not np.allclose(grp['pts'], self._ptsplocs)):
+                raise RuntimeError('Inconsistent sampler dataset')
+        # Otherwise create it with the point locations stored once
+        else:
+            grp = self.outf.create_group(path)
+            grp['pts'] = self._ptsplocs
+            grp.attrs['names'] = names
+
+            grp.create_dataset('t', (0,), float, chunks=(self.nbatch,),
+                               maxshape=(None,))
+            grp.create_dataset('samps', (0, npts, nvars), float,
+                               chunks=(self.nbatch, npts, nvars),
+                               maxshape=(None, npts, nvars))
+
+        self._h5 = (grp['t'], grp['samps'])
+
+    def _write_samples(self, flush=False):
+        n = self._nbuf
+
+        # Hand off the buffered samples and reset the buffer
+        self._submit(self._write_batch, self._tbuf[:n], self._sampbuf[:n],
+                     flush)
+        self._nbuf = 0
+
+    def _write_batch(self, t, samps, flush):
+        n = len(t)
+
+        if n and self._h5:
+            # Extend the datasets and write the batch as a single chunk
+            for ds, buf in zip(self._h5, [t, samps]):
+                ds.resize(len(ds) + n, axis=0)
+                ds[-n:] = buf
+        elif n:
+            # Format all of the rows and write them out in one go
+            rows = [
+                ','.join(map(str, [tc, *ploc, *samp]))
+                for tc, tsamps in zip(t.tolist(), samps.tolist())
+                for ploc, samp in zip(self._ptsplocs.tolist(), tsamps)
+            ]
+            print(*rows, sep='\n', file=self.outf)
+
+        if flush:
+            self.outf.flush()
+
     @property
     def _header(self):
         colnames = ['t', 'x', 'y', 'z'][:self.ndims + 1]
@@ -197,34 +275,74 @@ class SamplerPlugin(BasePlugin):
 
     def _refine_pts(self, intg, elepts):
         elelist = intg.system.ele_map.values()
-        ptsinfo = []
+        pts = np.array(self.pts)
+        ptsidx, ptsinfo = [], []
 
         # Loop over all the points for each element type
-        for etype, (eles, epts) in enumerate(zip(elelist, elepts)):
-            if not epts:
+        for etype, (eles, (idx, eidx, tlocs)) in enumerate(zip(elelist,
+                                                               elepts)):
+            if not len(idx):
                 continue
 
-            idx, eidx, tlocs = zip(*epts)
             spts = eles.eles[:, eidx, :]
-            plocs = [self.pts[i] for i in idx]
 
             # Use Newton's method to find the precise transformed locations
-            ntlocs, nplocs = _plocs_to_tlocs(eles.basis.sbasis, spts, plocs,
-                                             tlocs)
+            ntlocs, nplocs = _plocs_to_tlocs(eles.basis.sbasis, spts,
+                                             pts[idx], tlocs)
 
             # Form the corresponding interpolation operators
             intops = eles.basis.ubasis.nodal_basis_at(ntlocs)
 
             # Append to the point info list
-            ptsinfo.extend(
-                (*info, etype) for info in zip(idx, eidx, nplocs, intops)
-            )
+            ptsidx.append(idx)
+            ptsinfo.extend(zip([etype]*len(idx), eidx, nplocs, intops))
+
+        # Sort our info array by its original index and return
+        order = np.argsort(np.concatenate(ptsidx or [[]]), kind='stable')
+
+        return [ptsinfo[i] for i in order]
+
+    def _prepare_kernels(self, intg):
+        backend, nvars = intg.backend, self.nvars
+        ptsetypes = np.array([etype for etype, *_ in self._ourpts], dtype=int)
+
+        # Register our interpolation kernel
+        backend.pointwise.register('pyfr.plugins.kernels.sampler')
+
+        self._kerns = [[] for i in range(len(intg.system.ele_banks[0]))]
+        self._sampmats, ptsidx = [], []
+
+        for i, eles in enumerate(intg.system.ele_map.values()):
+            idx = np.flatnonzero(ptsetypes == i)
+            if not len(idx):
+                continue
+
+            # Pack the element numbers and interpolation operators
+            eidx = np.array([self._ourpts[j][1] for j in idx])
+            ops = np.array([self._ourpts[j][3] for j in idx])
+
+            # Allocate the matrices
+            opmat = backend.const_matrix(ops.T)
+            sampmat = backend.matrix((nvars, len(idx)), tags={'align'})
 
-        # Sort our info array by its original index
-        ptsinfo.sort()
+            # Create a kernel for each solution bank
+            tplargs = {'nupts': eles.nupts, 'nvars': nvars}
+            for kerns, upts in zip(self._kerns, eles.scal_upts):
+                view = backend.view(
+                    np.full(len(idx), upts.mid), np.zeros_like(eidx), eidx,
+                    np.ones_like(eidx), vshape=(eles.nupts, nvars)
+                )
 
-        # Strip the index, move etype to the front, and return
-        return [(etype, *info) for idx, *info, etype in ptsinfo]
+                kerns.append(backend.kernel(
+                    'sampler', tplargs=tplargs, dims=[len(idx)], u=view,
+                    op=opmat, s=sampmat
+                ))
+
+            self._sampmats.append(sampmat)
+            ptsidx.append(idx)
+
+        # Permutation to restore the ordering of our points
+        self._sampperm = np.argsort(np.concatenate(ptsidx or [[]]))
 
     def _process_samples(self, samps):
         samps = np.array(samps)
@@ -244,21 +362,39 @@ class SamplerPlugin(BasePlugin):
         # MPI info
         comm, rank, root = get_comm_rank_root()
 
-        # Get the solution matrices
-        solns = intg.soln
+        # Interpolate the current solution to our points on the backend
+        intg.backend.run_kernels(self._kerns[intg._idxcurr], wait=True)
 
-        # Perform the sampling and interpolation
-        samples = [op @ solns[et][:, :, ei] for et, ei, _, op in self._ourpts]
-        samples = self._process_samples(samples)
+        # Copy the samples back to the host
+        samples = [m.get() for m in self._sampmats]
+        samples = np.hstack([np.empty((self.nvars, 0)), *samples]).T
+        samples = self._process_samples(samples[self._sampperm])
 
         # Gather to the root rank
         comm.Gatherv(samples, self._ptsrecv, root=root)
 
         # If we're the root rank then output
         if rank == root:
-            for off, ploc in self._ptsinfo:
-                print(intg.tcurr, *ploc, *self._ptsbuf[off], sep=',',
-                      file=self.outf)
+            self._sampbuf[self._nbuf] = self._ptsbuf[self._ptsoff]
+            self._tbuf[self._nbuf] = intg.tcurr
+            self._nbuf += 1
 
-            # Flush to disk
-            self.outf.flush()
+            # Periodically flush to disk
+            flush = intg.nacptsteps - self._lastflush >= self.flushsteps
+
+            # Write out the batch once it is full or a flush is due
+            if self._nbuf == self.nbatch or flush:
+                self._write_samples(flush)
+
+            if flush:
+                self._lastflush = intg.nacptsteps
+
+    def finalise(self, intg):
+        comm, rank, root = get_comm_rank_root()
+
+        if rank == root:
+            self._write_samples(flush=True)
+            self._lastflush = intg.nacptsteps
+
+        # Wait for any outstanding writes
+        super().finalise(intg)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import math
 import re
 
 import numpy as np
@@ -7,8 +8,8 @@ import numpy as np
 from pyfr.inifile import Inifile
 from pyfr.mpiutil import get_comm_rank_root
 from pyfr.nputil import npeval
-from pyfr.plugins.base import BasePlugin, PostactionMixin, RegionMixin
-from pyfr.writers.native import NativeWriter
+from pyfr.plugins.base import (BasePlugin, PostactionMixin, RegionMixin,
+                               init_native_writer, pri_cexprs)
 
 
 class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
@@ -16,6 +17,9 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
     systems = ['*']
     formulations = ['dual', 'std']
 
+    # Number of backend accumulations between host reductions
+    nfold = 64
+
     def __init__(self, intg, cfgsect, suffix=None):
         super().__init__(intg, cfgsect, suffix)
 
@@ -39,16 +43,15 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
         else:
             raise ValueError('Invalid floating point data type')
 
-        # Base output directory and file name
-        basedir = self.cfg.getpath(self.cfgsect, 'basedir', '.', abs=True)
-        basename = self.cfg.get(self.cfgsect, 'basename')
-
         # Construct the file writer
-        self._writer = NativeWriter(intg, basedir, basename, 'tavg')
+        self._writer = init_native_writer(intg, cfgsect, 'tavg')
 
         # Gradient pre-processing
         self._init_gradients(intg)
 
+        # Accumulation kernels
+        self._init_kernels(intg)
+
         # Time averaging parameters
         self.tstart = self.cfg.getfloat(cfgsect, 'tstart', 0.0)
         self.dtout = self.cfg.getfloat(cfgsect, 'dt-out')
@@ -64,13 +67,16 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
         cfg, cfgsect = self.cfg, self.cfgsect
         c = self.cfg.items_as('constants', float)
         self.anames, self.aexprs = [], []
+
+        # Function substitutions for the backend accumulation expressions
+        csubs = c | dict(abs='fabs', pi=math.pi)
         self.outfields, self.fexprs = [], []
 
         # Iterate over accumulation expressions first
         for k in cfg.items(cfgsect):
             if k.startswith('avg-'):
                 self.anames.append(k[4:])
-                self.aexprs.append(cfg.getexpr(cfgsect, k, subs=c))
+                self.aexprs.append(cfg.getexpr(cfgsect, k, subs=csubs))
                 self.outfields.append(k)
 
         # Followed by any functional expressions
@@ -89,54 +95,83 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
         self._gradpinfo = [(pname, privarmap.index(pname))
                            for pname in gradpnames]
 
-    def _init_accumex(self, intg):
-        self.prevt = self.tout_last = intg.tcurr
-        self.prevex = self._eval_acc_exprs(intg)
-        self.accex = [np.zeros_like(p, dtype=np.float64) for p in self.prevex]
+    def _init_kernels(self, intg):
+        backend, system = intg.backend, intg.system
+        nexprs = len(self.aexprs)
 
-        # Extra state for continuous accumulation
-        if self.mode == 'continuous':
-            self.caccex = [np.zeros_like(a) for a in self.accex]
-            self.tstart_actual = intg.tcurr
+        # Register our accumulation kernel
+        backend.pointwise.register('pyfr.plugins.kernels.tavg')
 
-    def _eval_acc_exprs(self, intg):
-        exprs = []
+        # Primitive variables and gradients required by our expressions
+        gradusym = 'gradsoln[{d}][{v}]' if self._gradpinfo else None
+        pexprs = pri_cexprs(self.elementscls, self.cfg, self.ndims,
+                            self.nvars, gradusym=gradusym)
+        pexprs = {k: v for k, v in pexprs.items()
+                  if any(re.search(rf'\b{k}\b', ex) for ex in self.aexprs)}
 
-        # Get the primitive variable names
-        pnames = self.elementscls.privarmap[self.ndims]
+        tplargs = {
+            'ndims': self.ndims, 'nvars': self.nvars, 'nexprs': nexprs,
+            'pexprs': pexprs, 'aexprs': self.aexprs
+        }
 
-        # Compute the gradients
-        if self._gradpinfo:
-            grad_soln = intg.grad_soln
+        self._accmats, self._prevmats, self._accsums = [], [], []
+        self._kerns = [[] for i in range(len(system.ele_banks[0]))]
 
-        # Iterate over each element type in the simulation
         for idx, etype, rgn in self._ele_regions:
-            soln = intg.soln[idx][..., rgn].swapaxes(0, 1)
-
-            # Convert from conservative to primitive variables
-            psolns = self.elementscls.con_to_pri(soln, self.cfg)
+            nupts, nvars, neles = system.ele_shapes[idx]
 
-            # Prepare the substitutions dictionary
-            subs = dict(zip(pnames, psolns))
+            # Allocate the accumulated and previous expression matrices
+            shape = (nupts, nexprs, neles)
+            acc = backend.matrix(shape, np.zeros(shape), tags={'align'})
+            prev = backend.matrix(shape, np.zeros(shape), tags={'align'})
 
-            # Prepare any required gradients
+            kargs = {'acc': acc, 'prev': prev}
             if self._gradpinfo:
-                grads = np.rollaxis(grad_soln[idx], 2)[..., rgn]
+                kargs['gradsoln'] = system.eles_vect_upts[idx]
 
-                # Transform from conservative to primitive gradients
-                pgrads = self.elementscls.grad_con_to_pri(soln, grads,
-                                                          self.cfg)
+            # Create a kernel for each solution bank
+            for kerns, soln in zip(self._kerns, system.ele_banks[idx]):
+                kerns.append(backend.kernel(
+                    'tavg', tplargs=tplargs, dims=[nupts, neles], soln=soln,
+                    **kargs
+                ))
 
-                # Add them to the substitutions dictionary
-                for pname, idx in self._gradpinfo:
-                    for dim, grad in zip('xyz', pgrads[idx]):
-                        subs[f'grad_{pname}_{dim}'] = grad
+            self._accmats.append(acc)
+            self._prevmats.append(prev)
 
-            # Evaluate the expressions
-            exprs.append([npeval(v, subs) for v in self.aexprs])
+            # Double precision host totals for the accumulated expressions
+            self._accsums.append(np.zeros(shape))
 
-        # Stack up the expressions for each element type and return
-        return [np.dstack(exs).swapaxes(1, 2) for exs in exprs]
+    def _init_accumex(self, intg):
+        self.prevt = self.tout_last = intg.tcurr
+
+        # Evaluate the expressions without accumulating them
+        self._accumulate(intg, 0.0)
+        self._nacc = 0
+
+        # Extra state for continuous accumulation
+        if self.mode == 'continuous':
+            self.caccex = [np.zeros(m.ioshape)[..., rgn] for m, (*_, rgn)
+                           in zip(self._accmats, self._ele_regions)]
+            self.tstart_actual = intg.tcurr
+
+    def _accumulate(self, intg, dt, wait=False):
+        # Compute the gradients
+        if self._gradpinfo:
+            intg.system.compute_grads(intg.tcurr, intg._idxcurr)
+
+        # Evaluate and accumulate the expressions on the backend
+        kerns = self._kerns[intg._idxcurr]
+        for k in kerns:
+            k.bind(dt=dt)
+
+        intg.backend.run_kernels(kerns, wait=wait)
+
+    def _fold(self):
+        # Add the backend partial sums into the host totals and reset them
+        for m, s in zip(self._accmats, self._accsums):
+            s += m.get()
+            m.set(np.zeros(m.ioshape))
 
     def _eval_fun_exprs(self, intg, accex):
         exprs = []
@@ -146,12 +181,15 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
             # Prepare the substitution dictionary
             subs = dict(zip(self.anames, avals.swapaxes(0, 1)))
 
-            exprs.append([npeval(v, subs) for v in self.fexprs])
+            exprs.append([npeval(v, subs, self.cfg) for v in self.fexprs])
 
         # Stack up the expressions for each element type and return
         return [np.dstack(exs).swapaxes(1, 2) for exs in exprs]
 
     def __call__(self, intg):
+        # Finalise any completed asynchronous writes
+        self._writer.probe()
+
         # If we are not supposed to be averaging yet then return
         if intg.tcurr < self.tstart:
             return
@@ -166,25 +204,31 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
         doaccum = intg.nacptsteps % self.nsteps == 0
 
         if dowrite or doaccum:
-            # Evaluate the time averaging expressions
-            currex = self._eval_acc_exprs(intg)
+            self._nacc += 1
+
+            # See if the partial sums should be moved to the host
+            dofold = dowrite or self._nacc % self.nfold == 0
 
-            # Accumulate them; always do this even when just writing
-            for a, p, c in zip(self.accex, self.prevex, currex):
-                a += 0.5*(intg.tcurr - self.prevt)*(p + c)
+            # Accumulate the expressions; always do this even when writing
+            self._accumulate(intg, intg.tcurr - self.prevt, wait=dofold)
 
-            # Save the time and solution
+            # Save the time
             self.prevt = intg.tcurr
-            self.prevex = currex
+
+            if dofold:
+                self._fold()
 
             if dowrite:
                 comm, rank, root = get_comm_rank_root()
 
+                # Extract the accumulated expressions in our region
+                accex = [s[..., rgn] for s, (*_, rgn)
+                         in zip(self._accsums, self._ele_regions)]
+
                 if self.mode == 'windowed':
-                    accex = self.accex
                     tstart = self.tout_last
                 else:
-                    for a, c in zip(self.accex, self.caccex):
+                    for a, c in zip(accex, self.caccex):
                         c += a
 
                     accex = self.caccex
@@ -218,15 +262,15 @@ class TavgPlugin(PostactionMixin, RegionMixin, BasePlugin):
                 else:
                     metadata = None
 
-                # Write to disk
-                solnfname = self._writer.write(data, intg.tcurr, metadata)
-
-                # If a post-action has been registered then invoke it
-                self._invoke_postaction(intg=intg, mesh=intg.system.mesh.fname,
-                                        soln=solnfname, t=intg.tcurr)
+                # Write to disk, invoking any post-action once done
+                self._writer.write(data, intg.tcurr, metadata,
+                                   callback=self._postaction_callback(intg))
 
                 # Reset the accumulators
-                for a in self.accex:
-                    a.fill(0)
+                for s in self._accsums:
+                    s.fill(0)
 
                 self.tout_last = intg.tcurr
+
+    def finalise(self, intg):
+        self._writer.flush()
@@ -2,8 +2,8 @@
 
 from pyfr.inifile import Inifile
 from pyfr.mpiutil import get_comm_rank_root
-from pyfr.plugins.base import BasePlugin, PostactionMixin, RegionMixin
-from pyfr.writers.native import NativeWriter
+from pyfr.plugins.base import (BasePlugin, PostactionMixin, RegionMixin,
+                               init_native_writer)
 
 
 class WriterPlugin(PostactionMixin, RegionMixin, BasePlugin):
@@ -14,12 +14,8 @@ class WriterPlugin(PostactionMixin, RegionMixin, BasePlugin):
     def __init__(self, intg, cfgsect, suffix=None):
         super().__init__(intg, cfgsect, suffix)
 
-        # Base output directory and file name
-        basedir = self.cfg.getpath(self.cfgsect, 'basedir', '.', abs=True)
-        basename = self.cfg.get(self.cfgsect, 'basename')
-
         # Construct the solution writer
-        self._writer = NativeWriter(intg, basedir, basename, 'soln')
+        self._writer = init_native_writer(intg, cfgsect, 'soln')
 
         # Output time step and last output time
         self.dt_out = self.cfg.getfloat(cfgsect, 'dt-out')
@@ -40,6 +36,9 @@ class WriterPlugin(PostactionMixin, RegionMixin, BasePlugin):
             self.tout_last -= self.dt_out
 
     def __call__(self, intg):
+        # Finalise any completed asynchronous writes
+        self._writer.probe()
+
         if intg.tcurr - self.tout_last < self.dt_out - self.tol:
             return
 
@@ -74,12 +73,12 @@ class WriterPlugin(PostactionMixin, RegionMixin, BasePlugin):
         for idx, etype, rgn in self._ele_regions:
             data[etype] = intg.soln[idx][..., rgn].astype(self.fpdtype)
 
-        # Write out the file
-        solnfname = self._writer.write(data, intg.tcurr, metadata)
-
-        # If a post-action has been registered then invoke it
-        self._invoke_postaction(intg=intg, mesh=intg.system.mesh.fname,
-                                soln=solnfname, t=intg.tcurr)
+        # Write out the file, invoking any post-action once it is on disk
+        self._writer.write(data, intg.tcurr, metadata,
+                           callback=self._postaction_callback(intg))
 
         # Update the last output time
         self.tout_last = intg.tcurr
+
+    def finalise(self, intg):
+        self._writer.flush()
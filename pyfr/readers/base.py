@@ -12,6 +12,84 @@ from pyfr.shapes import BaseShape
 from pyfr.util import subclass_where
 
 
+def _rotation_between(u, v):
+    ndim = len(u)
+
+    # Promote to three dimensions
+    u, v = np.pad(u, (0, 3 - ndim)), np.pad(v, (0, 3 - ndim))
+    w, c = np.cross(u, v), u @ v
+
+    # Anti-parallel vectors do not define a unique rotation
+    if c < -1 + 1e-8:
+        return None
+
+    # Rodrigues' formula for the rotation taking u onto v
+    wx = np.array([[0, -w[2], w[1]], [w[2], 0, -w[0]], [-w[1], w[0], 0]])
+    q = np.eye(3) + wx + wx @ wx / (1 + c)
+
+    return q[:ndim, :ndim]
+
+
+def _rigid_transforms(lpts, rpts, tol):
+    lc, rc = lpts.mean(axis=0), rpts.mean(axis=0)
+
+    # Start with a pure translation
+    yield np.eye(lpts.shape[1]), rc - lc
+
+    if len(lpts) < 2:
+        return
+
+    # Normals of the planes best fitting each set of points
+    ln = np.linalg.eigh(np.cov(lpts.T))[1][:, 0]
+    rn = np.linalg.eigh(np.cov(rpts.T))[1][:, 0]
+
+    # Rotations taking one plane onto the other
+    for sn in [rn, -rn]:
+        q = _rotation_between(ln, sn)
+        if q is None or np.allclose(q, np.eye(len(q))):
+            continue
+
+        # Translation mapping one centroid onto the other
+        t = rc - q @ lc
+
+        # Require the axis of rotation to lie in both planes
+        x = np.linalg.lstsq(np.eye(len(q)) - q, t, rcond=None)[0]
+        if abs(ln @ (x - lc)) < tol and abs(rn @ (x - rc)) < tol:
+            yield q, t
+
+
+def _match_pts_kd(lpts, rpts, tol):
+    from scipy.spatial import cKDTree
+
+    # Construct a KD-tree of the right hand points
+    tree = cKDTree(rpts)
+
+    # Look for a transform mapping each left point onto a right point
+    for q, t in _rigid_transforms(lpts, rpts, tol):
+        dists, ridx = tree.query(lpts @ q.T + t, distance_upper_bound=tol)
+
+        if np.all(dists < tol) and len(np.unique(ridx)) == len(ridx):
+            return np.arange(len(lpts)), ridx
+
+    raise ValueError('Unable to match periodic faces')
+
+
+def _match_pts_fuzzy(lpts, rpts, tol):
+    lidx = fuzzysort(lpts.T, range(len(lpts)))
+    ridx = fuzzysort(rpts.T, range(len(rpts)))
+
+    return lidx, ridx
+
+
+def _match_pts(lpts, rpts, tol):
+    try:
+        # Attempt to use a KD-tree based approach
+        return _match_pts_kd(lpts, rpts, tol)
+    except ImportError:
+        # Otherwise fall back to sorting
+        return _match_pts_fuzzy(lpts, rpts, tol)
+
+
 class BaseReader:
     def __init__(self):
         pass
@@ -47,6 +125,12 @@ class NodalMeshAssembler:
     _petype_focount = {'line': 2, 'tri': 3, 'quad': 4,
                        'tet': 4, 'pyr': 5, 'pri': 6, 'hex': 8}
 
+    # Connectivity data type: (petype, eidx, fidx, flags)
+    _con_dtype = 'S4,i4,i1,i2'
+
+    # Relative tolerance when matching periodic faces
+    _periodic_tol = 1e-6
+
     def __init__(self, nodepts, elenodes, pents, maps):
         self._nodepts = nodepts
         self._elenodes = elenodes
@@ -99,7 +183,10 @@ class NodalMeshAssembler:
         fnmap = self._petype_fnmap[petype][pftype]
 
         # Connectivity: (petype, eidx, fidx, flags)
-        con = [(petype, i, j, 0) for i in range(len(foeles)) for j in fnums]
+        con = np.zeros(len(foeles)*len(fnums), dtype=self._con_dtype)
+        con['f0'] = petype
+        con['f1'] = np.repeat(np.arange(len(foeles)), len(fnums))
+        con['f2'] = np.tile(fnums, len(foeles))
 
         # Nodes
         nodes = np.sort(foeles[:, fnmap]).reshape(len(con), -1)
@@ -114,47 +201,94 @@ class NodalMeshAssembler:
                 fofinf = self._foface_info(petype, pftype, eles)
                 fofaces[pftype].append(fofinf)
 
-        return fofaces
+        return {k: tuple(np.concatenate(f) for f in zip(*v))
+                for k, v in fofaces.items()}
 
     def _pair_fluid_faces(self, ffofaces):
-        pairs = defaultdict(list)
-        resid = {}
+        pairs, resid = {}, {}
+
+        for pftype, (con, nodes) in ffofaces.items():
+            # Sort the faces by their nodes; ties retain their original order
+            idx = np.lexsort(nodes.T)
+            snodes = nodes[idx]
 
-        for pftype, faces in ffofaces.items():
-            for f, n in chain.from_iterable(zip(f, n) for f, n in faces):
-                sn = tuple(n)
+            # Faces with identical nodes are adjacent to one another
+            dup = np.all(snodes[1:] == snodes[:-1], axis=1)
+            if np.any(dup[1:] & dup[:-1]):
+                raise ValueError('Face shared by more than two elements')
 
-                # See if the nodes are in resid
-                if sn in resid:
-                    pairs[pftype].append([resid.pop(sn), f])
-                # Otherwise add them to the unpaired dict
-                else:
-                    resid[sn] = f
+            l, r = idx[:-1][dup], idx[1:][dup]
+
+            # Order the pairs by the position of their right hand face
+            ridx = np.argsort(r)
+            pairs[pftype] = np.stack([con[l[ridx]], con[r[ridx]]], axis=1)
+
+            # Retain the unpaired faces
+            mask = np.ones(len(con), dtype=bool)
+            mask[l] = mask[r] = False
+            resid[pftype] = con[mask], nodes[mask]
 
         return pairs, resid
 
+    def _pop_resid_faces(self, resid, pftype, fnodes):
+        if pftype not in resid:
+            raise ValueError('Unpaired faces in mesh')
+
+        con, nodes = resid[pftype]
+        fnodes = np.sort(fnodes, axis=1)
+
+        # Sort the residual faces together with the query faces
+        anodes = np.vstack([nodes, fnodes])
+        idx = np.lexsort(anodes.T)
+        snodes = anodes[idx]
+
+        # Match each query face to the residual face preceding it
+        l, r = idx[:-1], idx[1:]
+        match = np.all(snodes[1:] == snodes[:-1], axis=1)
+        match &= (l < len(nodes)) & (r >= len(nodes))
+
+        if np.count_nonzero(match) != len(fnodes):
+            raise ValueError('Unpaired faces in mesh')
+
+        fidx = np.empty(len(fnodes), dtype=int)
+        fidx[r[match] - len(nodes)] = l[match]
+
+        # Remove the matched faces from the residual
+        mask = np.ones(len(con), dtype=bool)
+        mask[fidx] = False
+        resid[pftype] = con[mask], nodes[mask]
+
+        return con[fidx]
+
     def _pair_periodic_fluid_faces(self, bpart, resid):
-        pfaces, pmap = defaultdict(list), {}
+        pfaces = defaultdict(list)
+
+        # Absolute tolerance for matching periodic faces
+        tol = self._periodic_tol*np.ptp(self._nodepts, axis=0).max()
 
         for k, (lpent, rpent) in self._pfacespents.items():
             for pftype in bpart[lpent]:
                 lfnodes = bpart[lpent][pftype]
                 rfnodes = bpart[rpent][pftype]
 
-                lfpts = self._nodepts[lfnodes]
-                rfpts = self._nodepts[rfnodes]
+                if len(lfnodes) != len(rfnodes):
+                    raise ValueError('Unpaired periodic faces in mesh')
+
+                # Dimensionality of the mesh
+                ndim = 2 if pftype == 'line' else 3
+
+                # Face centroids
+                lfpts = self._nodepts[lfnodes, :ndim].mean(axis=1)
+                rfpts = self._nodepts[rfnodes, :ndim].mean(axis=1)
 
-                lfidx = fuzzysort(lfpts.mean(axis=1).T, range(len(lfnodes)))
-                rfidx = fuzzysort(rfpts.mean(axis=1).T, range(len(rfnodes)))
+                lfidx, rfidx = _match_pts(lfpts, rfpts, tol)
 
-                for lfn, rfn in zip(lfnodes[lfidx], rfnodes[rfidx]):
-                    lf = resid.pop(tuple(sorted(lfn)))
-                    rf = resid.pop(tuple(sorted(rfn)))
+                lf = self._pop_resid_faces(resid, pftype, lfnodes[lfidx])
+                rf = self._pop_resid_faces(resid, pftype, rfnodes[rfidx])
 
-                    pfaces[pftype].append([lf, rf])
-                    pmap[lf, rf] = k
+                pfaces[pftype].append((k, np.stack([lf, rf], axis=1)))
 
-        return pfaces, pmap
+        return pfaces
 
     def _ident_boundary_faces(self, bpart, resid):
         bfaces = defaultdict(list)
@@ -163,8 +297,9 @@ class NodalMeshAssembler:
 
         for epent, fnodes in bpart.items():
             if epent in bpents:
-                for fn in chain.from_iterable(fnodes.values()):
-                    bfaces[epent].append(resid.pop(tuple(sorted(fn))))
+                for pftype, fn in fnodes.items():
+                    bf = self._pop_resid_faces(resid, pftype, fn)
+                    bfaces[epent].append(bf)
 
         return bfaces
 
@@ -182,40 +317,34 @@ class NodalMeshAssembler:
         fpairs, resid = self._pair_fluid_faces(ffaces)
 
         # Tag and pair periodic boundary faces
-        pfpairs, pmap = self._pair_periodic_fluid_faces(bpart, resid)
+        pfpairs = self._pair_periodic_fluid_faces(bpart, resid)
 
         # Identify the fixed boundary faces
         bf = self._ident_boundary_faces(bpart, resid)
 
-        if any(resid.values()):
+        if any(len(c) for c, n in resid.values()):
             raise ValueError('Unpaired faces in mesh')
 
-        # Flattern the face-pair dicts
-        pairs = chain(chain.from_iterable(fpairs.values()),
-                      chain.from_iterable(pfpairs.values()))
-
-        # Generate the internal connectivity array
-        con = list(pairs)
-
-        # Extract the names of periodic interfaces
+        # Flatten the face-pair dicts, noting the periodic interfaces
+        con = [np.empty((0, 2), dtype=self._con_dtype), *fpairs.values()]
         con_pnames = defaultdict(list)
-        for i, (l, r) in enumerate(con):
-            if (l, r) in pmap:
-                con_pnames[pmap[l, r]].append(i)
 
-        # Generate boundary condition connectivity arrays
-        bcon = {}
-        for pbcrgn, pent in self._bfacespents.items():
-            bcon[pbcrgn] = bf[pent]
+        i = sum(len(c) for c in con)
+        for k, pairs in chain.from_iterable(pfpairs.values()):
+            con.append(pairs)
+            con_pnames[k].append(np.arange(i, i + len(pairs)))
+            i += len(pairs)
 
         # Output
-        ret = {'con_p0': np.array(con, dtype='S4,i4,i1,i2').T}
+        ret = {'con_p0': np.concatenate(con).T}
 
         for k, v in con_pnames.items():
-            ret['con_p0', f'periodic_{k}'] = np.array(v, dtype=np.int32)
+            ret['con_p0', f'periodic_{k}'] = np.concatenate(v).astype(np.int32)
 
-        for k, v in bcon.items():
-            ret[f'bcon_{k}_p0'] = np.array(v, dtype='S4,i4,i1,i2')
+        # Generate boundary condition connectivity arrays
+        for pbcrgn, pent in self._bfacespents.items():
+            bcon = [np.empty(0, dtype=self._con_dtype), *bf[pent]]
+            ret[f'bcon_{pbcrgn}_p0'] = np.concatenate(bcon)
 
         return ret
 
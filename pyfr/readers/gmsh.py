@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from collections import defaultdict
+from itertools import islice
 import re
 
 import numpy as np
@@ -27,6 +28,64 @@ def msh_section(mshit, section):
         raise ValueError(f'Expected $End{section}')
 
 
+def msh_blocks(mshit, n, chunksz=65536):
+    # Yield the next n lines in chunks, each joined into a single string
+    for i in range(0, n, chunksz):
+        m = min(chunksz, n - i)
+        lines = list(islice(mshit, m))
+
+        if len(lines) != m:
+            raise ValueError('Unexpected EOF')
+
+        yield m, ''.join(lines)
+
+
+def msh_array(mshit, n, ncols, dtype):
+    arr = np.empty((n, ncols), dtype=dtype)
+
+    # Parse the lines in bulk directly into the preallocated array
+    i = 0
+    for m, blk in msh_blocks(mshit, n):
+        data = np.fromstring(blk, dtype=dtype, sep=' ')
+        if data.size != m*ncols:
+            raise ValueError('Malformed mesh block')
+
+        arr[i:i + m] = data.reshape(m, ncols)
+        i += m
+
+    return arr
+
+
+def msh_ragged(mshit, n):
+    # Parse the lines in bulk into a flat integer array
+    for m, blk in msh_blocks(mshit, n):
+        data = np.fromstring(blk, dtype=np.int64, sep=' ')
+
+        # Identify the start of each token
+        b = np.frombuffer(blk.encode(), dtype=np.uint8)
+        ws = b <= 32
+        tstart = ~ws
+        tstart[1:] &= ws[:-1]
+
+        # Use this to determine the token offset of each line
+        loff = np.zeros(m + 1, dtype=np.int64)
+        loff[1:] = np.cumsum(tstart)[b == 10]
+
+        if loff[-1] != data.size:
+            raise ValueError('Malformed mesh block')
+
+        yield data, loff
+
+
+def msh_end(mshit, section, binary=False):
+    # Binary data is followed by a newline before the end of the section
+    if binary and next(mshit) != '\n':
+        raise ValueError(f'Expected $End{section}')
+
+    if next(mshit) != f'$End{section}\n':
+        raise ValueError(f'Expected $End{section}')
+
+
 class GmshReader(BaseReader):
     # Supported file types and extensions
     name = 'gmsh'
@@ -196,10 +255,13 @@ class GmshReader(BaseReader):
 
     def __init__(self, msh):
         if isinstance(msh, str):
-            msh = open(msh)
+            msh = open(msh, 'rb')
+
+        # Binary sections are read directly from the underlying file
+        self._msh = msh
 
         # Get an iterator over the lines of the mesh
-        mshit = iter(msh)
+        mshit = (l.decode() for l in msh)
 
         # Section readers
         sect_map = {
@@ -221,11 +283,12 @@ class GmshReader(BaseReader):
             # Try to read the section
             try:
                 sect_map[sect](mshit)
-            # Else skip over it
+            # Else skip over it; the raw lines are compared without decoding
+            # them as the section may contain binary data
             except KeyError:
-                endsect = f'$End{sect}\n'
+                endsect = f'$End{sect}\n'.encode()
 
-                for el in mshit:
+                for el in msh:
                     if el == endsect:
                         break
                 else:
@@ -234,22 +297,55 @@ class GmshReader(BaseReader):
     def _read_mesh_format(self, mshit):
         ver, ftype, dsize = next(mshit).split()
 
-        if ver == '2.2':
+        if ver == '2.2' and ftype == '0':
             self._read_nodes_impl = self._read_nodes_impl_v2
             self._read_eles_impl = self._read_eles_impl_v2
-        elif ver == '4.1':
+        elif ver == '4.1' and ftype == '0':
+            self._read_entities_impl = self._read_entities_impl_v41
             self._read_nodes_impl = self._read_nodes_impl_v41
             self._read_eles_impl = self._read_eles_impl_v41
-        else:
+        elif ver == '4.1' and ftype == '1':
+            self._read_entities_impl = self._read_entities_impl_v41b
+            self._read_nodes_impl = self._read_nodes_impl_v41b
+            self._read_eles_impl = self._read_eles_impl_v41b
+        elif ver not in {'2.2', '4.1'}:
             raise ValueError('Invalid mesh version')
-
-        if ftype != '0':
+        else:
             raise ValueError('Invalid file type')
-        if dsize != '8':
+
+        if dsize not in {'4', '8'}:
             raise ValueError('Invalid data size')
 
-        if next(mshit) != '$EndMeshFormat\n':
-            raise ValueError('Expected $EndMeshFormat')
+        # Binary files encode their byte order through the integer one
+        if ftype == '1':
+            self._size_t = f'i{dsize}'
+
+            one = self._msh.read(4)
+            if int.from_bytes(one, 'little') == 1:
+                self._endian = '<'
+            elif int.from_bytes(one, 'big') == 1:
+                self._endian = '>'
+            else:
+                raise ValueError('Invalid endianness marker')
+
+        msh_end(mshit, 'MeshFormat', binary=ftype == '1')
+
+    def _read_bin(self, dtype, count=1):
+        dtype = np.dtype(dtype).newbyteorder(self._endian)
+
+        # Read the data straight into an array
+        arr = np.empty(count, dtype=dtype)
+        if self._msh.readinto(arr) != arr.nbytes:
+            raise ValueError('Unexpected EOF')
+
+        # Convert to native byte order, if required
+        return arr.astype(dtype.newbyteorder('='), copy=False)
+
+    def _read_bin_int(self, count=1):
+        return self._read_bin('i4', count).tolist()
+
+    def _read_bin_size_t(self, count=1):
+        return self._read_bin(self._size_t, count).tolist()
 
     def _read_phys_names(self, mshit):
         # Physical entities can be divided up into:
@@ -298,6 +394,9 @@ class GmshReader(BaseReader):
             raise ValueError('Unpaired periodic boundary in mesh')
 
     def _read_entities(self, mshit):
+        self._read_entities_impl(mshit)
+
+    def _read_entities_impl_v41(self, mshit):
         self._tagpents = tagpents = {}
 
         # Obtain the entity counts
@@ -320,40 +419,98 @@ class GmshReader(BaseReader):
                 else:
                     raise ValueError('Invalid physical tag count for entity')
 
-        if next(mshit) != '$EndEntities\n':
-            raise ValueError('Expected $EndEntities')
+        msh_end(mshit, 'Entities')
+
+    def _read_entities_impl_v41b(self, mshit):
+        self._tagpents = tagpents = {}
+
+        # Obtain the entity counts
+        npts, *ents = self._read_bin_size_t(4)
+
+        # Skip over the point entities
+        for i in range(npts):
+            self._read_bin_int()
+            self._read_bin('f8', 3)
+            self._read_bin_int(*self._read_bin_size_t())
+
+        # Iterate through the curves, surfaces, and volume entities
+        for ndim, nent in enumerate(ents, start=1):
+            for j in range(nent):
+                etag, = self._read_bin_int()
+                self._read_bin('f8', 6)
+
+                # Physical tags followed by bounding entities
+                ephys = self._read_bin_int(*self._read_bin_size_t())
+                self._read_bin_int(*self._read_bin_size_t())
+
+                if len(ephys) == 1:
+                    tagpents[ndim, etag] = abs(ephys[0])
+                elif ephys:
+                    raise ValueError('Invalid physical tag count for entity')
+
+        msh_end(mshit, 'Entities', binary=True)
 
     def _read_nodes(self, mshit):
         self._read_nodes_impl(mshit)
 
     def _read_nodes_impl_v2(self, mshit):
-        nodemap = {}
+        # Node count
+        nn = int(next(mshit))
 
-        # Read in the nodes as a dict
-        for l in msh_section(mshit, 'Nodes'):
-            nv = l.split()
-            nodemap[int(nv[0])] = nv[1:]
+        # Read in the node numbers and coordinates
+        nodes = msh_array(mshit, nn, 4, float)
+        self._nodetags = nodes[:, 0].astype(np.int64)
+        self._nodepts = np.ascontiguousarray(nodes[:, 1:])
 
-        # Pack them into a dense array
-        self._nodepts = nodepts = np.empty((max(nodemap) + 1, 3))
-        for k, nv in nodemap.items():
-            nodepts[k] = [float(x) for x in nv]
+        msh_end(mshit, 'Nodes')
 
     def _read_nodes_impl_v41(self, mshit):
         # Entity count, node count, minimum and maximum node numbers
         ne, nn, ixl, ixu = (int(i) for i in next(mshit).split())
 
-        self._nodepts = nodepts = np.empty((ixu + 1, 3))
+        self._nodetags = nodetags = np.empty(nn, dtype=np.int64)
+        self._nodepts = nodepts = np.empty((nn, 3))
+
+        i = 0
+        for j in range(ne):
+            edim, etag, eparam, nen = (int(k) for k in next(mshit).split())
+
+            # Parametric coordinates, if present, follow the physical ones
+            ncols = 3 + edim*eparam
+
+            nodetags[i:i + nen] = msh_array(mshit, nen, 1, np.int64)[:, 0]
+            nodepts[i:i + nen] = msh_array(mshit, nen, ncols, float)[:, :3]
+            i += nen
+
+        if i != nn:
+            raise ValueError('Invalid node count')
+
+        msh_end(mshit, 'Nodes')
+
+    def _read_nodes_impl_v41b(self, mshit):
+        # Entity count, node count, minimum and maximum node numbers
+        ne, nn, ixl, ixu = self._read_bin_size_t(4)
+
+        self._nodetags = nodetags = np.empty(nn, dtype=np.int64)
+        self._nodepts = nodepts = np.empty((nn, 3))
 
-        for i in range(ne):
-            nen = int(next(mshit).split()[-1])
-            nix = [int(next(mshit)[:-1]) for _ in range(nen)]
+        i = 0
+        for j in range(ne):
+            edim, etag, eparam = self._read_bin_int(3)
+            nen, = self._read_bin_size_t()
 
-            for j in nix:
-                nodepts[j] = [float(x) for x in next(mshit).split()]
+            # Parametric coordinates, if present, follow the physical ones
+            ncols = 3 + edim*eparam
 
-        if next(mshit) != '$EndNodes\n':
-            raise ValueError('Expected $EndNodes')
+            nodetags[i:i + nen] = self._read_bin(self._size_t, nen)
+            nodexs = self._read_bin('f8', nen*ncols).reshape(-1, ncols)
+            nodepts[i:i + nen] = nodexs[:, :3]
+            i += nen
+
+        if i != nn:
+            raise ValueError('Invalid node count')
+
+        msh_end(mshit, 'Nodes', binary=True)
 
     def _read_eles(self, mshit):
         self._read_eles_impl(mshit)
@@ -361,21 +518,38 @@ class GmshReader(BaseReader):
     def _read_eles_impl_v2(self, mshit):
         elenodes = defaultdict(list)
 
-        for l in msh_section(mshit, 'Elements'):
-            # Extract the raw element data
-            elei = [int(i) for i in l.split()]
-            enum, etype, entags = elei[:3]
-            etags, enodes = elei[3:3 + entags], elei[3 + entags:]
+        # Element count
+        ne = int(next(mshit))
 
-            if etype not in self._etype_map:
-                raise ValueError(f'Unsupported element type {etype}')
+        for data, loff in msh_ragged(mshit, ne):
+            # Extract the element types and tag counts
+            etypes, entags = data[loff[:-1] + 1], data[loff[:-1] + 2]
 
             # Physical entity type (used for BCs)
-            epent = etags[0]
+            epents = data[loff[:-1] + 3]
+
+            # Group the elements by type and physical entity
+            keys, inv = np.unique(np.column_stack([etypes, epents]), axis=0,
+                                  return_inverse=True)
+
+            for i, (etype, epent) in enumerate(keys.tolist()):
+                if etype not in self._etype_map:
+                    raise ValueError(f'Unsupported element type {etype}')
 
-            elenodes[etype, epent].append(enodes)
+                nn = self._etype_map[etype][1]
+                idx = np.flatnonzero(inv.ravel() == i)
 
-        self._elenodes = {k: np.array(v) for k, v in elenodes.items()}
+                # Ensure each element has the expected number of nodes
+                noff = loff[idx] + 3 + entags[idx]
+                if np.any(loff[idx + 1] - noff != nn):
+                    raise ValueError('Invalid node count for element')
+
+                elenodes[etype, epent].append(data[noff[:, None] +
+                                                   np.arange(nn)])
+
+        msh_end(mshit, 'Elements')
+
+        self._elenodes = {k: np.vstack(v) for k, v in elenodes.items()}
 
     def _read_eles_impl_v41(self, mshit):
         elenodes = defaultdict(list)
@@ -391,20 +565,67 @@ class GmshReader(BaseReader):
 
             # Physical entity type (used for BCs)
             epent = self._tagpents.get((edim, etag), -1)
-            append = elenodes[etype, epent].append
 
-            for j in range(ecount):
-                append([int(k) for k in next(mshit).split()[1:]])
+            # Read the element numbers and nodes
+            nn = self._etype_map[etype][1]
+            eles = msh_array(mshit, ecount, nn + 1, np.int64)
 
-        if ne != sum(len(v) for v in elenodes.values()):
+            elenodes[etype, epent].append(eles[:, 1:])
+
+        if ne != sum(len(e) for v in elenodes.values() for e in v):
             raise ValueError('Invalid element count')
 
-        if next(mshit) != '$EndElements\n':
-            raise ValueError('Expected $EndElements')
+        msh_end(mshit, 'Elements')
 
-        self._elenodes = {k: np.array(v) for k, v in elenodes.items()}
+        self._elenodes = {k: np.vstack(v) for k, v in elenodes.items()}
+
+    def _read_eles_impl_v41b(self, mshit):
+        elenodes = defaultdict(list)
+
+        # Block and total element count
+        nb, ne = self._read_bin_size_t(4)[:2]
+
+        for i in range(nb):
+            edim, etag, etype = self._read_bin_int(3)
+            ecount, = self._read_bin_size_t()
+
+            if etype not in self._etype_map:
+                raise ValueError(f'Unsupported element type {etype}')
+
+            # Physical entity type (used for BCs)
+            epent = self._tagpents.get((edim, etag), -1)
+
+            # Read the element numbers and nodes
+            nn = self._etype_map[etype][1]
+            eles = self._read_bin(self._size_t, ecount*(nn + 1))
+
+            elenodes[etype, epent].append(eles.reshape(-1, nn + 1)[:, 1:])
+
+        if ne != sum(len(e) for v in elenodes.values() for e in v):
+            raise ValueError('Invalid element count')
+
+        msh_end(mshit, 'Elements', binary=True)
+
+        self._elenodes = {k: np.vstack(v) for k, v in elenodes.items()}
+
+    def _map_nodes(self):
+        tags, elenodes = self._nodetags, self._elenodes
+
+        # Map node numbers onto contiguous indices
+        tidx = np.argsort(tags)
+        stags = tags[tidx]
+
+        for k, v in elenodes.items():
+            vidx = np.searchsorted(stags, v).clip(max=len(stags) - 1)
+            if np.any(stags[vidx] != v):
+                raise ValueError('Element references undefined node')
+
+            elenodes[k] = tidx[vidx]
 
     def _to_raw_pyfrm(self, lintol):
+        # Convert node numbers into indices
+        self._map_nodes()
+
         # Assemble a nodal mesh
         maps = self._etype_map, self._petype_fnmap, self._nodemaps
         pents = self._felespent, self._bfacespents, self._pfacespents
@@ -8,23 +8,32 @@ import re
 import h5py
 import numpy as np
 
+from pyfr.mpiutil import mpi
 from pyfr.util import memoize
 
 
 class NativeReader(Mapping):
     def __init__(self, fname):
         self.fname = os.path.abspath(fname)
-        self._file = h5py.File(fname, 'r')
+
+    @cached_property
+    def _file(self):
+        return h5py.File(self.fname, 'r')
 
     def __contains__(self, aname):
         if isinstance(aname, str):
             return aname in self._keys
         else:
             p, q = aname
-            return p in self._keys and q in self._file[p].attrs
+            return p in self._keys and q in self.attrs(p)
 
     def __getitem__(self, aname):
         if isinstance(aname, str):
+            # Partition of a global dataset
+            if aname in self._gparts:
+                name, i, j = self._gparts[aname]
+                return self._file[name][..., i:j]
+
             ret = self._file[aname]
 
             if ret.shape == ():
@@ -34,7 +43,7 @@ class NativeReader(Mapping):
 
             return ret.decode() if isinstance(ret, bytes) else ret
         else:
-            return self._file[aname[0]].attrs[aname[1]]
+            return self.attrs(aname[0])[aname[1]]
 
     def __iter__(self):
         return iter(self._keys)
@@ -43,20 +52,96 @@ class NativeReader(Mapping):
         return len(self._keys)
 
     @cached_property
-    def _keys(self):
-        keys = set()
+    def _dsets(self):
+        # If the file has an index of its datasets then use it
+        if 'index' in self._file:
+            index = self._file['index'][()].decode()
+            return set(filter(None, index.split('\n')))
+
+        dsets = set()
 
         def visitor(name, item):
             if isinstance(item, h5py.Dataset):
-                keys.add(name)
+                dsets.add(name)
 
         self._file.visititems(visitor)
 
-        return keys
+        return dsets
+
+    @cached_property
+    def _gparts(self):
+        gparts = {}
+
+        for name in self._dsets:
+            gname = name.removesuffix('_parts')
+
+            # Map each non-empty partition onto a slice of a global dataset
+            if gname != name and gname in self._dsets:
+                poff = self._file[name][()].tolist()
+
+                for i, (j, k) in enumerate(zip(poff[:-1], poff[1:])):
+                    if k > j:
+                        gparts[f'{gname}_p{i}'] = (gname, j, k)
+
+        return gparts
+
+    @cached_property
+    def _keys(self):
+        keys = set(self._dsets)
+
+        # Replace global datasets by their partitions
+        for gname, i, j in self._gparts.values():
+            keys.discard(gname)
+            keys.discard(f'{gname}_parts')
+
+        return keys | self._gparts.keys()
+
+    def shape(self, aname):
+        if aname in self._gparts:
+            name, i, j = self._gparts[aname]
+            return (*self._file[name].shape[:-1], j - i)
+        else:
+            return self._file[aname].shape
 
     def attrs(self, aname):
+        if aname in self._gparts:
+            aname = self._gparts[aname][0]
+
         return self._file[aname].attrs
 
+    def read(self, aname, sel=...):
+        # Memory-mapped datasets can be sliced in place
+        if (mm := self.mmap(aname)) is not None:
+            return np.array(mm[sel])
+        # Partitions of global datasets must be read in full first
+        elif aname in self._gparts:
+            return self[aname][sel]
+        # Otherwise let HDF5 perform the selection
+        else:
+            return self._file[aname][sel]
+
+    @memoize
+    def mmap(self, aname):
+        name, *eidx = self._gparts.get(aname, (aname,))
+        dset = self._file[name]
+
+        # Only contiguous datasets of simple types can be mapped
+        if (dset.chunks or not dset.shape or dset.dtype.kind not in 'biuf' or
+            (offset := dset.id.get_offset()) is None):
+            return None
+
+        mm = np.memmap(self.fname, dtype=dset.dtype, mode='r', offset=offset,
+                       shape=dset.shape)
+
+        return mm[..., slice(*eidx)] if eidx else mm
+
+    @memoize
+    def con(self, aname):
+        con = self[aname].astype('U4,i4,i1,i2')
+        con.setflags(write=False)
+
+        return con
+
     @memoize
     def array_info(self, prefix):
         # Entries in the file which start with the prefix
@@ -72,12 +157,10 @@ class NativeReader(Mapping):
         info = {}
         for i in range(fmaxpn + 1):
             for et in ftypes:
-                try:
-                    n = f'{prefix}_{et}_p{i}'
+                n = f'{prefix}_{et}_p{i}'
 
-                    info[n] = (et, self._file.get(n).shape)
-                except AttributeError:
-                    pass
+                if n in self._keys:
+                    info[n] = (et, self.shape(n))
 
         return info
 
@@ -98,3 +181,127 @@ class NativeReader(Mapping):
             nep[v[0]][int(re.search(r'\d+$', k)[0])] = v[1][1]
 
         return nep
+
+
+class NodeLocalReader(Mapping):
+    def __init__(self, reader, rallocs):
+        self.fname = reader.fname
+        self._reader = reader
+
+        self._comm = comm = mpi.COMM_WORLD.Split_type(mpi.COMM_TYPE_SHARED)
+        leader = comm.rank == 0
+
+        # Physical ranks of all of the MPI ranks on our node
+        pranks = set(comm.allgather(rallocs.prank))
+
+        # Have the node leader read the arrays needed by these ranks
+        if leader:
+            keys = set(reader)
+            arrs, attrs = {}, {}
+
+            for k in sorted(keys):
+                m = re.match(r'(?:spt_.+?|con|bcon_.+?)_p(\d+)(?:p\d+)?$', k)
+                if m and int(m[1]) in pranks:
+                    arrs[k] = np.ascontiguousarray(reader[k])
+                    attrs |= {(k, a): v for a, v in reader.attrs(k).items()}
+
+            # Lay the arrays out in memory, aligning each to 64 bytes
+            info, nbytes = {}, 0
+            for k, v in arrs.items():
+                info[k] = (nbytes, v.shape, v.dtype)
+                nbytes += -(-v.nbytes // 64)*64
+        else:
+            nbytes = 0
+
+        # Allocate a shared memory window owned by the leader
+        self._win = mpi.Win.Allocate_shared(nbytes, 1, comm=comm)
+        buf = np.frombuffer(self._win.Shared_query(0)[0], dtype=np.uint8)
+
+        # Copy the arrays into the window
+        if leader:
+            for k, (off, shape, dtype) in info.items():
+                buf[off:off + arrs[k].nbytes] = arrs[k].view(np.uint8).flat
+
+            meta = (keys, attrs, info, reader['mesh_uuid'])
+        else:
+            meta = None
+
+        # Once the copies are complete distribute the layout
+        keys, attrs, info, uuid = comm.bcast(meta, root=0)
+
+        # Construct read-only views into the window
+        self._arrs = {}
+        for k, (off, shape, dtype) in info.items():
+            count = int(np.prod(shape))
+            arr = np.frombuffer(buf, dtype=dtype, count=count, offset=off)
+            arr.setflags(write=False)
+
+            self._arrs[k] = arr.reshape(shape)
+
+        self._keys = keys
+        self._attrs = attrs
+        self._uuid = uuid
+
+    def close(self):
+        # Drop our views and collectively free the shared memory window;
+        # any arrays obtained from us must no longer be used
+        if self._win is not None:
+            self._arrs = {}
+            self._win.Free()
+            self._comm.Free()
+            self._win = None
+
+    def __contains__(self, aname):
+        if isinstance(aname, str):
+            return aname in self._keys
+        elif aname[0] in self._arrs:
+            return aname in self._attrs
+        else:
+            return aname in self._reader
+
+    def __getitem__(self, aname):
+        if isinstance(aname, str):
+            if aname in self._arrs:
+                return self._arrs[aname]
+            elif aname == 'mesh_uuid':
+                return self._uuid
+        elif aname[0] in self._arrs:
+            return self._attrs[aname]
+
+        # Fall back to reading directly from the file
+        return self._reader[aname]
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @memoize
+    def con(self, aname):
+        con = self[aname].astype('U4,i4,i1,i2')
+        con.setflags(write=False)
+
+        return con
+
+
+class MemoryReader(Mapping):
+    def __init__(self, data, fname):
+        self.fname = os.path.abspath(fname)
+        self._data = data
+
+    def __getitem__(self, aname):
+        return self._data[aname]
+
+    def __iter__(self):
+        return (k for k in self._data if isinstance(k, str))
+
+    def __len__(self):
+        return sum(1 for k in self)
+
+    @memoize
+    def con(self, aname):
+        con = self[aname].astype('U4,i4,i1,i2')
+        con.setflags(write=False)
+
+        return con
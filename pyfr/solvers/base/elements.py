@@ -68,7 +68,7 @@ class BaseElements:
         vars |= dict(zip('xyz', coords))
 
         # Evaluate the ICs from the config file
-        ics = [npeval(self.cfg.getexpr('soln-ics', dv), vars)
+        ics = [npeval(self.cfg.getexpr('soln-ics', dv), vars, self.cfg)
                for dv in self.privarmap[self.ndims]]
 
         # Allocate
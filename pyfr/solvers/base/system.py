@@ -126,7 +126,7 @@ class BaseSystem:
     def _load_int_inters(self, rallocs, mesh, elemap):
         key = f'con_p{rallocs.prank}'
 
-        lhs, rhs = mesh[key].astype('U4,i4,i1,i2').tolist()
+        lhs, rhs = mesh.con(key).tolist()
         int_inters = self.intinterscls(self.backend, lhs, rhs, elemap,
                                        self.cfg)
 
@@ -138,8 +138,7 @@ class BaseSystem:
         mpi_inters = []
         for rhsprank in rallocs.prankconn[lhsprank]:
             rhsmrank = rallocs.pmrankmap[rhsprank]
-            interarr = mesh[f'con_p{lhsprank}p{rhsprank}']
-            interarr = interarr.astype('U4,i4,i1,i2').tolist()
+            interarr = mesh.con(f'con_p{lhsprank}p{rhsprank}').tolist()
 
             mpiiface = self.mpiinterscls(self.backend, interarr, rhsmrank,
                                          rallocs, elemap, self.cfg)
@@ -158,7 +157,7 @@ class BaseSystem:
                 cfgsect = f'soln-bcs-{m[1]}'
 
                 # Get the interface
-                interarr = mesh[f].astype('U4,i4,i1,i2').tolist()
+                interarr = mesh.con(f).tolist()
 
                 # Instantiate
                 bcclass = bcmap[self.cfg.get(cfgsect, 'type')]
@@ -265,6 +264,10 @@ class BaseSystem:
         for graph in self._rhs_graphs(uinbank, foutbank):
             self.backend.run_graph(graph)
 
+    def rhs_wait_time(self):
+        return sum(g.wait_time for u, f in self._rhs_uin_fout
+                   for g in self._rhs_graphs(u, f))
+
     def rhs_wait_times(self):
         # Group together timings for graphs which are semantically equivalent
         times = defaultdict(list)
@@ -298,5 +301,8 @@ class BaseSystem:
 
         self.backend.run_kernels(self._kernels[kkey])
 
-    def ele_scal_upts(self, idx):
-        return [eb[idx].get() for eb in self.ele_banks]
+    def ele_scal_upts(self, idx, out=None):
+        if out is None:
+            return [eb[idx].get() for eb in self.ele_banks]
+        else:
+            return [eb[idx].get(o) for eb, o in zip(self.ele_banks, out)]
@@ -95,9 +95,11 @@ class BaseAdvectionBCInters(BaseInters):
 
         # Evaluate any BC specific arguments from the config file
         if default is not None:
-            return [npeval(cfg.getexpr(sect, k, default), cc) for k in opts]
+            return [npeval(cfg.getexpr(sect, k, default), cc, cfg)
+                    for k in opts]
         else:
-            return [npeval(cfg.getexpr(sect, k), cc) for k in opts]
+            return [npeval(cfg.getexpr(sect, k), cc, cfg)
+                    for k in opts]
 
     def _exp_opts(self, opts, lhs, default={}):
         cfg, sect = self.cfg, self.cfgsect
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from pyfr.backends import get_backend
+from pyfr.inifile import Inifile
+from pyfr.partitioners.calibrate import calibrate_elewts
+
+
+def _calibrate(order, etypes):
+    cfg = Inifile()
+    cfg.set('backend', 'precision', 'double')
+    cfg.set('constants', 'gamma', '1.4')
+    cfg.set('constants', 'mu', '0.001')
+    cfg.set('constants', 'Pr', '0.72')
+    cfg.set('solver', 'system', 'navier-stokes')
+    cfg.set('solver', 'order', str(order))
+    cfg.set('solver-interfaces', 'riemann-solver', 'rusanov')
+    cfg.set('solver-interfaces', 'ldg-beta', '0.5')
+    cfg.set('solver-interfaces', 'ldg-tau', '0.1')
+    cfg.set('solver-interfaces-quad', 'flux-pts', 'gauss-legendre')
+    cfg.set('solver-elements-hex', 'soln-pts', 'gauss-legendre')
+
+    for v, ex in zip('rho u v w p'.split(), ['1', 'x', '0', '0', '1']):
+        cfg.set('soln-ics', v, ex)
+
+    try:
+        backend = get_backend('openmp', cfg)
+    except OSError:
+        pytest.skip('OpenMP backend unavailable')
+
+    return calibrate_elewts(backend, cfg, etypes, neles=2048, tmin=0.05)
+
+
+def test_curved_cost():
+    ewts = _calibrate(3, ['hex'])
+
+    # Curved elements should never be cheaper than linear ones
+    assert ewts['hex-curved'] >= ewts['hex']
+
+
+def test_low_order_curved_cost():
+    ewts = _calibrate(1, ['hex'])
+
+    # At first order all elements take the curved code path
+    assert ewts['hex-curved'] == ewts['hex']
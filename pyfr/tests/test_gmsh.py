@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+from io import BytesIO
+
+import numpy as np
+import pytest
+
+from pyfr.readers.gmsh import GmshReader, msh_array, msh_ragged
+
+
+def _quad_mesh(n=3):
+    # Nodes on a uniform grid with non-contiguous tags
+    tags = {(i, j): 10 + 3*(i + (n + 1)*j)
+            for j in range(n + 1) for i in range(n + 1)}
+    nodes = [(tags[i, j], i / n, j / n, 0.0)
+             for j in range(n + 1) for i in range(n + 1)]
+
+    # Quadrilateral elements
+    quads = [(tags[i, j], tags[i + 1, j], tags[i + 1, j + 1], tags[i, j + 1])
+             for j in range(n) for i in range(n)]
+
+    # Boundary edges for each curve entity; the left and right curves are
+    # periodic whereas the bottom and top curves are walls
+    curves = [
+        (1, 1, [(tags[0, j + 1], tags[0, j]) for j in range(n)]),
+        (2, 2, [(tags[n, j], tags[n, j + 1]) for j in range(n)]),
+        (3, 3, [(tags[i, 0], tags[i + 1, 0]) for i in range(n)]),
+        (4, 3, [(tags[i + 1, n], tags[i, n]) for i in range(n)])
+    ]
+
+    # Nodes on the periodic curves
+    pnodes = [(tags[0, j], tags[n, j]) for j in range(n + 1)]
+
+    return nodes, quads, curves, pnodes
+
+
+_phys_names = (
+    b'$PhysicalNames\n4\n1 1 "periodic_x_l"\n1 2 "periodic_x_r"\n'
+    b'1 3 "wall"\n2 9 "fluid"\n$EndPhysicalNames\n'
+)
+
+
+def _write_v41_ascii(n=3):
+    nodes, quads, curves, pnodes = _quad_mesh(n)
+    tags = [nd[0] for nd in nodes]
+
+    s = '$MeshFormat\n4.1 0 8\n$EndMeshFormat\n'
+    s += _phys_names.decode()
+
+    s += '$Entities\n0 4 1 0\n'
+    for ctag, ptag, _ in curves:
+        s += f'{ctag} 0 0 0 1 1 0 1 {ptag} 2 1 2\n'
+    s += '1 0 0 0 1 1 0 1 9 4 1 2 3 4\n$EndEntities\n'
+
+    s += f'$Nodes\n1 {len(nodes)} {min(tags)} {max(tags)}\n'
+    s += f'2 1 0 {len(nodes)}\n'
+    s += ''.join(f'{nd[0]}\n' for nd in nodes)
+    s += ''.join(f'{nd[1]!r} {nd[2]!r} {nd[3]!r}\n' for nd in nodes)
+    s += '$EndNodes\n'
+
+    blocks = [(1, ctag, 1, edges) for ctag, _, edges in curves]
+    blocks.append((2, 1, 3, quads))
+    neles = sum(len(b[3]) for b in blocks)
+
+    s += f'$Elements\n{len(blocks)} {neles} 1 {neles}\n'
+    etag = 1
+    for edim, ent, etype, eles in blocks:
+        s += f'{edim} {ent} {etype} {len(eles)}\n'
+        for e in eles:
+            s += f'{etag} {" ".join(map(str, e))}\n'
+            etag += 1
+    s += '$EndElements\n'
+
+    s += '$Periodic\n1\n1 1 2\n16 '
+    s += ' '.join(['1', '0', '0', '-1'] + ['0', '1', '0', '0']*3) + '\n'
+    s += f'{len(pnodes)}\n'
+    s += ''.join(f'{a} {b}\n' for a, b in pnodes)
+    s += '$EndPeriodic\n'
+
+    return BytesIO(s.encode())
+
+
+def _write_v41_binary(n=3, endian='<', dsize=8):
+    nodes, quads, curves, pnodes = _quad_mesh(n)
+    tags = [nd[0] for nd in nodes]
+
+    f = BytesIO()
+    ints = lambda *v: f.write(np.array(v, dtype=f'{endian}i4').tobytes())
+    sizes = lambda *v: f.write(np.array(v, dtype=f'{endian}i{dsize}')
+                               .tobytes())
+    dbls = lambda *v: f.write(np.array(v, dtype=f'{endian}f8').tobytes())
+
+    f.write(f'$MeshFormat\n4.1 1 {dsize}\n'.encode())
+    ints(1)
+    f.write(b'\n$EndMeshFormat\n')
+    f.write(_phys_names)
+
+    f.write(b'$Entities\n')
+    sizes(0, 4, 1, 0)
+    for ctag, ptag, _ in curves:
+        ints(ctag)
+        dbls(0, 0, 0, 1, 1, 0)
+        sizes(1)
+        ints(ptag)
+        sizes(2)
+        ints(1, 2)
+    ints(1)
+    dbls(0, 0, 0, 1, 1, 0)
+    sizes(1)
+    ints(9)
+    sizes(4)
+    ints(1, 2, 3, 4)
+    f.write(b'\n$EndEntities\n')
+
+    f.write(b'$Nodes\n')
+    sizes(1, len(nodes), min(tags), max(tags))
+    ints(2, 1, 0)
+    sizes(len(nodes))
+    sizes(*tags)
+    dbls(*[x for nd in nodes for x in nd[1:]])
+    f.write(b'\n$EndNodes\n')
+
+    blocks = [(1, ctag, 1, edges) for ctag, _, edges in curves]
+    blocks.append((2, 1, 3, quads))
+    neles = sum(len(b[3]) for b in blocks)
+
+    f.write(b'$Elements\n')
+    sizes(len(blocks), neles, 1, neles)
+    etag = 1
+    for edim, ent, etype, eles in blocks:
+        ints(edim, ent, etype)
+        sizes(len(eles))
+        for e in eles:
+            sizes(etag, *e)
+            etag += 1
+    f.write(b'\n$EndElements\n')
+
+    # Gmsh writes this for every periodic mesh; the affine transform
+    # contains bytes which are not valid UTF-8
+    f.write(b'$Periodic\n')
+    sizes(1)
+    ints(1, 1, 2)
+    sizes(16)
+    dbls(1, 0, 0, -1, *[0, 1, 0, 0]*3)
+    sizes(len(pnodes))
+    sizes(*[t for p in pnodes for t in p])
+    f.write(b'\n$EndPeriodic\n')
+
+    f.seek(0)
+    return f
+
+
+def _assert_meshes_equal(a, b):
+    a = {k: v for k, v in a.items() if k != 'mesh_uuid'}
+    b = {k: v for k, v in b.items() if k != 'mesh_uuid'}
+
+    assert a.keys() == b.keys()
+    for k, v in a.items():
+        assert np.array_equal(v, b[k])
+
+
+def test_msh_array():
+    lines = ['1 2.5 -3\n', '4 5 6e1\n', '7 8 9\n']
+    arr = msh_array(iter(lines), 3, 3, float)
+
+    assert np.array_equal(arr, [[1, 2.5, -3], [4, 5, 60], [7, 8, 9]])
+
+    with pytest.raises(ValueError):
+        msh_array(iter(lines), 3, 2, float)
+
+    with pytest.raises(ValueError):
+        msh_array(iter(lines), 4, 3, float)
+
+
+def test_msh_ragged():
+    lines = ['1 2 3\n', '4\n', '  5   6\n', '7 8 9 10\n']
+    (data, loff), = msh_ragged(iter(lines), 4)
+
+    assert np.array_equal(data, np.arange(1, 11))
+    assert np.array_equal(loff, [0, 3, 4, 6, 10])
+
+
+@pytest.mark.parametrize('endian,dsize', [('<', 8), ('>', 8), ('<', 4)])
+def test_binary_v41_periodic(endian, dsize):
+    ascii = GmshReader(_write_v41_ascii()).to_pyfrm(1e-5)
+    binary = GmshReader(_write_v41_binary(endian=endian, dsize=dsize))
+    binary = binary.to_pyfrm(1e-5)
+
+    # The periodic faces should have been paired
+    assert ('con_p0', 'periodic_x') in binary
+    assert binary['bcon_wall_p0'].shape == (6,)
+
+    _assert_meshes_equal(ascii, binary)
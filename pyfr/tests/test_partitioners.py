@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from pyfr.partitioners.base import union_find
+from pyfr.partitioners.parallel import _morton_keys
+
+
+def test_union_find():
+    pairs = np.array([[0, 2], [5, 3], [2, 4], [3, 3], [7, 5]]).T
+    rep = union_find(8, pairs)
+
+    # Items should share a representative iff they are connected
+    sets = [{0, 2, 4}, {3, 5, 7}, {1}, {6}]
+    for s in sets:
+        assert len({rep[i] for i in s}) == 1
+        assert rep[min(s)] in s
+
+    assert len(set(rep.tolist())) == len(sets)
+
+
+def test_union_find_chain():
+    # A long chain should collapse into a single set
+    n = 1000
+    pairs = np.array([np.arange(n - 1), np.arange(1, n)])
+
+    assert len(set(union_find(n, pairs[:, ::-1]).tolist())) == 1
+
+
+def test_morton_keys():
+    # Corners of the unit square in Morton order
+    pts = np.array([[0, 0], [1, 0], [0, 1], [1, 1]], dtype=float)
+    keys = _morton_keys(pts, pts.min(0), pts.max(0))
+
+    assert np.array_equal(np.argsort(keys), [0, 1, 2, 3])
+    assert keys[0] == 0 and keys[3] == 2**62 - 1
+
+
+def test_morton_keys_locality():
+    rng = np.random.default_rng(5)
+    pts = rng.random((4096, 3))
+    keys = _morton_keys(pts, np.zeros(3), np.ones(3))
+
+    # Each octant should occupy a contiguous range of keys
+    oct = (pts > 0.5) @ [1, 2, 4]
+    assert np.all(np.diff(oct[np.argsort(keys)]) >= 0)
+
+
+def test_morton_keys_degenerate():
+    # Points with zero extent in one direction should not divide by zero
+    pts = np.column_stack([np.linspace(0, 1, 5), np.zeros(5)])
+    keys = _morton_keys(pts, pts.min(0), pts.max(0))
+
+    assert np.all(np.diff(keys.astype(float)) > 0)
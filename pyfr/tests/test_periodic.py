@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+import numpy as np
+import pytest
+
+from pyfr.readers.base import _match_pts, _match_pts_kd, _rigid_transforms
+
+
+def _face_pts(n=4):
+    # Points on a jittered grid in the y-z plane
+    rng = np.random.default_rng(7)
+    y, z = np.meshgrid(np.linspace(0.1, 1, n), np.linspace(0, 1, n))
+    y = y + 0.05*rng.random(y.shape)
+
+    return np.column_stack([np.zeros(n*n), y.ravel(), z.ravel()])
+
+
+def _check_pairs(lpts, rpts, lidx, ridx, q, t):
+    assert sorted(lidx) == list(range(len(lpts)))
+    assert sorted(ridx) == list(range(len(rpts)))
+    assert np.allclose(lpts[lidx] @ q.T + t, rpts[ridx])
+
+
+def test_translation():
+    lpts = _face_pts()
+
+    # Shift and shuffle the points
+    perm = np.random.default_rng(1).permutation(len(lpts))
+    rpts = lpts[perm] + [2, 0, 0]
+
+    q, t = next(_rigid_transforms(lpts, rpts, 1e-6))
+    assert np.allclose(q, np.eye(3)) and np.allclose(t, [2, 0, 0])
+
+    lidx, ridx = _match_pts_kd(lpts, rpts, 1e-6)
+    _check_pairs(lpts, rpts, lidx, ridx, np.eye(3), [2, 0, 0])
+
+
+def test_rotation():
+    lpts = _face_pts()
+
+    # Rotate the face by 90 degrees about the z axis
+    q = np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]])
+    perm = np.random.default_rng(2).permutation(len(lpts))
+    rpts = lpts[perm] @ q.T
+
+    lidx, ridx = _match_pts_kd(lpts, rpts, 1e-6)
+    _check_pairs(lpts, rpts, lidx, ridx, q, 0)
+
+
+def test_no_match():
+    lpts = _face_pts()
+    rpts = _face_pts() + [2, 0, 0]
+    rpts[0, 1] += 0.5
+
+    with pytest.raises(ValueError):
+        _match_pts_kd(lpts, rpts, 1e-6)
+
+
+def test_fuzzy_fallback(monkeypatch):
+    lpts = _face_pts()
+    perm = np.random.default_rng(3).permutation(len(lpts))
+    rpts = lpts[perm] + [2, 0, 0]
+
+    # Make SciPy unavailable
+    monkeypatch.setitem(sys.modules, 'scipy.spatial', None)
+    with pytest.raises(ImportError):
+        _match_pts_kd(lpts, rpts, 1e-6)
+
+    lidx, ridx = _match_pts(lpts, rpts, 1e-6)
+    _check_pairs(lpts, rpts, lidx, ridx, np.eye(3), [2, 0, 0])
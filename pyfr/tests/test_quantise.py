@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from pyfr.writers.native import quantise
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('tol', [1e-1, 1e-3, 1e-6])
+def test_absolute(dtype, tol):
+    rng = np.random.default_rng(11)
+    arr = (100*rng.standard_normal(4096)).astype(dtype)
+    qarr = quantise(arr, 'absolute', tol)
+
+    assert qarr.dtype == arr.dtype
+    assert np.all(np.abs(qarr.astype(float) - arr) <= tol)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('tol', [1e-1, 1e-3, 1e-6])
+def test_relative(dtype, tol):
+    rng = np.random.default_rng(13)
+    arr = rng.standard_normal(4096)*10.0**rng.integers(-20, 20, 4096)
+    arr = arr.astype(dtype)
+    qarr = quantise(arr, 'relative', tol)
+
+    assert qarr.dtype == arr.dtype
+    assert np.all(np.abs(qarr.astype(float) - arr) <= tol*np.abs(arr))
+
+
+def test_nonfinite():
+    arr = np.array([np.inf, -np.inf, np.nan, 0.0, 1.0])
+
+    for mode in ['absolute', 'relative']:
+        qarr = quantise(arr, mode, 1e-3)
+        assert np.array_equal(qarr, arr, equal_nan=True)
+
+
+def test_copy():
+    arr = np.linspace(0, 1, 17)
+    quantise(arr, 'absolute', 0.1)
+
+    # The input array should not be modified
+    assert np.array_equal(arr, np.linspace(0, 1, 17))
+
+
+def test_invalid_mode():
+    with pytest.raises(ValueError):
+        quantise(np.ones(4), 'bogus', 1e-3)
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 from pyfr.writers.base import BaseWriter
-from pyfr.writers.native import write_pyfrms
+from pyfr.writers.native import write_pyfrms, write_pyfrms_mpi
 from pyfr.writers.vtk import VTKWriter
 
 from pyfr.util import subclasses, subclass_where
@@ -1,26 +1,196 @@
 # -*- coding: utf-8 -*-
 
+from concurrent.futures import ThreadPoolExecutor
+import itertools as it
 import os
 import re
 
 import h5py
 import numpy as np
 
-from pyfr.mpiutil import get_comm_rank_root
+from pyfr.mpiutil import get_comm_rank_root, mpi
 
 
-def write_pyfrms(path, data):
+def dataset_opts(shape, dtype, *, eaxis=-1, compression=None,
+                 complevel=None, shuffle=False, chunksz=None):
+    opts = {}
+
+    # Scalars and empty arrays are always stored contiguously
+    if not shape or not np.prod(shape):
+        return opts
+
+    # Lossless filters
+    if compression:
+        opts['compression'] = compression
+        if complevel is not None:
+            opts['compression_opts'] = complevel
+    if shuffle:
+        opts['shuffle'] = True
+
+    # Chunking along the element axis; this is required by the filters
+    if chunksz or opts:
+        shape = list(shape)
+        eaxis %= len(shape)
+
+        # Default to chunks of around a mebibyte
+        if not chunksz:
+            esz = np.dtype(dtype).itemsize*np.prod(shape) // shape[eaxis]
+            chunksz = max(1, 2**20 // esz)
+
+        shape[eaxis] = min(shape[eaxis], chunksz)
+        opts['chunks'] = tuple(shape)
+
+    return opts
+
+
+def quantise(arr, mode, tol):
+    arr = np.array(arr)
+
+    # Round to the largest power-of-two step which satisfies the tolerance
+    if mode == 'absolute':
+        q = 2.0**np.floor(np.log2(2*tol))
+
+        # Values which are already exact at this step are left untouched
+        with np.errstate(over='ignore', invalid='ignore'):
+            r = arr / q
+            m = np.abs(r) < 2**np.finfo(arr.dtype).nmant
+
+        arr[m] = np.round(r[m])*q
+    # Round the mantissa to the fewest bits which satisfy the tolerance
+    elif mode == 'relative':
+        nkeep = max(0, int(np.ceil(-np.log2(tol))) - 1)
+        ndrop = np.finfo(arr.dtype).nmant - nkeep
+
+        if ndrop > 0:
+            utype = np.dtype(f'u{arr.itemsize}').type
+            iarr = arr.view(utype)
+            m = np.isfinite(arr)
+
+            # Round to nearest with ties to even
+            ndrop, one = utype(ndrop), utype(1)
+            half = (one << (ndrop - one)) - one
+            mask = ~((one << ndrop) - one)
+
+            im = iarr[m]
+            iarr[m] = (im + half + ((im >> ndrop) & one)) & mask
+    else:
+        raise ValueError('Invalid quantisation mode')
+
+    return arr
+
+
+def dataset_index(names):
+    return np.array('\n'.join(sorted(names)).encode(), dtype='S')
+
+
+def _write_pyfrms_data(f, data, dsopts):
+    for k in filter(lambda k: isinstance(k, str), data):
+        v = data[k]
+
+        if isinstance(v, str):
+            f[k] = v
+        else:
+            v = np.asarray(v)
+
+            # Shape points are stored with the element axis second
+            eaxis = 1 if k.startswith('spt_') else -1
+
+            opts = dataset_opts(v.shape, v.dtype, eaxis=eaxis, **dsopts)
+            f.create_dataset(k, data=v, **opts)
+
+
+def _write_pyfrms_attrs(f, data):
+    for p, q in filter(lambda k: isinstance(k, tuple), data):
+        f[p].attrs[q] = data[p, q]
+
+
+def write_pyfrms(path, data, **dsopts):
     # Save to disk
     with h5py.File(path, 'w', libver='latest') as f:
-        for k in filter(lambda k: isinstance(k, str), data):
-            f[k] = data[k]
+        _write_pyfrms_data(f, data, dsopts)
+        _write_pyfrms_attrs(f, data)
+
+        # Index the datasets in the file
+        f['index'] = dataset_index(filter(lambda k: isinstance(k, str), data))
+
+
+def write_pyfrms_mpi(path, data, **dsopts):
+    comm, rank, root = get_comm_rank_root()
 
-        for p, q in filter(lambda k: isinstance(k, tuple), data):
-            f[p].attrs[q] = data[p, q]
+    # Arrays held by this rank, and everything else (strings and attributes)
+    arrs = {k: np.asarray(v) for k, v in data.items()
+            if isinstance(k, str) and not isinstance(v, str)}
+    misc = {k: v for k, v in data.items() if k not in arrs}
+
+    # See if parallel I/O is available
+    parallel = (h5py.get_config().mpi and
+                'PYFR_FORCE_SERIAL_HDF5' not in os.environ)
+
+    # Filters can not be applied to independently written datasets
+    if dsopts.get('compression') or dsopts.get('shuffle'):
+        parallel = False
+
+    if parallel:
+        # Distribute the shape and type of every array to all ranks
+        ginfo = comm.allgather({k: (v.shape, v.dtype)
+                                for k, v in arrs.items()})
+
+        with h5py.File(path, 'w', driver='mpio', comm=comm,
+                       libver='latest') as f:
+            # Parallel HDF5 requires that data sets be created collectively
+            for k, (shape, dtype) in it.chain.from_iterable(
+                info.items() for info in ginfo
+            ):
+                eaxis = 1 if k.startswith('spt_') else -1
+                opts = dataset_opts(shape, dtype, eaxis=eaxis, **dsopts)
+                f.create_dataset(k, shape, dtype=dtype, **opts)
+
+            # Write out our arrays independently
+            for k, v in arrs.items():
+                if v.size:
+                    nrows = len(v)
+                    rstep = max(1, 2*1024**3 // (v.nbytes // nrows))
+
+                    for ix in range(0, nrows, rstep):
+                        f[k][ix:ix + rstep] = v[ix:ix + rstep]
+
+        # Have the root rank add the strings, attributes, and index
+        gmisc = comm.gather(misc, root=root)
+
+        if rank == root:
+            with h5py.File(path, 'r+') as f:
+                for m in gmisc:
+                    _write_pyfrms_data(f, m, dsopts)
+                    _write_pyfrms_attrs(f, m)
+
+                names = it.chain(*ginfo, *gmisc)
+                f['index'] = dataset_index(filter(lambda k: isinstance(k, str),
+                                                  names))
+    # Otherwise have the root rank write out the data from each rank in turn
+    elif rank == root:
+        with h5py.File(path, 'w', libver='latest') as f:
+            names = []
+
+            for i in range(comm.size):
+                rdata = data if i == root else comm.recv(source=i)
+
+                _write_pyfrms_data(f, rdata, dsopts)
+                _write_pyfrms_attrs(f, rdata)
+
+                names.extend(k for k in rdata if isinstance(k, str))
+
+            # Index the datasets in the file
+            f['index'] = dataset_index(names)
+    else:
+        comm.send(data, root)
+
+    # Wait for the file to be completed
+    comm.barrier()
 
 
 class NativeWriter:
-    def __init__(self, intg, basedir, basename, prefix, *, extn='.pyfrs'):
+    def __init__(self, intg, basedir, basename, prefix, *, extn='.pyfrs',
+                 isasync=False, layout='partitioned', lossy=None, **dsopts):
         # Base output directory and file name
         self.basedir = basedir
         self.basename = basename
@@ -28,8 +198,9 @@ class NativeWriter:
         # Data prefix
         self.prefix = prefix
 
-        # Our physical rank
+        # Our physical rank and the MPI to physical rank mapping
         self.prank = intg.rallocs.prank
+        self.mprankmap = intg.rallocs.mprankmap
 
         # Append the relevant extension
         if not self.basename.endswith(extn):
@@ -38,23 +209,82 @@ class NativeWriter:
         # Output counter (incremented each time write() is called)
         self.nout = self._restore_nout() if intg.isrestart else 0
 
+        # File layout
+        if layout not in {'partitioned', 'global'}:
+            raise ValueError('Invalid file layout')
+
+        self.layout = layout
+
+        # Dataset chunking and compression options
+        self.dsopts = dsopts
+
+        # Lossy quantisation mode and tolerance (if any)
+        self.lossy = lossy
+
         # MPI info
         comm, rank, root = get_comm_rank_root()
 
+        # See if parallel I/O is available
+        parallel = (h5py.get_config().mpi and
+                    'PYFR_FORCE_SERIAL_HDF5' not in os.environ)
+
+        # Filters can not be applied to independently written datasets
+        if (layout == 'partitioned' and
+            (dsopts.get('compression') or dsopts.get('shuffle'))):
+            parallel = False
+
         # Parallel I/O
-        if (h5py.get_config().mpi and
-            'PYFR_FORCE_SERIAL_HDF5' not in os.environ):
+        if parallel:
+            self._prepare = self._prepare_parallel
             self._write = self._write_parallel
         # Serial I/O
         else:
+            self._prepare = self._prepare_serial
             self._write = self._write_serial
 
-    def write(self, data, tcurr, metadata=None):
+        # Writing from a background thread requires MPI thread support;
+        # without it fall back to blocking writes
+        if isasync and mpi.Query_thread() < mpi.THREAD_MULTIPLE:
+            isasync = False
+
+        # Asynchronous I/O; writes are performed by a background thread
+        if isasync:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self._executor = None
+
+        # Give any writer thread its own communicator
+        self._comm = comm.Dup() if isasync else comm
+
+        # Pending asynchronous write (if any)
+        self._pending = None
+
+    def write(self, data, tcurr, metadata=None, callback=None):
         # Determine the output path
         path = self._get_output_path(tcurr)
 
-        # Delegate to _write to do the actual outputting
-        self._write(path, data, metadata)
+        # Quantise any floating point data
+        if self.lossy:
+            data = {k: quantise(v, *self.lossy) if v.dtype.kind == 'f' else v
+                    for k, v in data.items()}
+
+        # Exchange any information required to perform the write
+        winfo = self._prepare(data, metadata)
+
+        if self._executor:
+            # Double buffering: wait for the previous write to complete
+            self.flush()
+
+            # Hand the data off to the writer thread
+            fut = self._executor.submit(self._write, path, winfo)
+            self._pending = (fut, path, callback)
+        else:
+            # Delegate to _write to do the actual outputting
+            self._write(path, winfo)
+
+            # Fire the completion callback
+            if callback:
+                callback(path)
 
         # Increment the output number
         self.nout += 1
@@ -62,6 +292,23 @@ class NativeWriter:
         # Return the path
         return path
 
+    def probe(self):
+        # If the pending write has completed then finalise it
+        if self._pending and self._pending[0].done():
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            fut, path, callback = self._pending
+            self._pending = None
+
+            # Wait for the write to finish, propagating any exceptions
+            fut.result()
+
+            # Fire the completion callback
+            if callback:
+                callback(path)
+
     def _restore_nout(self):
         nout = 0
 
@@ -88,40 +335,128 @@ class NativeWriter:
         info = {}
 
         for k, v in data.items():
-            info[f'{self.prefix}_{k}_p{self.prank}'] = (v.shape, v.dtype.str)
+            if self.layout == 'global':
+                name = f'{self.prefix}_{k}'
+            else:
+                name = f'{self.prefix}_{k}_p{self.prank}'
+
+            info[name] = (v.shape, v.dtype.str)
 
         return info
 
-    def _write_parallel(self, path, data, metadata):
+    def _prepare_metadata(self, metadata):
+        mdata = {}
+
+        for k, v in metadata.items():
+            if isinstance(v, str):
+                mdata[k] = np.array(v.encode(), dtype='S')
+            else:
+                mdata[k] = np.asarray(v)
+
+        return mdata
+
+    def _prepare_dataset_info(self, ginfo):
+        dinfo, parts = {}, {}
+
+        for mrank, (info, minfo) in enumerate(ginfo):
+            # Metadata is stored as-is
+            for name, (shape, dtype) in minfo.items():
+                dinfo[name] = (shape, dtype, {}, {})
+
+            # As is data in the partitioned layout
+            if self.layout == 'partitioned':
+                for name, (shape, dtype) in info.items():
+                    dinfo[name] = (shape, dtype, *self._dataset_opts(shape,
+                                                                     dtype))
+            # Otherwise tally up the number of elements in each partition
+            else:
+                prank = self.mprankmap[mrank]
+
+                for name, (shape, dtype) in info.items():
+                    if name not in parts:
+                        parts[name] = np.zeros(len(ginfo) + 1, dtype=np.int64)
+                        dinfo[name] = (shape[:-1], dtype)
+
+                    parts[name][prank + 1] = shape[-1]
+
+        # Global datasets are indexed by their partition offsets
+        for name in sorted(parts):
+            poff = parts[name] = np.cumsum(parts[name])
+            shape, dtype = dinfo[name]
+            shape = (*shape, poff[-1])
+
+            dinfo[name] = (shape, dtype, *self._dataset_opts(shape, dtype))
+            dinfo[f'{name}_parts'] = (poff.shape, poff.dtype.str, {}, {})
+
+        # Index the datasets in the file
+        index = dataset_index(dinfo)
+        dinfo['index'] = (index.shape, index.dtype.str, {}, {})
+
+        return dinfo, parts, index
+
+    def _dataset_opts(self, shape, dtype):
+        opts = dataset_opts(shape, dtype, **self.dsopts)
+
+        # Record how any quantised datasets were quantised
+        if self.lossy and np.dtype(dtype).kind == 'f':
+            attrs = {'lossy-mode': self.lossy[0], 'lossy-tol': self.lossy[1]}
+        else:
+            attrs = {}
+
+        return opts, attrs
+
+    def _create_datasets(self, f, dinfo):
+        for name, (shape, dtype, opts, attrs) in dinfo.items():
+            d = f.create_dataset(name, shape, dtype=dtype, **opts)
+            d.attrs.update(attrs)
+
+    def _prepare_parallel(self, data, metadata):
         comm, rank, root = get_comm_rank_root()
 
         info = self._prepare_data_info(data)
 
         # If we are the root rank then process any metadata
         if rank == root:
-            data = dict(data)
-
-            for k, v in metadata.items():
-                if isinstance(v, str):
-                    data[k] = np.array(v.encode(), dtype='S')
-                    info[k] = ((), data[k].dtype.str)
-                else:
-                    data[k] = v
-                    info[k] = (v.shape, v.dtype.str)
+            mdata = self._prepare_metadata(metadata)
+            minfo = {k: (v.shape, v.dtype.str) for k, v in mdata.items()}
         elif metadata:
             raise ValueError('Metadata must be written by the root rank')
+        else:
+            mdata, minfo = {}, {}
 
         # Distribute the data info to all of the ranks
-        ginfo = comm.allgather(info)
+        ginfo = comm.allgather((info, minfo))
+
+        # Determine what datasets need to be created
+        dinfo, parts, index = self._prepare_dataset_info(ginfo)
+
+        # Items which we are to write independently
+        items = list(mdata.items())
+        if rank == root:
+            items.extend((f'{k}_parts', v) for k, v in parts.items())
+            items.append(('index', index))
+
+        # Items to be written collectively into global datasets
+        if parts:
+            gitems = dict(zip(info, data.values()))
+            gitems = [(k, gitems.get(k), v[self.prank])
+                      for k, v in parts.items()]
+        else:
+            items.extend(zip(info, data.values()))
+            gitems = []
+
+        return dinfo, items, gitems
+
+    def _write_parallel(self, path, winfo):
+        comm = self._comm
+        dinfo, items, gitems = winfo
 
         with h5py.File(path, 'w', driver='mpio', comm=comm) as f:
             # Parallel HDF5 requires that data sets be created collectively
-            for minfo in ginfo:
-                for name, (shape, dtype) in minfo.items():
-                    f.create_dataset(name, shape, dtype=dtype)
+            self._create_datasets(f, dinfo)
 
             # Write out our local data
-            for name, dat in zip(info, data.values()):
+            for name, dat in items:
                 fdata = f[name]
 
                 if dat.shape:
@@ -137,10 +472,46 @@ class NativeWriter:
                 else:
                     fdata.write_direct(dat)
 
+            # Collectively write our slices of the global datasets
+            if gitems:
+                dxpl = h5py.h5p.create(h5py.h5p.DATASET_XFER)
+                dxpl.set_dxpl_mpio(h5py.h5fd.MPIO_COLLECTIVE)
+
+                for name, dat, eoff in gitems:
+                    self._write_global_slab(comm, f[name], dat, eoff, dxpl)
+
         # Wait for everyone to finish writing
         comm.barrier()
 
-    def _write_serial(self, path, data, metadata):
+    def _write_global_slab(self, comm, fdata, dat, eoff, dxpl):
+        neles = dat.shape[-1] if dat is not None else 0
+        esize = dat.nbytes // neles if neles else 0
+
+        # Number of writes needed to stay within the limits of MPI-IO
+        nwrites = comm.allreduce(-(-neles*esize // (2*1024**3)), op=mpi.MAX)
+        estep = -(-neles // nwrites) if nwrites else 0
+
+        for i in range(nwrites):
+            fspace = fdata.id.get_space()
+
+            # Select our slice of the dataset
+            if (ix := i*estep) < neles:
+                sdat = np.ascontiguousarray(dat[..., ix:ix + estep])
+                mspace = h5py.h5s.create_simple(sdat.shape)
+
+                start = (0,)*(sdat.ndim - 1) + (eoff + ix,)
+                fspace.select_hyperslab(start, sdat.shape)
+            # Otherwise participate with an empty selection
+            else:
+                sdat = np.empty(1, dtype=fdata.dtype)
+                mspace = h5py.h5s.create_simple((1,))
+
+                mspace.select_none()
+                fspace.select_none()
+
+            fdata.id.write(mspace, fspace, sdat, dxpl=dxpl)
+
+    def _prepare_serial(self, data, metadata):
         comm, rank, root = get_comm_rank_root()
 
         info = self._prepare_data_info(data)
@@ -150,34 +521,68 @@ class NativeWriter:
                 raise ValueError('Metadata must be written by the root rank')
 
             # Send the info about our data to the root rank
-            comm.gather(info, root=root)
+            comm.gather((info, {}), root=root)
 
-            # Send the data itself
-            for v in data.values():
-                comm.Send(np.ascontiguousarray(v), root)
+            # The data itself is sent when writing
+            return [np.ascontiguousarray(v) for v in data.values()]
         else:
-            with h5py.File(path, 'w') as f:
-                # Collect info about what remote ranks want to write
-                ginfo = comm.gather({}, root=root)
+            mdata = self._prepare_metadata(metadata)
+            minfo = {k: (v.shape, v.dtype.str) for k, v in mdata.items()}
 
-                # Write the metadata
-                for k, v in metadata.items():
-                    if isinstance(v, str):
-                        f[k] = np.array(v.encode(), dtype='S')
-                    else:
-                        f[k] = v
+            # Collect info about what remote ranks want to write
+            ginfo = comm.gather((info, minfo), root=root)
 
-                # Write our local data
-                for k, v in zip(info, data.values()):
-                    f[k] = v
+            # Determine what datasets need to be created
+            dinfo, parts, index = self._prepare_dataset_info(ginfo)
 
-                # Receive and write the remote data
-                for mrank, minfo in enumerate(ginfo):
-                    for k, (shape, dtype) in minfo.items():
-                        v = np.empty(shape, dtype=dtype)
-                        comm.Recv(v, mrank)
+            # Offset of each item in its global dataset (if any)
+            def eoff(name, mrank):
+                if name in parts:
+                    return parts[name][self.mprankmap[mrank]]
 
-                        f[k] = v
+            # Lazily receive the remote data as it is written
+            def recv():
+                for mrank, (minfo, _) in enumerate(ginfo):
+                    if mrank != root:
+                        for k, (shape, dtype) in minfo.items():
+                            v = np.empty(shape, dtype=dtype)
+                            self._comm.Recv(v, mrank)
 
-        # Wait for the root rank to finish writing
-        comm.barrier()
+                            yield k, v, eoff(k, mrank)
+
+            # Metadata, partition offsets, and the index
+            items = [(k, v, None) for k, v in mdata.items()]
+            items.extend((f'{k}_parts', v, None) for k, v in parts.items())
+            items.append(('index', index, None))
+
+            # Followed by our local data and then the remote data
+            items = it.chain(items, ((k, v, eoff(k, rank))
+                                     for k, v in zip(info, data.values())),
+                             recv())
+
+            return dinfo, items
+
+    def _write_serial(self, path, winfo):
+        comm, rank, root = get_comm_rank_root()
+
+        # Send our data to the root rank
+        if rank != root:
+            for v in winfo:
+                self._comm.Send(v, root)
+        # Receive and write out the data from each rank in turn
+        else:
+            dinfo, items = winfo
+
+            with h5py.File(path, 'w') as f:
+                self._create_datasets(f, dinfo)
+
+                for k, v, eoff in items:
+                    if eoff is None:
+                        f[k][...] = v
+                    else:
+                        f[k][..., eoff:eoff + v.shape[-1]] = v
+
+        # Wait for the root rank to finish writing; when asynchronous only
+        # the root rank knows, or needs to know, when this has happened
+        if not self._executor:
+            self._comm.barrier()
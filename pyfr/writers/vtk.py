@@ -626,15 +626,19 @@ class VTKWriter(BaseWriter):
                 '</DataArray>\n</FieldData>\n')
 
     def _write_data(self, vtuf, pn, mk, sk):
-        name = self.mesh_inf[mk][0]
-        mesh = self.mesh[mk].astype(self.dtype)
+        name, mshape = self.mesh_inf[mk]
         soln = self.soln[sk].swapaxes(0, 1).astype(self.dtype)
 
         # Handle the case of partial solution files
-        if soln.shape[2] != mesh.shape[1]:
+        if soln.shape[2] != mshape[1]:
             skpre, skpost = sk.rsplit('_', 1)
 
-            mesh = mesh[:, self.soln[f'{skpre}_idxs_{skpost}'], :]
+            idxs = self.soln[f'{skpre}_idxs_{skpost}']
+            mesh = self.mesh.read(mk, np.s_[:, idxs, :])
+        else:
+            mesh = self.mesh[mk]
+
+        mesh = mesh.astype(self.dtype)
 
         # Dimensions
         nspts, neles = mesh.shape[:2]